@@ -0,0 +1,187 @@
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import asyncio
+import logging
+import re
+import time
+
+from pymongo.errors import PyMongoError
+
+from rfid_card_cache import CachedCard
+
+logger = logging.getLogger(__name__)
+
+DAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+MINUTES_PER_DAY = 24 * 60
+# Operating hours are written in the court's local time, so they are only
+# enforced for courts with a known timezone (or a configured default)
+DEFAULT_COURT_TIMEZONE: Optional[str] = None
+# Cards of these types may enter outside operating hours
+HOURS_EXEMPT_CARD_TYPES = {"admin"}
+POLICY_REFRESH_SECONDS = 60.0
+
+_TIME = r"(\d{1,2})(?::(\d{2}))?\s*([AaPp][Mm])"
+_RANGE = re.compile(rf"^\s*{_TIME}\s*[-–]\s*{_TIME}\s*$")
+
+# Per weekday (Monday first), the [start, end) minute ranges a court is open
+Windows = Tuple[Tuple[Tuple[int, int], ...], ...]
+
+def _minutes(hour: str, minute: Optional[str], meridiem: str) -> int:
+    hour_value = int(hour) % 12
+    if meridiem.lower() == "pm":
+        hour_value += 12
+    return hour_value * 60 + int(minute or 0)
+
+def parse_operating_hours(hours: Dict[str, str]) -> Optional[Windows]:
+    """Turn {"monday": "6:00 AM - 10:00 PM", ...} into per-day minute windows.
+
+    Returns None (no restriction) when no hours are set. "24 hours" opens the
+    whole day, "closed" or a missing day closes it, and a range that ends at or
+    before it starts runs past midnight into the next day.
+    """
+    if not hours:
+        return None
+    windows: List[List[Tuple[int, int]]] = [[] for _ in DAYS]
+    for day_index, day in enumerate(DAYS):
+        value = (hours.get(day) or hours.get(day.capitalize()) or "closed").strip().lower()
+        if value in ("24 hours", "24h", "open 24 hours"):
+            windows[day_index].append((0, MINUTES_PER_DAY))
+            continue
+        if value == "closed":
+            continue
+        match = _RANGE.match(value)
+        if match is None:
+            logger.warning(f"Unparseable operating hours {value!r} for {day}; treating the day as open")
+            windows[day_index].append((0, MINUTES_PER_DAY))
+            continue
+        start = _minutes(*match.group(1, 2, 3))
+        end = _minutes(*match.group(4, 5, 6))
+        if end <= start:
+            # "5:00 AM - 12:00 AM" closes at midnight; "6:00 PM - 2:00 AM" spills into tomorrow
+            windows[day_index].append((start, MINUTES_PER_DAY))
+            if end > 0:
+                windows[(day_index + 1) % len(DAYS)].append((0, end))
+        else:
+            windows[day_index].append((start, end))
+    return tuple(tuple(sorted(day_windows)) for day_windows in windows)
+
+class CourtPolicy:
+    """What a card needs to enter one court"""
+
+    __slots__ = ("court_id", "required_level", "capacity", "max_session", "windows", "tz_name", "tz")
+
+    def __init__(self, court: Dict[str, Any], default_timezone: Optional[str] = DEFAULT_COURT_TIMEZONE):
+        self.court_id = court["id"]
+        self.required_level = court.get("required_access_level", 1)
+        self.capacity = court.get("max_players")
+        self.max_session = timedelta(minutes=court["max_session_minutes"]) if court.get("max_session_minutes") else None
+        self.windows = parse_operating_hours(court.get("operating_hours") or {})
+        # Usage reports still need some timezone; UTC when the court's is unknown
+        self.tz_name = court.get("timezone") or default_timezone or "UTC"
+        try:
+            self.tz = ZoneInfo(self.tz_name)
+        except ZoneInfoNotFoundError:
+            logger.warning(f"Unknown timezone {self.tz_name!r} for court {self.court_id}; using UTC")
+            self.tz_name = "UTC"
+            self.tz = timezone.utc
+            self.windows = None
+        if not (court.get("timezone") or default_timezone):
+            # Checking local-time hours against UTC would turn players away in their evening
+            self.windows = None
+
+    def is_open(self, at: datetime) -> bool:
+        if self.windows is None:
+            return True
+        # Stored datetimes are naive UTC
+        local = (at if at.tzinfo else at.replace(tzinfo=timezone.utc)).astimezone(self.tz)
+        minute = local.hour * 60 + local.minute
+        return any(start <= minute < end for start, end in self.windows[local.weekday()])
+
+    def denial_reason(self, card: CachedCard, at: datetime) -> Optional[str]:
+        if card.access_level < self.required_level:
+            return f"Access level {card.access_level} below court requirement {self.required_level}"
+        if card.card_type not in HOURS_EXEMPT_CARD_TYPES and not self.is_open(at):
+            return "Court is closed"
+        return None
+
+    def for_reader(self) -> Dict[str, Any]:
+        """The same rules in a form an offline reader can evaluate"""
+        return {
+            "level": self.required_level,
+            "tz": self.tz_name,
+            "hours": [list(map(list, day)) for day in self.windows] if self.windows is not None else None
+        }
+
+class AccessPolicy:
+    """Precomputed court -> CourtPolicy table so each tap is decided without a query"""
+
+    def __init__(self, default_timezone: Optional[str] = DEFAULT_COURT_TIMEZONE, refresh_seconds: float = POLICY_REFRESH_SECONDS):
+        self.default_timezone = default_timezone
+        self.refresh_seconds = refresh_seconds
+        self._courts: Dict[str, CourtPolicy] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.loaded_at: Optional[float] = None
+        self.decisions = 0
+        self.denials = 0
+
+    async def load(self, collection):
+        courts = {}
+        async for court in collection.find({"is_active": True}):
+            courts[court["id"]] = CourtPolicy(court, self.default_timezone)
+        self._courts = courts
+        self.loaded_at = time.monotonic()
+
+    def update_court(self, court: Dict[str, Any]):
+        if court.get("is_active", True):
+            self._courts[court["id"]] = CourtPolicy(court, self.default_timezone)
+        else:
+            self._courts.pop(court["id"], None)
+
+    def get(self, court_id: str) -> Optional[CourtPolicy]:
+        return self._courts.get(court_id)
+
+    def policies(self) -> List[CourtPolicy]:
+        return list(self._courts.values())
+
+    async def lookup(self, court_id: str, collection) -> Optional[CourtPolicy]:
+        """Court policy from the table; a court created on another worker costs one read"""
+        policy = self._courts.get(court_id)
+        if policy is None:
+            court = await collection.find_one({"id": court_id, "is_active": True})
+            if court is not None:
+                policy = self._courts[court_id] = CourtPolicy(court, self.default_timezone)
+        return policy
+
+    def decide(self, card: CachedCard, policy: Optional[CourtPolicy], at: datetime) -> Optional[str]:
+        """None to admit, otherwise the denial reason"""
+        self.decisions += 1
+        reason = "Unknown or inactive court" if policy is None else policy.denial_reason(card, at)
+        if reason is not None:
+            self.denials += 1
+        return reason
+
+    def start(self, collection):
+        self._task = asyncio.create_task(self._refresh_loop(collection))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _refresh_loop(self, collection):
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                await self.load(collection)
+            except PyMongoError as e:
+                logger.error(f"Access policy refresh failed: {e!r}")
+
+    def stats(self) -> dict:
+        return {
+            "courts": len(self._courts),
+            "decisions": self.decisions,
+            "denials": self.denials,
+            "age_seconds": round(time.monotonic() - self.loaded_at, 1) if self.loaded_at else None
+        }
@@ -0,0 +1,124 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import logging
+
+from pymongo.errors import BulkWriteError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+AUDIT_BATCH_SIZE = 500
+AUDIT_FLUSH_SECONDS = 0.5
+# Records held in memory at most; past this new records are dropped and counted
+AUDIT_QUEUE_LIMIT = 50_000
+DUPLICATE_KEY = 11000
+
+OnFlush = Callable[[List[Dict[str, Any]]], Awaitable[None]]
+
+class AuditWriter:
+    """Buffers audit records off the request path and writes them with insert_many.
+
+    A flush happens when ``batch_size`` records are waiting or every
+    ``flush_seconds``, whichever comes first. Failed batches go back to the
+    front of the queue for the next flush while there is room. ``on_flush``
+    runs once for every batch that is stored, e.g. to maintain rollups.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = AUDIT_BATCH_SIZE,
+        flush_seconds: float = AUDIT_FLUSH_SECONDS,
+        queue_limit: int = AUDIT_QUEUE_LIMIT,
+        on_flush: Optional[OnFlush] = None
+    ):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.queue_limit = queue_limit
+        self.on_flush = on_flush
+        self._buffer: List[Dict[str, Any]] = []
+        self._collection = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.failures = 0
+
+    def submit(self, record: Dict[str, Any]) -> bool:
+        """Queue one record; False when the queue is full and it was dropped"""
+        if len(self._buffer) >= self.queue_limit:
+            self.dropped += 1
+            return False
+        self._buffer.append(record)
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def start(self, collection):
+        self._collection = collection
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the flush loop and write whatever is still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        while self._buffer and self._collection is not None:
+            if not await self.flush():
+                self.dropped += len(self._buffer)
+                logger.error(f"Dropped {len(self._buffer)} audit records at shutdown")
+                self._buffer = []
+
+    async def flush(self) -> bool:
+        """Write up to one batch; False if the write failed"""
+        if not self._buffer:
+            return True
+        batch = self._buffer[:self.batch_size]
+        del self._buffer[:self.batch_size]
+        try:
+            await self._insert(batch)
+        except PyMongoError as e:
+            self.failures += 1
+            room = max(0, self.queue_limit - len(self._buffer))
+            self.dropped += max(0, len(batch) - room)
+            self._buffer[:0] = batch[:room]
+            logger.error(f"Audit flush of {len(batch)} records failed: {e!r}")
+            return False
+        self.flushes += 1
+        self.written += len(batch)
+        if self.on_flush is not None:
+            try:
+                await self.on_flush(batch)
+            except PyMongoError as e:
+                logger.error(f"Audit on_flush for {len(batch)} records failed: {e!r}")
+        return True
+
+    async def _insert(self, batch: List[Dict[str, Any]]):
+        try:
+            await self._collection.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            # A retried batch may already be partly stored; those rows are done
+            if any(error["code"] != DUPLICATE_KEY for error in e.details["writeErrors"]):
+                raise
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._buffer:
+                if not await self.flush():
+                    # Back off rather than hammer a struggling database
+                    await asyncio.sleep(self.flush_seconds)
+                    break
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._buffer),
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "failures": self.failures
+        }
@@ -0,0 +1,72 @@
+"""Micro-benchmark: access policy decisions per second versus table size.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_access_policy
+
+Each row builds a table of courts with mixed opening hours, timezones and
+required levels, then decides taps for random (card, court, time) triples.
+Decisions are dictionary lookups plus a scan of the day's one or two windows,
+so throughput should stay flat as courts and cards grow.
+"""
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from access_policy import AccessPolicy  # noqa: E402
+from rfid_card_cache import CachedCard  # noqa: E402
+
+SIZES = [(100, 1_000), (1_000, 10_000), (10_000, 100_000)]
+DECISIONS = 200_000
+HOURS = [
+    {},
+    {day: "24 hours" for day in ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")},
+    {day: "6:00 AM - 10:00 PM" for day in ("monday", "tuesday", "wednesday", "thursday", "friday")},
+    {day: "5:00 AM - 12:00 AM" for day in ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")},
+    {day: "6:00 PM - 2:00 AM" for day in ("friday", "saturday")},
+]
+TIMEZONES = ["UTC", "America/New_York", "America/Los_Angeles", "Europe/London"]
+
+
+def measure(court_count: int, card_count: int, rng: random.Random) -> float:
+    policy = AccessPolicy()
+    for i in range(court_count):
+        policy.update_court({
+            "id": f"court-{i}",
+            "operating_hours": HOURS[i % len(HOURS)],
+            "timezone": TIMEZONES[i % len(TIMEZONES)],
+            "required_access_level": 1 + i % 3
+        })
+    cards = [
+        CachedCard({"card_uid": f"card-{i}", "user_id": f"user-{i}", "access_level": 1 + i % 3})
+        for i in range(card_count)
+    ]
+    start = datetime(2025, 6, 2)
+    taps = [
+        (rng.choice(cards), f"court-{rng.randrange(court_count)}", start + timedelta(minutes=rng.randrange(7 * 24 * 60)))
+        for _ in range(DECISIONS)
+    ]
+
+    started = time.perf_counter()
+    for card, court_id, at in taps:
+        policy.decide(card, policy.get(court_id), at)
+    elapsed = time.perf_counter() - started
+
+    assert policy.decisions == DECISIONS and 0 < policy.denials < DECISIONS
+    return DECISIONS / elapsed
+
+
+def main():
+    rng = random.Random(17)
+    print(f"{'courts':>8} {'cards':>8} {'decisions/s':>13}")
+    for court_count, card_count in SIZES:
+        rate = measure(court_count, card_count, rng)
+        print(f"{court_count:>8} {card_count:>8} {rate:>13,.0f}")
+
+
+if __name__ == "__main__":
+    main()
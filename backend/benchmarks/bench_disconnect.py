@@ -0,0 +1,72 @@
+"""Micro-benchmark: ConnectionManager.disconnect cost versus total topic count.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_disconnect
+
+Each row opens a fixed number of probe connections subscribed to a handful of
+topics while a background connection holds an increasing number of unrelated
+game topics. With the per-connection reverse index the per-disconnect cost
+should stay flat as the topic count grows.
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from websocket_manager import ConnectionManager  # noqa: E402
+
+TOPIC_COUNTS = [100, 1_000, 10_000, 100_000]
+PROBE_CONNECTIONS = 500
+
+
+class NullWebSocket:
+    async def accept(self):
+        pass
+
+    async def send_text(self, data: str):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+async def measure(topic_count: int) -> float:
+    # Lift the per-connection subscription cap so the background connection really holds every topic
+    manager = ConnectionManager(max_subscriptions_per_connection=topic_count)
+    background_id = await manager.connect(NullWebSocket(), "background")
+    for i in range(topic_count):
+        await manager.subscribe_to_game(background_id, f"game-{i}")
+    assert len(manager.topics.exact) == topic_count
+
+    probe_ids = []
+    for i in range(PROBE_CONNECTIONS):
+        connection_id = await manager.connect(NullWebSocket(), f"probe-{i}")
+        await manager.subscribe_to_court(connection_id, f"court-{i % 10}")
+        await manager.subscribe_to_game(connection_id, f"game-{i % topic_count}")
+        await manager.subscribe_to_tournament(connection_id, "tournament-1")
+        probe_ids.append(connection_id)
+    await manager.wait_until_drained()
+
+    started = time.perf_counter()
+    for connection_id in probe_ids:
+        await manager.disconnect(connection_id)
+    elapsed = time.perf_counter() - started
+
+    assert not manager.topics.subscribers("tournament:tournament-1")
+    await manager.disconnect(background_id)
+    assert not manager.topics.exact
+    return elapsed / PROBE_CONNECTIONS * 1e6
+
+
+async def main():
+    print(f"{'topics':>10} {'us/disconnect':>15}")
+    for topic_count in TOPIC_COUNTS:
+        per_disconnect = await measure(topic_count)
+        print(f"{topic_count:>10} {per_disconnect:>15.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
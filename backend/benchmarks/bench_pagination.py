@@ -0,0 +1,114 @@
+"""Benchmark: skip/limit versus keyset (cursor) pages of rfid_events.
+
+Run from the backend directory against a scratch MongoDB:
+
+    MONGO_URL=mongodb://localhost:27017 python -m benchmarks.bench_pagination [--events 200000] [--page-size 50]
+
+Seeds ``--events`` RFID events for one court into the ``bench_pagination``
+database (dropped first), creates the same indexes as the server and then
+times the /rfid/events query at several page depths, once with ``skip`` and
+once seeking from the cursor of the previous page. Skip pages get slower in
+proportion to their depth; cursor pages should cost the same at page 1000 as
+at page 1.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+
+from pagination import encode_cursor, keyset_filter, keyset_sort  # noqa: E402
+
+PAGES = [1, 10, 100, 1000]
+REPEATS = 20
+
+
+async def seed(events, count: int):
+    await events.drop()
+    start = datetime(2025, 1, 1)
+    batch = []
+    for i in range(count):
+        batch.append({
+            "id": str(uuid.uuid4()),
+            "card_uid": f"card-{i % 500}",
+            "user_id": f"user-{i % 500}",
+            "court_id": "court-1",
+            "event_type": "check_in",
+            "success": True,
+            # A few taps per second share a timestamp, so the id tie-break matters
+            "timestamp": start + timedelta(milliseconds=250 * (i // 3))
+        })
+        if len(batch) == 10_000:
+            await events.insert_many(batch)
+            batch = []
+    if batch:
+        await events.insert_many(batch)
+    await events.create_index([("court_id", 1), ("timestamp", -1), ("id", -1)])
+
+
+async def timed(query) -> float:
+    samples = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        await query()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1e3
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args()
+    if args.events < args.page_size * PAGES[-1]:
+        parser.error(f"--events must cover {PAGES[-1]} pages of {args.page_size}")
+
+    client = AsyncIOMotorClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    events = client["bench_pagination"]["rfid_events"]
+    print(f"Seeding {args.events} events...")
+    await seed(events, args.events)
+
+    base = {"court_id": "court-1"}
+    limit = args.page_size
+    # The row before each measured page, as the previous response's cursor would name it
+    boundaries = {}
+    ordered = events.find(base, {"timestamp": 1, "id": 1}).sort(keyset_sort("timestamp"))
+    position = 0
+    async for row in ordered:
+        position += 1
+        page = position // limit + 1
+        if position % limit == 0 and page in PAGES:
+            boundaries[page] = encode_cursor(row["timestamp"], row["id"])
+        if page > PAGES[-1]:
+            break
+
+    print(f"{'page':>6} {'skip ms':>9} {'cursor ms':>10}")
+    for page in PAGES:
+        skip = (page - 1) * limit
+
+        async def skip_query():
+            return await events.find(base).sort(keyset_sort("timestamp")).skip(skip).limit(limit).to_list(limit)
+
+        async def cursor_query():
+            filter_dict = dict(base)
+            if page in boundaries:
+                filter_dict.update(keyset_filter("timestamp", boundaries[page]))
+            return await events.find(filter_dict).sort(keyset_sort("timestamp")).limit(limit).to_list(limit)
+
+        assert [row["id"] for row in await skip_query()] == [row["id"] for row in await cursor_query()]
+        print(f"{page:>6} {await timed(skip_query):>9.2f} {await timed(cursor_query):>10.2f}")
+
+    await events.drop()
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
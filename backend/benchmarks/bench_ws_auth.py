@@ -0,0 +1,97 @@
+"""Benchmark: WebSocket token verification under a simultaneous reconnect storm.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_ws_auth [--connections 5000] [--users 1000] [--db-latency-ms 2]
+
+The server's ``db`` handle is swapped for an in-memory users collection with a
+fixed per-query delay, so the numbers isolate JWT verification plus the
+principal cache rather than a particular MongoDB deployment. The storm runs
+twice: cold (empty cache, concurrent misses share one lookup per user) and
+warm (every principal cached).
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "bench_ws_auth")
+
+import server  # noqa: E402
+
+
+class DelayedUsers:
+    def __init__(self, users, latency: float):
+        self.users = users
+        self.latency = latency
+        self.queries = 0
+
+    async def find_one(self, query):
+        self.queries += 1
+        await asyncio.sleep(self.latency)
+        return self.users.get(query["id"])
+
+
+class FakeDatabase:
+    def __init__(self, users):
+        self.users = users
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def storm(tokens):
+    async def connect(token):
+        started = time.perf_counter()
+        await server.get_websocket_user(token)
+        return (time.perf_counter() - started) * 1000
+
+    return await asyncio.gather(*(connect(token) for token in tokens))
+
+
+async def main(connections: int, users: int, db_latency_ms: float):
+    user_docs = {}
+    for i in range(users):
+        user = server.User(
+            username=f"bench{i}",
+            email=f"bench{i}@m2dg.com",
+            password_hash="x",
+            full_name=f"Bench {i}"
+        )
+        user_docs[user.id] = user.dict()
+    user_ids = list(user_docs)
+
+    collection = DelayedUsers(user_docs, db_latency_ms / 1000)
+    server.db = FakeDatabase(collection)
+    tokens = [
+        server.create_access_token({"sub": user_ids[i % users]}, timedelta(minutes=30))
+        for i in range(connections)
+    ]
+
+    print(f"{connections} simultaneous connects across {users} users, {db_latency_ms}ms per users query")
+    print(f"{'phase':>6} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'db queries':>11}")
+    for phase in ("cold", "warm"):
+        queries_before = collection.queries
+        latencies = await storm(tokens)
+        print(
+            f"{phase:>6} {statistics.median(latencies):>8.2f} {percentile(latencies, 0.99):>8.2f} "
+            f"{max(latencies):>8.2f} {collection.queries - queries_before:>11}"
+        )
+    print(f"cache: {server.ws_principal_cache.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--db-latency-ms", type=float, default=2.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.connections, args.users, args.db_latency_ms))
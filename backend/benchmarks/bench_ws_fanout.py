@@ -0,0 +1,402 @@
+"""Load generator: end-to-end score_update fan-out over real WebSockets.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_ws_fanout [--spectators 5000] [--games 50] [--rate 50] [--duration 20]
+
+The app is served by uvicorn on localhost, by default in a child process so
+the reported RSS is the server's alone (``--in-process`` shares this event
+loop instead, which is handy under a profiler). The server's ``db`` handle is
+swapped for in-memory collections, so the numbers measure the HTTP handler,
+``ConnectionManager`` fan-out and the sockets rather than MongoDB.
+
+Spectators authenticate with an ``auth`` first frame and each subscribes to one of the
+games. The driver POSTs ``/api/games/{game_id}/score`` round-robin at
+``--rate`` updates per second, using a global counter as ``team1_score`` so
+every received frame can be matched to the moment its POST was issued.
+Clients run on this process's loop: past a few thousand spectators the client
+side becomes the bottleneck, so compare runs with the same parameters only.
+
+Each run appends one JSON record to ``--output`` (default
+``benchmarks/results/ws_fanout.jsonl``) with the parameters, git revision,
+latency percentiles, frames/sec, server RSS and the server's queue stats.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "bench_ws_fanout")
+
+import httpx  # noqa: E402
+import websockets  # noqa: E402
+
+DEFAULT_OUTPUT = Path(__file__).resolve().parent / "results" / "ws_fanout.jsonl"
+ADMIN_ID = "bench-admin"
+CONNECT_CONCURRENCY = 200
+
+
+def spectator_id(i: int) -> str:
+    return f"bench-spectator-{i}"
+
+
+def game_id(j: int) -> str:
+    return f"bench-game-{j}"
+
+
+class MemoryCollection:
+    """Just enough of a motor collection for the auth and score paths"""
+
+    def __init__(self, docs=None):
+        self.docs = docs or {}
+
+    async def find_one(self, query, *args, **kwargs):
+        return self.docs.get(query.get("id"))
+
+    async def update_one(self, query, update, *args, **kwargs):
+        doc = self.docs.get(query.get("id"))
+        if doc is not None:
+            doc.update(update.get("$set", {}))
+
+    async def insert_one(self, doc, *args, **kwargs):
+        pass
+
+
+class MemoryDatabase:
+    def __init__(self, spectators: int, games: int):
+        import server
+
+        users = {}
+        for i in range(spectators):
+            users[spectator_id(i)] = server.User(
+                id=spectator_id(i),
+                username=f"spectator{i}",
+                email=f"spectator{i}@m2dg.com",
+                password_hash="x",
+                full_name=f"Spectator {i}"
+            ).dict()
+        users[ADMIN_ID] = server.User(
+            id=ADMIN_ID,
+            username="benchadmin",
+            email="benchadmin@m2dg.com",
+            password_hash="x",
+            full_name="Bench Admin",
+            role=server.UserRole.ADMIN
+        ).dict()
+        self.users = MemoryCollection(users)
+        self.games = MemoryCollection({
+            game_id(j): {"id": game_id(j), "players": [], "referee_id": None} for j in range(games)
+        })
+        self.live_game_events = MemoryCollection()
+
+
+def raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def quiet_logging():
+    # server.py configures INFO logging; per-connection log lines would dominate the run
+    logging.getLogger().setLevel(logging.WARNING)
+
+
+def build_server(port: int, spectators: int, games: int):
+    import uvicorn
+    import server
+
+    quiet_logging()
+    server.db = MemoryDatabase(spectators, games)
+    config = uvicorn.Config(
+        server.app,
+        host="127.0.0.1",
+        port=port,
+        log_level="warning",
+        backlog=4096,
+        ws_per_message_deflate=False
+    )
+    return uvicorn.Server(config)
+
+
+def serve(port: int, spectators: int, games: int):
+    """Child-process entry point"""
+    raise_fd_limit()
+    asyncio.run(build_server(port, spectators, games).serve())
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def rss_bytes(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Spectator:
+    def __init__(self, index: int, game: str, sent_at: dict, latencies: list):
+        self.index = index
+        self.game = game
+        self.sent_at = sent_at
+        self.latencies = latencies
+        self.frames = 0
+        self.last_frame_at = None
+        self.socket = None
+        self.task = None
+
+    async def open(self, base_url: str, token: str, encoding: str):
+        self.socket = await websockets.connect(
+            f"{base_url}/ws/{spectator_id(self.index)}?encoding={encoding}",
+            compression=None,
+            max_queue=None,
+            open_timeout=60
+        )
+        await self.socket.send(json.dumps({"type": "auth", "token": token}))
+        self.task = asyncio.create_task(self.listen())
+        await self.socket.send(json.dumps({"type": "subscribe_game", "game_id": self.game}))
+
+    async def listen(self):
+        try:
+            async for raw in self.socket:
+                message = json.loads(raw)
+                # Compact frames shorten "type"/"team1_score" to "t"/"s1"
+                message_type = message.get("type", message.get("t"))
+                if message_type == "score_update":
+                    self.frames += 1
+                    self.last_frame_at = time.perf_counter()
+                    sent = self.sent_at.get(message.get("team1_score", message.get("s1")))
+                    if sent is not None:
+                        self.latencies.append(time.perf_counter() - sent)
+                elif message_type == "heartbeat":
+                    await self.socket.send(json.dumps({"type": "pong"}))
+        except websockets.ConnectionClosed:
+            pass
+
+    async def close(self):
+        if self.socket is not None:
+            await self.socket.close()
+        if self.task is not None:
+            await asyncio.gather(self.task, return_exceptions=True)
+
+
+async def wait_for_server(http: httpx.AsyncClient, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            await http.get("/api/websocket/stats")
+            return
+        except httpx.TransportError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+async def wait_until_settled(http: httpx.AsyncClient, expected: int, timeout: float = 300.0):
+    """Wait for every subscription and for the connect storm's presence frames to drain.
+
+    Confirmations can be shed by a full outbound queue during the storm, so
+    subscriptions are counted on the server rather than from client frames.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        stats = (await http.get("/api/websocket/stats")).json()
+        subscribed = sum(stats["game_subscriptions"].values())
+        queued = stats["outbound_queues"]["queued_frames"]
+        if subscribed >= expected and queued == 0:
+            return
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{subscribed}/{expected} spectators subscribed, {queued} frames still queued")
+        await asyncio.sleep(0.2)
+
+
+async def drive(args, base_url: str, server_pid: int) -> dict:
+    import server
+
+    quiet_logging()
+    def token(user_id: str) -> str:
+        return server.create_access_token({"sub": user_id}, timedelta(minutes=60))
+
+    sent_at: dict = {}
+    latencies: list = []
+    spectators = [Spectator(i, game_id(i % args.games), sent_at, latencies) for i in range(args.spectators)]
+    admin_headers = {"Authorization": f"Bearer {token(ADMIN_ID)}"}
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as http:
+        await wait_for_server(http)
+        ws_url = base_url.replace("http://", "ws://")
+        rss_idle = rss_bytes(server_pid)
+
+        gate = asyncio.Semaphore(CONNECT_CONCURRENCY)
+
+        async def open_spectator(spectator):
+            async with gate:
+                await spectator.open(ws_url, token(spectator_id(spectator.index)), args.encoding)
+
+        connect_started = time.perf_counter()
+        await asyncio.gather(*(open_spectator(spectator) for spectator in spectators))
+        await wait_until_settled(http, args.spectators)
+        connect_seconds = time.perf_counter() - connect_started
+        rss_connected = rss_bytes(server_pid)
+        print(f"{args.spectators} spectators subscribed across {args.games} games and settled in {connect_seconds:.1f}s")
+
+        post_latencies: list = []
+        errors = 0
+
+        async def post_score(counter: int):
+            nonlocal errors
+            started = time.perf_counter()
+            sent_at[counter] = started
+            game = game_id(counter % args.games)
+            response = await http.post(
+                f"/api/games/{game}/score",
+                json={"game_id": game, "team1_score": counter, "team2_score": 0, "game_time": "00:00", "period": 1},
+                headers=admin_headers
+            )
+            post_latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+        interval = 1 / args.rate
+        updates = int(args.rate * args.duration)
+        posts = []
+        started = time.perf_counter()
+        for counter in range(updates):
+            # Keep the schedule even when individual POSTs are slow
+            delay = started + counter * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            posts.append(asyncio.create_task(post_score(counter)))
+        await asyncio.gather(*posts)
+        # Let in-flight frames land before counting
+        await asyncio.sleep(args.settle)
+        rss_loaded = rss_bytes(server_pid)
+
+        stats = (await http.get("/api/websocket/stats")).json()
+
+        await asyncio.gather(*(spectator.close() for spectator in spectators))
+
+    frames = sum(spectator.frames for spectator in spectators)
+    per_game = [0] * args.games
+    for spectator in spectators:
+        per_game[spectator.index % args.games] += 1
+    expected = sum(per_game[counter % args.games] for counter in range(updates))
+    last_frame = max((s.last_frame_at for s in spectators if s.last_frame_at), default=time.perf_counter())
+    elapsed = last_frame - started
+    latencies_ms = [latency * 1000 for latency in latencies]
+    post_ms = [latency * 1000 for latency in post_latencies]
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "git_revision": git_revision(),
+        "params": {
+            "spectators": args.spectators,
+            "games": args.games,
+            "rate": args.rate,
+            "duration": args.duration,
+            "encoding": args.encoding,
+            "in_process": args.in_process
+        },
+        "connect_seconds": round(connect_seconds, 3),
+        "updates": updates,
+        "update_errors": errors,
+        "frames_received": frames,
+        "frames_expected": expected,
+        "frames_per_second": round(frames / elapsed, 1),
+        "delivery_ms": {
+            "p50": round(statistics.median(latencies_ms), 3) if latencies_ms else None,
+            "p99": round(percentile(latencies_ms, 0.99), 3) if latencies_ms else None,
+            "max": round(max(latencies_ms), 3) if latencies_ms else None
+        },
+        "post_ms": {
+            "p50": round(statistics.median(post_ms), 3) if post_ms else None,
+            "p99": round(percentile(post_ms, 0.99), 3) if post_ms else None
+        },
+        "server_rss_mb": {
+            "idle": round(rss_idle / 2**20, 1),
+            "connected": round(rss_connected / 2**20, 1),
+            "loaded": round(rss_loaded / 2**20, 1)
+        },
+        "server_stats": {
+            "total_connections": stats.get("total_connections"),
+            "outbound_queues": stats.get("outbound_queues"),
+            "coalescing": stats.get("coalescing")
+        }
+    }
+
+
+async def run_in_process(args, port: int) -> dict:
+    uvicorn_server = build_server(port, args.spectators, args.games)
+    serving = asyncio.create_task(uvicorn_server.serve())
+    try:
+        return await drive(args, f"http://127.0.0.1:{port}", os.getpid())
+    finally:
+        uvicorn_server.should_exit = True
+        await serving
+
+
+def main(args):
+    raise_fd_limit()
+    port = free_port()
+    if args.in_process:
+        result = asyncio.run(run_in_process(args, port))
+    else:
+        process = multiprocessing.get_context("spawn").Process(
+            target=serve, args=(port, args.spectators, args.games), daemon=True
+        )
+        process.start()
+        try:
+            result = asyncio.run(drive(args, f"http://127.0.0.1:{port}", process.pid))
+        finally:
+            process.terminate()
+            process.join()
+
+    print(json.dumps(result, indent=2))
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "a") as output:
+        output.write(json.dumps(result) + "\n")
+    print(f"appended to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--spectators", type=int, default=5000)
+    parser.add_argument("--games", type=int, default=50)
+    parser.add_argument("--rate", type=float, default=50.0, help="score updates per second across all games")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of score updates")
+    parser.add_argument("--settle", type=float, default=2.0, help="seconds to wait for trailing frames")
+    parser.add_argument("--encoding", choices=["json", "compact"], default="json")
+    parser.add_argument("--in-process", action="store_true", help="serve the app on this event loop")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    main(parser.parse_args())
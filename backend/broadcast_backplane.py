@@ -0,0 +1,135 @@
+from typing import Awaitable, Callable, List, Optional
+from abc import ABC, abstractmethod
+import asyncio
+import logging
+
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+
+logger = logging.getLogger(__name__)
+
+# Envelope handler installed by ConnectionManager.attach_backplane
+EnvelopeHandler = Callable[[dict], Awaitable[None]]
+
+class Backplane(ABC):
+    """Relays broadcast envelopes between ConnectionManager instances.
+
+    An envelope is a dict with ``origin`` (the publishing node id), ``topic``
+    (e.g. "court:<id>", or None for a general broadcast) and ``message``.
+    Every attached handler receives every envelope, including its own; the
+    manager drops envelopes it originated because it already delivered them.
+    """
+
+    @abstractmethod
+    async def start(self, handler: EnvelopeHandler):
+        ...
+
+    @abstractmethod
+    async def publish(self, envelope: dict):
+        ...
+
+    async def stop(self):
+        pass
+
+class InMemoryBackplane(Backplane):
+    """Process-local backplane; share one instance between managers in tests"""
+
+    def __init__(self):
+        self.handlers: List[EnvelopeHandler] = []
+        self.published = 0
+
+    async def start(self, handler: EnvelopeHandler):
+        self.handlers.append(handler)
+
+    async def publish(self, envelope: dict):
+        self.published += 1
+        for handler in list(self.handlers):
+            try:
+                await handler(envelope)
+            except Exception as e:
+                logger.error(f"Backplane handler failed: {e!r}")
+
+    async def stop(self):
+        self.handlers.clear()
+
+class MongoBackplane(Backplane):
+    """Cross-process backplane over a capped collection and a tailable cursor.
+
+    Tailable cursors work against a standalone mongod, so this runs locally
+    without a replica set. Each worker inserts the envelopes it publishes and
+    tails the collection for everyone else's.
+    """
+
+    def __init__(self, db, collection_name: str = "ws_backplane", size_bytes: int = 16 * 1024 * 1024):
+        self.db = db
+        self.collection_name = collection_name
+        self.size_bytes = size_bytes
+        self.published = 0
+        self.received = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def collection(self):
+        return self.db[self.collection_name]
+
+    async def _ensure_collection(self):
+        existing = await self.db.list_collection_names(filter={"name": self.collection_name})
+        if not existing:
+            try:
+                await self.db.create_collection(self.collection_name, capped=True, size=self.size_bytes)
+            except CollectionInvalid:
+                pass  # Another worker created it first
+        # A tailable cursor on an empty capped collection dies immediately
+        if await self.collection.estimated_document_count() == 0:
+            await self.collection.insert_one({"noop": True})
+
+    async def start(self, handler: EnvelopeHandler):
+        await self._ensure_collection()
+        latest = await self.collection.find_one(sort=[("$natural", -1)])
+        self._task = asyncio.create_task(self._tail(handler, latest["_id"] if latest else None))
+
+    async def _tail(self, handler: EnvelopeHandler, last_id):
+        while True:
+            # Resume in insertion ($natural) order by skipping past the last envelope seen.
+            # ObjectIds from different processes are not ordered within a second, so an
+            # _id $gt filter could skip another worker's envelope.
+            cursor = self.collection.find({}, cursor_type=CursorType.TAILABLE_AWAIT, sort=[("$natural", 1)])
+            skipping = last_id is not None
+            scanned_id = None
+            try:
+                while cursor.alive:
+                    async for envelope in cursor:
+                        if skipping:
+                            scanned_id = envelope["_id"]
+                            skipping = envelope["_id"] != last_id
+                            continue
+                        last_id = envelope["_id"]
+                        if "message" not in envelope:  # Seed document
+                            continue
+                        self.received += 1
+                        try:
+                            await handler(envelope)
+                        except Exception as e:
+                            logger.error(f"Backplane handler failed: {e!r}")
+                    if skipping:
+                        # The resume point was overwritten in the capped collection; carry on from here
+                        logger.warning("Backplane resume point aged out; envelopes may have been missed")
+                        skipping = False
+                        last_id = scanned_id
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Backplane tail error: {e!r}")
+            finally:
+                await cursor.close()
+            await asyncio.sleep(0.5)
+
+    async def publish(self, envelope: dict):
+        self.published += 1
+        await self.collection.insert_one(dict(envelope))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -0,0 +1,188 @@
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from enum import Enum
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# How long a promoted waitlist player's slot is held for them to tap in
+WAITLIST_HOLD_SECONDS = 300.0
+
+class Admission(str, Enum):
+    ADMITTED = "admitted"
+    ALREADY_PRESENT = "already_present"
+    WAITLISTED = "waitlisted"
+
+class CourtOccupancy:
+    """Who is on each court right now, keyed by court_id, plus each court's waitlist.
+
+    Rebuilt from open court_presence rows (check_out_time None) at startup and
+    then changed only by check-in and check-out on this process. Mutations are
+    plain synchronous calls, so on the event loop an admission is atomic: no
+    await separates the capacity check from taking the slot.
+
+    A full court puts players on a FIFO waitlist. When a slot frees up the head
+    of the line gets a hold on it for ``hold_seconds``; held slots count against
+    capacity and only the holder can take them. Promotions are queued for the
+    caller to announce (``drain_promotions``).
+    """
+
+    def __init__(self, hold_seconds: float = WAITLIST_HOLD_SECONDS):
+        self.hold_seconds = hold_seconds
+        self._members: Dict[str, Set[str]] = {}
+        self._capacity: Dict[str, int] = {}
+        self._waitlists: Dict[str, "OrderedDict[str, datetime]"] = {}
+        self._holds: Dict[str, Dict[str, datetime]] = {}
+        self._promotions: List[Tuple[str, str, datetime]] = []
+        self.loaded_at: Optional[float] = None
+        self.admitted = 0
+        self.waitlisted = 0
+        self.promoted = 0
+        self.expired_holds = 0
+
+    async def load(self, collection):
+        members: Dict[str, Set[str]] = {}
+        async for presence in collection.find({"check_out_time": None}, {"_id": 0, "court_id": 1, "user_id": 1}):
+            members.setdefault(presence["court_id"], set()).add(presence["user_id"])
+        self._members = members
+        self.loaded_at = time.monotonic()
+        logger.info(f"Court occupancy loaded {sum(map(len, members.values()))} players on {len(members)} courts")
+
+    def try_admit(
+        self,
+        court_id: str,
+        user_id: str,
+        capacity: Optional[int] = None,
+        now: Optional[datetime] = None
+    ) -> Tuple[Admission, Optional[int]]:
+        """Take a slot on the court, or join its waitlist; returns (outcome, waitlist position).
+
+        ``capacity`` None admits unconditionally (e.g. a reader already let the
+        player in while offline).
+        """
+        now = now or datetime.utcnow()
+        members = self._members.get(court_id, set())
+        if user_id in members:
+            return Admission.ALREADY_PRESENT, None
+        if capacity is not None:
+            self._capacity[court_id] = capacity
+            self._expire_holds(court_id, now)
+        holds = self._holds.get(court_id, {})
+        if user_id in holds:
+            self._release_hold(court_id, user_id)
+        elif capacity is not None and len(members) + len(holds) >= capacity:
+            waitlist = self._waitlists.setdefault(court_id, OrderedDict())
+            if user_id not in waitlist:
+                waitlist[user_id] = now
+                self.waitlisted += 1
+            return Admission.WAITLISTED, list(waitlist).index(user_id) + 1
+        self._members.setdefault(court_id, set()).add(user_id)
+        self._leave_waitlist(court_id, user_id)
+        self.admitted += 1
+        return Admission.ADMITTED, None
+
+    def check_in(self, court_id: str, user_id: str) -> bool:
+        """Add a player regardless of capacity; False if they were already on the court"""
+        return self.try_admit(court_id, user_id)[0] == Admission.ADMITTED
+
+    def check_out(self, court_id: str, user_id: str, now: Optional[datetime] = None) -> bool:
+        """Remove a player and hand the slot to the waitlist; False if they were not on the court"""
+        members = self._members.get(court_id)
+        if not members or user_id not in members:
+            return False
+        members.discard(user_id)
+        if not members:
+            del self._members[court_id]
+        self._fill_slots(court_id, now or datetime.utcnow())
+        return True
+
+    def leave_waitlist(self, court_id: str, user_id: str, now: Optional[datetime] = None) -> bool:
+        """Drop a player from the line, giving up any hold they were offered"""
+        removed = self._leave_waitlist(court_id, user_id)
+        if self._release_hold(court_id, user_id):
+            removed = True
+            self._fill_slots(court_id, now or datetime.utcnow())
+        return removed
+
+    def expire_holds(self, now: Optional[datetime] = None) -> int:
+        """Release holds nobody claimed in time, on every court"""
+        now = now or datetime.utcnow()
+        return sum(self._expire_holds(court_id, now) for court_id in list(self._holds))
+
+    def drain_promotions(self) -> List[Tuple[str, str, datetime]]:
+        """(court_id, user_id, hold expiry) for every promotion since the last call"""
+        promotions, self._promotions = self._promotions, []
+        return promotions
+
+    def _leave_waitlist(self, court_id: str, user_id: str) -> bool:
+        waitlist = self._waitlists.get(court_id)
+        if not waitlist or user_id not in waitlist:
+            return False
+        del waitlist[user_id]
+        if not waitlist:
+            del self._waitlists[court_id]
+        return True
+
+    def _release_hold(self, court_id: str, user_id: str) -> bool:
+        holds = self._holds.get(court_id)
+        if not holds or holds.pop(user_id, None) is None:
+            return False
+        if not holds:
+            del self._holds[court_id]
+        return True
+
+    def _expire_holds(self, court_id: str, now: datetime) -> int:
+        holds = self._holds.get(court_id)
+        if not holds:
+            return 0
+        expired = [user_id for user_id, expires_at in holds.items() if expires_at <= now]
+        for user_id in expired:
+            self._release_hold(court_id, user_id)
+        if expired:
+            self.expired_holds += len(expired)
+            self._fill_slots(court_id, now)
+        return len(expired)
+
+    def _fill_slots(self, court_id: str, now: datetime):
+        capacity = self._capacity.get(court_id)
+        waitlist = self._waitlists.get(court_id)
+        if capacity is None or not waitlist:
+            return
+        expires_at = now + timedelta(seconds=self.hold_seconds)
+        while waitlist and self.count(court_id) + len(self._holds.get(court_id, ())) < capacity:
+            user_id, _ = waitlist.popitem(last=False)
+            self._holds.setdefault(court_id, {})[user_id] = expires_at
+            self._promotions.append((court_id, user_id, expires_at))
+            self.promoted += 1
+        if not waitlist:
+            del self._waitlists[court_id]
+
+    def is_present(self, court_id: str, user_id: str) -> bool:
+        return user_id in self._members.get(court_id, ())
+
+    def count(self, court_id: str) -> int:
+        return len(self._members.get(court_id, ()))
+
+    def members(self, court_id: str) -> FrozenSet[str]:
+        return frozenset(self._members.get(court_id, ()))
+
+    def waitlist(self, court_id: str) -> List[str]:
+        return list(self._waitlists.get(court_id, ()))
+
+    def holds(self, court_id: str) -> Dict[str, datetime]:
+        return dict(self._holds.get(court_id, {}))
+
+    def stats(self) -> dict:
+        return {
+            "courts": len(self._members),
+            "players": sum(len(members) for members in self._members.values()),
+            "waitlisted": sum(len(waitlist) for waitlist in self._waitlists.values()),
+            "holds": sum(len(holds) for holds in self._holds.values()),
+            "admitted_total": self.admitted,
+            "waitlisted_total": self.waitlisted,
+            "promoted_total": self.promoted,
+            "expired_holds_total": self.expired_holds,
+            "age_seconds": round(time.monotonic() - self.loaded_at, 1) if self.loaded_at else None
+        }
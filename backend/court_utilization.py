@@ -0,0 +1,246 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from collections import OrderedDict
+from datetime import date, datetime, time as day_time, timedelta, timezone, tzinfo
+
+import numpy as np
+
+HOURS_PER_DAY = 24
+# Days that ended at least this long ago are final (sessions are capped well below it) and cached
+UTILIZATION_SETTLE = timedelta(days=1)
+UTILIZATION_CACHE_DAYS = 100_000
+MAX_UTILIZATION_RANGE_DAYS = 366
+
+def to_epoch_seconds(values: Sequence[Any]) -> np.ndarray:
+    """Naive-UTC datetimes (or ISO strings, or None -> NaN) as float epoch seconds"""
+    stamps = np.array(values, dtype="datetime64[ms]")
+    seconds = stamps.astype(np.int64).astype(np.float64) / 1e3
+    seconds[np.isnat(stamps)] = np.nan
+    return seconds
+
+def _epoch(moment: datetime) -> float:
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+def hour_edges(day: date, tz: tzinfo) -> Tuple[np.ndarray, np.ndarray]:
+    """Epoch-second edges of each local hour of ``day`` and the local hour each bin starts at.
+
+    DST days have 23 or 25 bins.
+    """
+    start = datetime.combine(day, day_time(), tzinfo=tz).astimezone(timezone.utc)
+    end = datetime.combine(day + timedelta(days=1), day_time(), tzinfo=tz).astimezone(timezone.utc)
+    hours = int(round((end - start).total_seconds() / 3600))
+    edges = start.timestamp() + 3600.0 * np.arange(hours + 1)
+    labels = np.array([
+        datetime.fromtimestamp(edge, timezone.utc).astimezone(tz).hour for edge in edges[:-1]
+    ])
+    return edges, labels
+
+def occupancy_seconds(check_ins: np.ndarray, check_outs: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Player-seconds on court inside each [edges[i], edges[i+1]) bin.
+
+    Interval sweep: with A(t) = sum(max(0, t - in)) - sum(max(0, t - out)), the
+    occupancy in a bin is A(right) - A(left). Sorting plus prefix sums make every
+    A(t) a binary search, so the cost is O((sessions + bins) log sessions).
+    """
+    if len(check_ins) == 0:
+        return np.zeros(len(edges) - 1)
+    ins = np.sort(check_ins)
+    outs = np.sort(check_outs)
+    in_prefix = np.concatenate(([0.0], np.cumsum(ins)))
+    out_prefix = np.concatenate(([0.0], np.cumsum(outs)))
+    started = np.searchsorted(ins, edges, side="right")
+    ended = np.searchsorted(outs, edges, side="right")
+    area = (started * edges - in_prefix[started]) - (ended * edges - out_prefix[ended])
+    return np.diff(area)
+
+def peak_concurrency(check_ins: np.ndarray, check_outs: np.ndarray) -> int:
+    """Most players on court at once; a check-out and check-in at the same instant do not overlap"""
+    if len(check_ins) == 0:
+        return 0
+    times = np.concatenate((check_outs, check_ins))
+    deltas = np.concatenate((-np.ones(len(check_outs)), np.ones(len(check_ins))))
+    # Stable sort keeps check-outs ahead of check-ins at equal times
+    order = np.argsort(times, kind="stable")
+    return int(np.cumsum(deltas[order]).max())
+
+class DayUtilization:
+    """One court's usage over one local day"""
+
+    __slots__ = ("day", "hourly_seconds", "peak_concurrent", "sessions", "session_seconds", "user_ids")
+
+    def __init__(self, day: date, hourly_seconds: np.ndarray, peak_concurrent: int,
+                 sessions: int, session_seconds: float, user_ids: frozenset):
+        self.day = day
+        self.hourly_seconds = hourly_seconds  # Player-seconds per local hour of day (24 slots)
+        self.peak_concurrent = peak_concurrent
+        self.sessions = sessions  # Closed sessions that checked in this day
+        self.session_seconds = session_seconds
+        self.user_ids = user_ids
+
+def compute_day(
+    day: date,
+    tz: tzinfo,
+    check_ins: np.ndarray,
+    check_outs: np.ndarray,
+    closed: np.ndarray,
+    user_ids: np.ndarray
+) -> DayUtilization:
+    """Usage for one day from arrays of sessions (open ones already clamped to now)"""
+    edges, labels = hour_edges(day, tz)
+    overlaps = (check_ins < edges[-1]) & (check_outs > edges[0])
+    day_ins = np.clip(check_ins[overlaps], edges[0], edges[-1])
+    day_outs = np.clip(check_outs[overlaps], edges[0], edges[-1])
+
+    hourly = np.zeros(HOURS_PER_DAY)
+    np.add.at(hourly, labels, occupancy_seconds(day_ins, day_outs, edges))
+
+    started_today = (check_ins >= edges[0]) & (check_ins < edges[-1]) & closed
+    return DayUtilization(
+        day=day,
+        hourly_seconds=hourly,
+        peak_concurrent=peak_concurrency(day_ins, day_outs),
+        sessions=int(started_today.sum()),
+        session_seconds=float((check_outs[started_today] - check_ins[started_today]).sum()),
+        user_ids=frozenset(user_ids[overlaps].tolist())
+    )
+
+def summarize(court_id: str, days: List[DayUtilization], capacity: Optional[int], tz_name: str) -> Dict[str, Any]:
+    """Roll a run of days up into curves and headline numbers"""
+    hourly_seconds = np.sum([day.hourly_seconds for day in days], axis=0) if days else np.zeros(HOURS_PER_DAY)
+    # Average players on court in each local hour of the day
+    hourly_occupancy = hourly_seconds / (3600.0 * max(len(days), 1))
+    sessions = sum(day.sessions for day in days)
+    session_seconds = sum(day.session_seconds for day in days)
+    average_occupancy = float(hourly_occupancy.mean())
+    return {
+        "court_id": court_id,
+        "timezone": tz_name,
+        "days": len(days),
+        "capacity": capacity,
+        "hourly_occupancy": np.round(hourly_occupancy, 3).tolist(),
+        "hourly_utilization": np.round(hourly_occupancy / capacity, 4).tolist() if capacity else None,
+        "peak_hours": [int(hour) for hour in np.argsort(-hourly_occupancy, kind="stable")[:3] if hourly_occupancy[hour] > 0],
+        "peak_concurrent": max((day.peak_concurrent for day in days), default=0),
+        "average_occupancy": round(average_occupancy, 3),
+        "utilization": round(average_occupancy / capacity, 4) if capacity else None,
+        "player_hours": round(float(hourly_seconds.sum()) / 3600.0, 2),
+        "sessions": sessions,
+        "average_session_minutes": round(session_seconds / sessions / 60.0, 1) if sessions else None,
+        "unique_visitors": len(frozenset().union(*(day.user_ids for day in days))),
+        "daily": [
+            {
+                "date": day.day.isoformat(),
+                "player_hours": round(float(day.hourly_seconds.sum()) / 3600.0, 2),
+                "peak_concurrent": day.peak_concurrent,
+                "sessions": day.sessions,
+                "unique_visitors": len(day.user_ids)
+            }
+            for day in days
+        ]
+    }
+
+class UtilizationEngine:
+    """Per-court, per-day usage computed from court_presence and cached once a day is final.
+
+    A request only reads presence for the days it does not already have, in
+    one query covering all requested courts. Presence written back-dated into a
+    cached day (offline uploads, sweeper closes) must call ``invalidate``.
+    """
+
+    def __init__(self, max_cached_days: int = UTILIZATION_CACHE_DAYS, settle: timedelta = UTILIZATION_SETTLE):
+        self.max_cached_days = max_cached_days
+        self.settle = settle
+        self._days: "OrderedDict[Tuple[str, str, date], DayUtilization]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def court_days(
+        self,
+        courts: Dict[str, Tuple[tzinfo, str]],
+        first_day: date,
+        last_day: date,
+        collection,
+        now: Optional[datetime] = None
+    ) -> Dict[str, List[DayUtilization]]:
+        """DayUtilization for each court (court_id -> (tz, tz name)) and each day in [first_day, last_day]"""
+        now = now or datetime.utcnow()
+        days = [first_day + timedelta(days=offset) for offset in range((last_day - first_day).days + 1)]
+        result: Dict[str, List[Optional[DayUtilization]]] = {court_id: [None] * len(days) for court_id in courts}
+        missing: Dict[str, List[int]] = {}
+        for court_id, (_, tz_name) in courts.items():
+            for index, day in enumerate(days):
+                cached = self._days.get((court_id, tz_name, day))
+                if cached is not None:
+                    self._days.move_to_end((court_id, tz_name, day))
+                    result[court_id][index] = cached
+                    self.hits += 1
+                else:
+                    missing.setdefault(court_id, []).append(index)
+                    self.misses += 1
+        if missing:
+            await self._fill(courts, days, missing, result, collection, now)
+        return result
+
+    async def _fill(self, courts, days, missing, result, collection, now: datetime):
+        # Widest window any missing day can need, padded a day for timezones
+        window_start = datetime.combine(min(days[index] for indexes in missing.values() for index in indexes), day_time()) - timedelta(days=1)
+        window_end = datetime.combine(max(days[index] for indexes in missing.values() for index in indexes), day_time()) + timedelta(days=2)
+        rows = await collection.find(
+            {
+                "court_id": {"$in": list(missing)},
+                "check_in_time": {"$lt": window_end},
+                "$or": [{"check_out_time": None}, {"check_out_time": {"$gte": window_start}}]
+            },
+            {"_id": 0, "court_id": 1, "user_id": 1, "check_in_time": 1, "check_out_time": 1}
+        ).to_list(None)
+
+        by_court: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            by_court.setdefault(row["court_id"], []).append(row)
+
+        now_seconds = _epoch(now)
+        for court_id, indexes in missing.items():
+            tz, tz_name = courts[court_id]
+            court_rows = by_court.get(court_id, [])
+            check_ins = to_epoch_seconds([row["check_in_time"] for row in court_rows])
+            check_outs = to_epoch_seconds([row.get("check_out_time") for row in court_rows])
+            closed = ~np.isnan(check_outs)
+            # Sessions still open count up to now; a check-out stamped before its check-in counts as zero length
+            check_outs = np.maximum(np.where(closed, check_outs, now_seconds), check_ins)
+            user_ids = np.array([row["user_id"] for row in court_rows], dtype=object)
+            for index in indexes:
+                day = days[index]
+                utilization = compute_day(day, tz, check_ins, check_outs, closed, user_ids)
+                result[court_id][index] = utilization
+                day_end = datetime.combine(day + timedelta(days=1), day_time(), tzinfo=tz)
+                if day_end.astimezone(timezone.utc).replace(tzinfo=None) + self.settle <= now:
+                    self._remember((court_id, tz_name, day), utilization)
+
+    def invalidate(self, court_id: str, since: datetime, now: Optional[datetime] = None):
+        """Forget cached days of ``court_id`` that a presence change from ``since`` onwards may alter"""
+        now = now or datetime.utcnow()
+        if since + self.settle > now:
+            return  # Only days that ended before now - settle are cached
+        # A day earlier covers the local date in any court timezone
+        first_day = (since - timedelta(days=1)).date()
+        stale = [key for key in self._days if key[0] == court_id and key[2] >= first_day]
+        for key in stale:
+            del self._days[key]
+        self.invalidations += len(stale)
+
+    def _remember(self, key, utilization: DayUtilization):
+        self._days[key] = utilization
+        if len(self._days) > self.max_cached_days:
+            self._days.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "cached_days": len(self._days),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None
+        }
@@ -0,0 +1,24 @@
+from typing import Any, Dict, Optional
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+# Courts this close count as equally near, so the emptier one ranks first
+NEAR_DISTANCE_BAND_KM = 0.5
+MAX_NEAR_RADIUS_KM = 200.0
+
+def geo_point(latitude: Optional[float], longitude: Optional[float]) -> Optional[Dict[str, Any]]:
+    """GeoJSON Point for a 2dsphere index (coordinates are longitude first)"""
+    if latitude is None or longitude is None:
+        return None
+    return {"type": "Point", "coordinates": [longitude, latitude]}
+
+def haversine_km(latitude1: float, longitude1: float, latitude2: float, longitude2: float) -> float:
+    phi1, phi2 = math.radians(latitude1), math.radians(latitude2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(longitude2 - longitude1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def near_rank(distance_km: float, current_count: int, max_players: int) -> tuple:
+    """Sort key: distance band first, then how full the court is"""
+    return (int(distance_km // NEAR_DISTANCE_BAND_KM), current_count / max_players if max_players else 1.0, distance_km)
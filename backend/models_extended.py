@@ -1,6 +1,6 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional, Dict, Any
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
 import uuid
 
@@ -23,6 +23,7 @@ class RFIDEventType(str, Enum):
     CHECK_OUT = "check_out"
     ACCESS_GRANTED = "access_granted"
     ACCESS_DENIED = "access_denied"
+    WAITLISTED = "waitlisted"  # Court at capacity; not a denial
 
 class PresenceStatus(str, Enum):
     CHECKED_IN = "checked_in"
@@ -54,8 +55,18 @@ class RFIDEvent(BaseModel):
     location: Optional[str] = None
     device_id: Optional[str] = None
     timestamp: datetime = Field(default_factory=datetime.utcnow)
+    local_seq: Optional[int] = None  # Reader-assigned sequence for offline uploads
     metadata: Dict[str, Any] = {}
 
+class RFIDEventRollup(BaseModel):
+    court_id: str
+    period_start: datetime  # Hour or day, UTC
+    check_ins: int = 0
+    check_outs: int = 0
+    denials: int = 0
+    waitlisted: int = 0
+    unique_users: int = 0
+
 # Court Presence Tracking
 class CourtPresence(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -66,6 +77,7 @@ class CourtPresence(BaseModel):
     check_out_time: Optional[datetime] = None
     rfid_card_uid: Optional[str] = None
     current_activity: Optional[str] = None  # "playing", "practicing", "waiting"
+    auto_checkout_reason: Optional[str] = None  # Set when the presence sweeper closed the session
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -159,7 +171,8 @@ class ChallengeMatchmaking(BaseModel):
     user_id: str
     preferred_skill_levels: List[str] = []
     preferred_game_types: List[str] = []
-    max_distance: Optional[float] = None  # km from user's location
+    max_distance: Optional[float] = None  # km between home courts
+    home_court_id: Optional[str] = None  # Where the player usually plays; anchors max_distance
     available_times: List[Dict[str, str]] = []  # [{"day": "monday", "start": "18:00", "end": "20:00"}]
     stakes_range: Dict[str, float] = {"min": 0.0, "max": 100.0}
     is_active: bool = True
@@ -177,6 +190,45 @@ class RFIDCheckOutRequest(BaseModel):
     court_id: str
     device_id: Optional[str] = None
 
+class RFIDTapAction(str, Enum):
+    CHECK_IN = "check_in"
+    CHECK_OUT = "check_out"
+
+class RFIDTap(BaseModel):
+    card_uid: str
+    court_id: str
+    action: RFIDTapAction
+    timestamp: datetime  # When the reader saw the card
+    local_seq: Optional[int] = None  # Required for offline uploads, unique per device
+    offline_granted: Optional[bool] = None  # Whether the reader let the card in while offline
+
+    @field_validator("timestamp")
+    @classmethod
+    def naive_utc(cls, value: datetime) -> datetime:
+        # Readers may send offsets or "Z"; stored times are naive UTC, and mixing the two breaks ordering
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+class RFIDBatchRequest(BaseModel):
+    device_id: str
+    taps: List[RFIDTap]
+
+class RFIDReaderTapUpload(BaseModel):
+    taps: List[RFIDTap]
+
+class RFIDReader(BaseModel):
+    device_id: str
+    court_id: str  # The one court this reader's card snapshots and taps are for
+    name: Optional[str] = None
+    is_active: bool = True
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class RFIDReaderCreate(BaseModel):
+    device_id: str
+    court_id: str
+    name: Optional[str] = None
+
 class TournamentCreate(BaseModel):
     name: str
     description: str
@@ -0,0 +1,41 @@
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime
+import base64
+import json
+
+# Response header carrying the cursor for the next page; absent on the last page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+class InvalidCursor(ValueError):
+    """A cursor that was not produced by encode_cursor"""
+
+def encode_cursor(timestamp: datetime, item_id: str) -> str:
+    """Opaque token for the position just after (timestamp, id)"""
+    raw = json.dumps([timestamp.isoformat(), item_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, item_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), str(item_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor {cursor!r}") from e
+
+def keyset_filter(field: str, cursor: str) -> Dict[str, Any]:
+    """Clause selecting the rows after ``cursor`` in (field desc, id desc) order"""
+    timestamp, item_id = decode_cursor(cursor)
+    return {"$or": [
+        {field: {"$lt": timestamp}},
+        {field: timestamp, "id": {"$lt": item_id}}
+    ]}
+
+def keyset_sort(field: str) -> List[Tuple[str, int]]:
+    # "id" breaks ties between rows stamped in the same millisecond
+    return [(field, -1), ("id", -1)]
+
+def next_cursor(page: List[Dict[str, Any]], field: str, limit: int) -> Optional[str]:
+    if len(page) < limit or not page:
+        return None
+    last = page[-1]
+    return encode_cursor(last[field], last["id"])
@@ -184,7 +184,6 @@ async def populate_sample_data():
             "lighting": True,
             "covered": True,
             "max_players": 10,
-            "current_players": [],
             "images": [
                 "https://images.unsplash.com/photo-1546519638-68e109498ffc?w=800",
                 "https://images.unsplash.com/photo-1574952897370-2c20d86b2b57?w=800"
@@ -219,7 +218,6 @@ async def populate_sample_data():
             "lighting": True,
             "covered": False,
             "max_players": 10,
-            "current_players": [],
             "images": [
                 "https://images.unsplash.com/photo-1594736797933-d0c90fe6e9d4?w=800",
                 "https://images.unsplash.com/photo-1551698618-1dfe5d97d256?w=800"
@@ -254,7 +252,6 @@ async def populate_sample_data():
             "lighting": True,
             "covered": True,
             "max_players": 12,
-            "current_players": [],
             "images": [
                 "https://images.unsplash.com/photo-1571019613454-1cb2f99b2d8b?w=800",
                 "https://images.unsplash.com/photo-1544551763-46a013bb70d5?w=800"
@@ -131,12 +131,6 @@ async def populate_phase2_data():
                 "updated_at": checkin_time
             }
             court_presence.append(presence)
-            
-            # Update court's current players
-            await db.courts.update_one(
-                {"id": court["id"]},
-                {"$addToSet": {"current_players": user["id"]}}
-            )
     
     await db.rfid_events.insert_many(rfid_events)
     await db.court_presence.insert_many(court_presence)
@@ -0,0 +1,107 @@
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import time
+
+from access_policy import HOURS_EXEMPT_CARD_TYPES, CourtPolicy
+from rfid_card_cache import coerce_datetime
+
+logger = logging.getLogger(__name__)
+
+# Longest session on a court without its own max_session_minutes
+DEFAULT_MAX_SESSION = timedelta(hours=4)
+SWEEP_INTERVAL_SECONDS = 60.0
+
+SESSION_CAP = "session_cap"
+COURT_CLOSED = "court_closed"
+
+# (open court_presence row, check-out time to record, reason)
+StaleSession = Tuple[Dict[str, Any], datetime, str]
+SweepFunction = Callable[[], Awaitable[Dict[str, int]]]
+
+def find_stale_sessions(
+    rows: Iterable[Dict[str, Any]],
+    policy_for: Callable[[str], Optional[CourtPolicy]],
+    now: datetime,
+    default_max_session: timedelta = DEFAULT_MAX_SESSION,
+    card_types: Optional[Dict[str, str]] = None
+) -> List[StaleSession]:
+    """Open sessions to close: past the court's session cap, or at a court that is now closed.
+
+    A capped session is closed at the moment the cap ran out, so its recorded
+    duration is the cap rather than however long it took the sweeper to notice.
+    ``card_types`` (card_uid -> card_type) spares cards that may stay after hours.
+    """
+    card_types = card_types or {}
+    stale = []
+    for row in rows:
+        policy = policy_for(row["court_id"])
+        max_session = policy.max_session if policy is not None and policy.max_session else default_max_session
+        cap_reached_at = coerce_datetime(row["check_in_time"]) + max_session
+        if cap_reached_at <= now:
+            stale.append((row, cap_reached_at, SESSION_CAP))
+        elif (
+            policy is not None
+            and card_types.get(row.get("rfid_card_uid")) not in HOURS_EXEMPT_CARD_TYPES
+            and not policy.is_open(now)
+        ):
+            stale.append((row, now, COURT_CLOSED))
+    return stale
+
+class PresenceSweeper:
+    """Runs ``sweep`` every ``interval`` seconds and keeps per-run counts"""
+
+    def __init__(self, sweep: SweepFunction, interval: float = SWEEP_INTERVAL_SECONDS):
+        self.sweep = sweep
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.failures = 0
+        self.total_closed = 0
+        self.last_run: Optional[dict] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def run_once(self) -> Dict[str, int]:
+        started = time.perf_counter()
+        closed = await self.sweep()
+        self.runs += 1
+        self.total_closed += sum(closed.values())
+        self.last_run = {
+            "at": datetime.utcnow().isoformat(),
+            "closed": sum(closed.values()),
+            "by_reason": closed,
+            "duration_ms": round((time.perf_counter() - started) * 1e3, 1)
+        }
+        if closed:
+            logger.info(f"Presence sweep closed {sum(closed.values())} sessions: {closed}")
+        return closed
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Keep sweeping; one bad run must not leave sessions open forever
+                self.failures += 1
+                logger.error(f"Presence sweep failed: {e!r}")
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "total_closed": self.total_closed,
+            "last_run": self.last_run
+        }
@@ -0,0 +1,105 @@
+from typing import Any, Dict, Iterable, Optional
+from datetime import datetime, timedelta
+import base64
+import calendar
+import hashlib
+import hmac
+import json
+import secrets
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+
+from rfid_card_cache import coerce_datetime
+
+# Bump when the snapshot layout changes; readers reject versions they do not know
+READER_SYNC_SCHEMA_VERSION = 3
+# Readers must stop validating offline once a snapshot is this old
+READER_SNAPSHOT_TTL = timedelta(hours=24)
+SIGNATURE_ALGORITHM = "Ed25519"
+
+def reader_digest_key(server_key: bytes, device_id: str) -> bytes:
+    """Per-reader card digest key, so one compromised reader exposes only its own snapshots"""
+    return hmac.new(server_key, b"card-digest:" + device_id.encode("utf-8"), hashlib.sha256).digest()
+
+def card_uid_digest(card_uid: str, digest_key: bytes) -> str:
+    """Readers match taps by keyed hash: a leaked snapshot cannot be brute-forced back to card UIDs without the key"""
+    return hmac.new(digest_key, card_uid.encode("utf-8"), hashlib.sha256).hexdigest()[:32]
+
+def new_reader_key() -> str:
+    return secrets.token_urlsafe(32)
+
+def reader_key_hash(reader_key: str) -> str:
+    # Reader keys are random 256-bit tokens, so a plain hash is enough to store them
+    return hashlib.sha256(reader_key.encode("utf-8")).hexdigest()
+
+def load_signing_key(encoded: str) -> Ed25519PrivateKey:
+    """Snapshot signing key from its base64 32-byte seed"""
+    return Ed25519PrivateKey.from_private_bytes(base64.b64decode(encoded))
+
+def public_key_b64(private_key: Ed25519PrivateKey) -> str:
+    return base64.b64encode(private_key.public_key().public_bytes(Encoding.Raw, PublicFormat.Raw)).decode("ascii")
+
+def _canonical(payload: Dict[str, Any]) -> bytes:
+    return json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+def sign_payload(payload: Dict[str, Any], private_key: Ed25519PrivateKey) -> str:
+    return base64.b64encode(private_key.sign(_canonical(payload))).decode("ascii")
+
+def verify_payload(payload: Dict[str, Any], signature: str, public_key: Ed25519PublicKey) -> bool:
+    """What a reader does with the public key it was provisioned with"""
+    try:
+        public_key.verify(base64.b64decode(signature), _canonical(payload))
+    except (InvalidSignature, ValueError):
+        return False
+    return True
+
+def _epoch_seconds(value: Optional[datetime]) -> Optional[int]:
+    return calendar.timegm(value.utctimetuple()) if value is not None else None
+
+def build_card_sync(
+    cards: Iterable[Dict[str, Any]],
+    version: int,
+    since_version: Optional[int],
+    court_id: str,
+    device_id: str,
+    digest_key: bytes,
+    now: Optional[datetime] = None,
+    court_policy: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Full (since_version None) or delta card list for one reader.
+
+    Each card is ``{"h": uid digest, "l": access level, "x": expiry epoch
+    seconds or null}``; ``revoked`` lists digests the reader must forget.
+    Digests are keyed with the reader's own ``digest_key``.
+    ``policy`` carries the court's required level and opening hours so the
+    reader applies the same access rules while offline.
+    """
+    now = now or datetime.utcnow()
+    upserts = []
+    revoked = []
+    for card in cards:
+        digest = card_uid_digest(card["card_uid"], digest_key)
+        expiry_date = coerce_datetime(card.get("expiry_date"))
+        if not card.get("is_active", False) or (expiry_date is not None and expiry_date < now):
+            revoked.append(digest)
+            continue
+        upserts.append({
+            "h": digest,
+            "l": card.get("access_level", 1),
+            "x": _epoch_seconds(expiry_date)
+        })
+    return {
+        "schema": READER_SYNC_SCHEMA_VERSION,
+        "device_id": device_id,
+        "court_id": court_id,
+        "version": version,
+        "since_version": since_version,
+        "full": since_version is None,
+        "generated_at": _epoch_seconds(now),
+        "valid_until": _epoch_seconds(now + READER_SNAPSHOT_TTL),
+        "cards": upserts,
+        "revoked": revoked,
+        "policy": court_policy
+    }
@@ -0,0 +1,164 @@
+from typing import Any, Deque, Dict, Optional
+from collections import deque
+from datetime import datetime
+import asyncio
+import logging
+import time
+
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Full reload cadence, so deactivations made by other workers expire even without change streams
+CARD_REFRESH_SECONDS = 60.0
+# Lookup latencies kept for the stats percentiles
+LATENCY_SAMPLES = 1024
+
+def coerce_datetime(value: Any) -> Optional[datetime]:
+    """Motor returns BSON dates as datetime, older rows stored ISO strings; accept both"""
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    raise TypeError(f"Unsupported datetime value {value!r}")
+
+class CachedCard:
+    """The fields tap validation needs, with the expiry already parsed"""
+
+    __slots__ = ("card_uid", "card_id", "user_id", "access_level", "card_type", "expiry_date")
+
+    def __init__(self, card: Dict[str, Any]):
+        self.card_uid = card["card_uid"]
+        self.card_id = card.get("id")
+        self.user_id = card["user_id"]
+        self.access_level = card.get("access_level", 1)
+        self.card_type = card.get("card_type", "standard")
+        self.expiry_date = coerce_datetime(card.get("expiry_date"))
+
+    def is_expired(self, now: Optional[datetime] = None) -> bool:
+        return self.expiry_date is not None and self.expiry_date < (now or datetime.utcnow())
+
+class RFIDCardIndex:
+    """Process-local index of active RFID cards keyed by card_uid.
+
+    Loaded at startup and kept fresh by the card endpoints on this worker, a
+    periodic reload and, where MongoDB runs as a replica set, a change stream.
+    A miss falls back to one database read so a card issued on another worker
+    still validates before the next refresh.
+    """
+
+    def __init__(self, refresh_seconds: float = CARD_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._cards: Dict[str, CachedCard] = {}
+        self._tasks = []
+        self.loaded_at: Optional[float] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    async def load(self, collection):
+        cards = {}
+        async for card in collection.find({"is_active": True}):
+            cards[card["card_uid"]] = CachedCard(card)
+        # Swap in one step so lookups never see a half-built index
+        self._cards = cards
+        self.loaded_at = time.monotonic()
+        logger.info(f"RFID card index loaded {len(cards)} active cards")
+
+    def upsert(self, card: Dict[str, Any]):
+        if card.get("is_active", True):
+            self._cards[card["card_uid"]] = CachedCard(card)
+        else:
+            self.invalidate(card["card_uid"])
+
+    def invalidate(self, card_uid: str):
+        if self._cards.pop(card_uid, None) is not None:
+            self.invalidations += 1
+
+    def get(self, card_uid: str) -> Optional[CachedCard]:
+        return self._cards.get(card_uid)
+
+    async def lookup(self, card_uid: str, collection) -> Optional[CachedCard]:
+        """Active card for a tap; hits never touch the database"""
+        started = time.perf_counter()
+        card = self._cards.get(card_uid)
+        if card is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            doc = await collection.find_one({"card_uid": card_uid, "is_active": True})
+            if doc is not None:
+                card = self._cards[card_uid] = CachedCard(doc)
+        self._latencies.append(time.perf_counter() - started)
+        return card
+
+    async def lookup_many(self, card_uids, collection) -> Dict[str, CachedCard]:
+        """Active cards for a batch of taps, with a single $in query for the misses"""
+        found = {}
+        missing = []
+        for card_uid in set(card_uids):
+            card = self._cards.get(card_uid)
+            if card is not None:
+                found[card_uid] = card
+            else:
+                missing.append(card_uid)
+        self.hits += len(found)
+        self.misses += len(missing)
+        if missing:
+            async for doc in collection.find({"card_uid": {"$in": missing}, "is_active": True}):
+                found[doc["card_uid"]] = self._cards[doc["card_uid"]] = CachedCard(doc)
+        return found
+
+    def start(self, collection, watch: bool = False):
+        self._tasks.append(asyncio.create_task(self._refresh_loop(collection)))
+        if watch:
+            self._tasks.append(asyncio.create_task(self._watch(collection)))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _refresh_loop(self, collection):
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                await self.load(collection)
+            except PyMongoError as e:
+                logger.error(f"RFID card index refresh failed: {e!r}")
+
+    async def _watch(self, collection):
+        """Apply card changes as they happen (needs a replica set)"""
+        while True:
+            try:
+                async with collection.watch(full_document="updateLookup") as stream:
+                    async for change in stream:
+                        card = change.get("fullDocument")
+                        if card is not None:
+                            self.upsert(card)
+                        elif change["operationType"] == "delete":
+                            # Deletes carry only the _id; rebuild rather than keep a reverse map
+                            await self.load(collection)
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                logger.error(f"RFID card change stream stopped: {e!r}")
+                await asyncio.sleep(self.refresh_seconds)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        latencies = sorted(self._latencies)
+        return {
+            "entries": len(self._cards),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations,
+            "lookup_us": {
+                "p50": round(latencies[len(latencies) // 2] * 1e6, 1) if latencies else None,
+                "p99": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1e6, 1) if latencies else None
+            },
+            "age_seconds": round(time.monotonic() - self.loaded_at, 1) if self.loaded_at else None
+        }
@@ -0,0 +1,100 @@
+from typing import Any, Dict, Iterable, List, Tuple
+from datetime import datetime, timedelta, timezone
+import logging
+
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Raw events older than this are expired by MongoDB; 0 keeps them forever
+RFID_EVENT_RETENTION_DAYS = 90
+# Hourly rollups are small, so dashboards keep years of history
+RFID_ROLLUP_RETENTION_DAYS = 730
+
+# RFIDEvent.event_type -> counter in the hourly rollup document
+ROLLUP_COUNTERS = {
+    "check_in": "check_ins",
+    "check_out": "check_outs",
+    "access_denied": "denials",
+    "waitlisted": "waitlisted"
+}
+INDEX_OPTIONS_CONFLICT = 85
+
+def hour_bucket(timestamp: datetime) -> datetime:
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+def rollup_updates(events: Iterable[Dict[str, Any]]) -> List[UpdateOne]:
+    """Upserts folding a batch of events into per-court hourly counters"""
+    buckets: Dict[Tuple[str, datetime], Dict[str, Any]] = {}
+    for event in events:
+        counter = ROLLUP_COUNTERS.get(event["event_type"])
+        if counter is None:
+            continue
+        bucket = buckets.setdefault(
+            (event["court_id"], hour_bucket(event["timestamp"])),
+            {"counts": {}, "user_ids": set()}
+        )
+        bucket["counts"][counter] = bucket["counts"].get(counter, 0) + 1
+        if event["user_id"] != "unknown":
+            bucket["user_ids"].add(event["user_id"])
+    updates = []
+    for (court_id, hour), bucket in buckets.items():
+        update = {"$inc": bucket["counts"]}
+        if bucket["user_ids"]:
+            update["$addToSet"] = {"user_ids": {"$each": sorted(bucket["user_ids"])}}
+        updates.append(UpdateOne({"court_id": court_id, "hour": hour}, update, upsert=True))
+    return updates
+
+def merge_rollups(docs: Iterable[Dict[str, Any]], granularity: str = "hour") -> List[Dict[str, Any]]:
+    """Hourly rollup documents as hourly or daily rows, oldest first"""
+    rows: Dict[Tuple[str, datetime], Dict[str, Any]] = {}
+    for doc in docs:
+        period_start = doc["hour"]
+        if granularity == "day":
+            period_start = period_start.replace(hour=0)
+        row = rows.setdefault((doc["court_id"], period_start), {
+            "court_id": doc["court_id"],
+            "period_start": period_start,
+            "check_ins": 0,
+            "check_outs": 0,
+            "denials": 0,
+            "waitlisted": 0,
+            "user_ids": set()
+        })
+        for counter in ROLLUP_COUNTERS.values():
+            row[counter] += doc.get(counter, 0)
+        row["user_ids"].update(doc.get("user_ids", []))
+    result = []
+    for key in sorted(rows, key=lambda key: (key[1], key[0])):
+        row = rows[key]
+        row["unique_users"] = len(row.pop("user_ids"))
+        result.append(row)
+    return result
+
+async def ensure_retention(collection, field: str, days: int):
+    """TTL index on ``field``, adjusting its expiry in place if it already exists"""
+    if days <= 0:
+        try:
+            await collection.create_index(field)
+        except OperationFailure as e:
+            if e.code != INDEX_OPTIONS_CONFLICT:
+                raise
+            # collMod cannot remove a TTL, so rebuild the index without one
+            await collection.drop_index([(field, 1)])
+            await collection.create_index(field)
+            logger.info(f"Retention on {collection.name}.{field} removed; documents are kept")
+        return
+    expire_after = int(timedelta(days=days).total_seconds())
+    try:
+        await collection.create_index(field, expireAfterSeconds=expire_after)
+    except OperationFailure as e:
+        if e.code != INDEX_OPTIONS_CONFLICT:
+            raise
+        await collection.database.command(
+            "collMod", collection.name,
+            index={"keyPattern": {field: 1}, "expireAfterSeconds": expire_after}
+        )
+        logger.info(f"Retention on {collection.name}.{field} changed to {days} days")
@@ -1,12 +1,17 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, WebSocket, WebSocketDisconnect, Response, Query, Header
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from dotenv import load_dotenv
 from pathlib import Path
 import os
+import asyncio
+import base64
 import logging
-from datetime import datetime, timedelta
+import time
+from datetime import date, datetime, timedelta
 import jwt
 from passlib.context import CryptContext
 from pydantic import BaseModel, Field, EmailStr
@@ -18,6 +23,22 @@ import json
 # Import Phase 2 models and WebSocket manager
 from models_extended import *
 from websocket_manager import manager
+from broadcast_backplane import MongoBackplane
+from wire_format import negotiate_codec
+from ttl_cache import TTLCache
+from rfid_card_cache import RFIDCardIndex, coerce_datetime
+from reader_sync import (
+    SIGNATURE_ALGORITHM, build_card_sync, load_signing_key, new_reader_key, public_key_b64,
+    reader_digest_key, reader_key_hash, sign_payload
+)
+from access_policy import AccessPolicy
+from audit_writer import AuditWriter
+from rfid_rollups import rollup_updates, merge_rollups, ensure_retention
+from pagination import NEXT_CURSOR_HEADER, InvalidCursor, keyset_filter, keyset_sort, next_cursor
+from court_occupancy import Admission, CourtOccupancy
+from presence_sweeper import PresenceSweeper, find_stale_sessions
+from court_utilization import MAX_UTILIZATION_RANGE_DAYS, UtilizationEngine, summarize
+from geo import MAX_NEAR_RADIUS_KM, geo_point, haversine_km, near_rank
 
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
@@ -34,6 +55,49 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 SECRET_KEY = "basketball_m2dg_secret_key_2025"  # In production, use environment variable
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Verified WebSocket principals (user_id -> User), so reconnect storms skip db.users
+WS_PRINCIPAL_CACHE_TTL_SECONDS = float(os.environ.get("WS_PRINCIPAL_CACHE_TTL_SECONDS", 60))
+ws_principal_cache = TTLCache(WS_PRINCIPAL_CACHE_TTL_SECONDS, max_entries=50_000)
+# How long a new socket may take to send its {"type": "auth", "token": ...} frame
+WS_AUTH_TIMEOUT_SECONDS = float(os.environ.get("WS_AUTH_TIMEOUT_SECONDS", 10))
+# Ed25519 seed (base64) that signs reader card snapshots; readers only hold the public key
+RFID_READER_SIGNING_KEY = os.environ.get("RFID_READER_SIGNING_KEY")
+reader_signing_key = load_signing_key(RFID_READER_SIGNING_KEY) if RFID_READER_SIGNING_KEY else None
+# Server-side key each reader's card digest key is derived from; reader sync is off until both are set
+RFID_CARD_DIGEST_KEY = os.environ.get("RFID_CARD_DIGEST_KEY")
+# Largest tap batch a gate controller may upload in one request
+MAX_RFID_BATCH_TAPS = 500
+# Counter document bumped on every card change, so readers can ask for deltas
+RFID_CARD_VERSION_COUNTER = "rfid_cards"
+# Active RFID cards by card_uid, so taps validate without a database read
+rfid_card_index = RFIDCardIndex(float(os.environ.get("RFID_CARD_REFRESH_SECONDS", 60)))
+# Required access level and opening hours per court, so check-ins are decided without a query
+access_policy = AccessPolicy(
+    default_timezone=os.environ.get("COURT_DEFAULT_TIMEZONE"),
+    refresh_seconds=float(os.environ.get("ACCESS_POLICY_REFRESH_SECONDS", 60))
+)
+
+# Players on each court, rebuilt from open court_presence rows at startup
+court_occupancy = CourtOccupancy(hold_seconds=float(os.environ.get("WAITLIST_HOLD_SECONDS", 300)))
+# Per-court daily usage from court_presence, cached once each day is final
+utilization_engine = UtilizationEngine()
+# Raw RFID events expire after this many days (0 keeps them); hourly rollups keep the history
+RFID_EVENT_RETENTION_DAYS = int(os.environ.get("RFID_EVENT_RETENTION_DAYS", 90))
+RFID_ROLLUP_RETENTION_DAYS = int(os.environ.get("RFID_ROLLUP_RETENTION_DAYS", 730))
+
+async def record_rfid_rollups(events: List[Dict[str, Any]]):
+    """Fold stored RFID events into the per-court hourly counters"""
+    updates = rollup_updates(events)
+    if updates:
+        await db.rfid_event_rollups.bulk_write(updates, ordered=False)
+
+# RFID events are written in batches off the request path
+audit_writer = AuditWriter(
+    batch_size=int(os.environ.get("RFID_AUDIT_BATCH_SIZE", 500)),
+    flush_seconds=float(os.environ.get("RFID_AUDIT_FLUSH_SECONDS", 0.5)),
+    queue_limit=int(os.environ.get("RFID_AUDIT_QUEUE_LIMIT", 50_000)),
+    on_flush=record_rfid_rollups
+)
 
 # Create the main app
 app = FastAPI(title="M2DG Basketball Community API", version="2.0.0")
@@ -120,14 +184,20 @@ class Court(BaseModel):
     lighting: bool = False
     covered: bool = False
     max_players: int = 10
-    current_players: List[str] = []  # List of user IDs currently at court
+    current_count: int = 0  # Players on court now; filled from court_occupancy, never stored
     images: List[str] = []
     operating_hours: Dict[str, str] = {}
+    timezone: Optional[str] = None  # IANA name for operating_hours; COURT_DEFAULT_TIMEZONE when unset, hours unenforced without either
+    required_access_level: int = 1  # Lowest RFIDCard.access_level admitted
+    max_session_minutes: Optional[int] = None  # Open sessions longer than this are closed; PRESENCE_MAX_SESSION_HOURS when unset
     contact_info: Optional[str] = None
     booking_required: bool = False
     created_at: datetime = Field(default_factory=datetime.utcnow)
     is_active: bool = True
 
+class NearbyCourt(Court):
+    distance_km: float
+
 class Challenge(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     challenger_id: str
@@ -253,21 +323,41 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+def decode_access_token(token: str) -> dict:
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
+        if payload.get("sub") is None:
             raise HTTPException(status_code=401, detail="Invalid authentication credentials")
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+    return payload
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    user_id: str = decode_access_token(credentials.credentials)["sub"]
     
     user = await db.users.find_one({"id": user_id})
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
     return User(**user)
 
+async def get_websocket_user(token: Optional[str]) -> User:
+    """Same JWT checks as get_current_user, with the user lookup served from a short-TTL cache"""
+    if not token:
+        raise HTTPException(status_code=401, detail="Missing authentication token")
+    payload = decode_access_token(token)
+    user_id = payload["sub"]
+    
+    async def load_user():
+        user = await db.users.find_one({"id": user_id})
+        return User(**user) if user else None
+    
+    # Never cache a principal past its token's expiry
+    remaining = payload["exp"] - time.time() if "exp" in payload else None
+    user = await ws_principal_cache.get_or_load(user_id, load_user, remaining)
+    if user is None:
+        raise HTTPException(status_code=401, detail="User not found")
+    return user
+
 # Authentication Routes
 @api_router.post("/auth/register", response_model=Token)
 async def register(user_data: UserCreate):
@@ -380,24 +470,157 @@ async def get_user(user_id: str):
     return UserResponse(**user)
 
 # Court Routes
+# Older court documents still carry a current_players array; never ship it (nor the GeoJSON copy of lat/lng)
+COURT_PROJECTION = {"_id": 0, "current_players": 0, "geo": 0}
+
 @api_router.get("/courts", response_model=List[Court])
 async def get_courts(skip: int = 0, limit: int = 100):
-    courts = await db.courts.find({"is_active": True}).skip(skip).limit(limit).to_list(limit)
-    return [Court(**court) for court in courts]
+    courts = await db.courts.find({"is_active": True}, COURT_PROJECTION).skip(skip).limit(limit).to_list(limit)
+    return [Court(**court, current_count=court_occupancy.count(court["id"])) for court in courts]
+
+def utilization_range(start: Optional[date], end: Optional[date]) -> tuple:
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days + 1 > MAX_UTILIZATION_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_UTILIZATION_RANGE_DAYS} days per request")
+    return start, end
+
+# Declared before /courts/{court_id} so "utilization" is not taken for a court id
+@api_router.get("/courts/utilization")
+async def get_courts_utilization(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Usage summary for every active court, busiest first"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    start, end = utilization_range(start, end)
+    policies = {policy.court_id: policy for policy in access_policy.policies()}
+    days = await utilization_engine.court_days(
+        {court_id: (policy.tz, policy.tz_name) for court_id, policy in policies.items()},
+        start, end, db.court_presence
+    )
+    summaries = []
+    for court_id, court_days in days.items():
+        policy = policies[court_id]
+        summary = summarize(court_id, court_days, policy.capacity, policy.tz_name)
+        del summary["daily"]
+        summaries.append(summary)
+    summaries.sort(key=lambda summary: summary["player_hours"], reverse=True)
+    return {"start": start.isoformat(), "end": end.isoformat(), "courts": summaries}
+
+@api_router.get("/courts/{court_id}/utilization")
+async def get_court_utilization(
+    court_id: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Occupancy by hour of day, peak hours, session length and unique visitors for one court"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    start, end = utilization_range(start, end)
+    policy = await access_policy.lookup(court_id, db.courts)
+    if policy is None:
+        raise HTTPException(status_code=404, detail="Court not found")
+    days = await utilization_engine.court_days({court_id: (policy.tz, policy.tz_name)}, start, end, db.court_presence)
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        **summarize(court_id, days[court_id], policy.capacity, policy.tz_name)
+    }
+
+@api_router.get("/courts/near", response_model=List[NearbyCourt])
+async def get_courts_near(
+    lat: float,
+    lng: float,
+    radius_km: float = 10.0,
+    amenities: List[str] = Query([]),
+    surface_type: Optional[str] = None,
+    lighting: Optional[bool] = None,
+    limit: int = 50
+):
+    """Active courts within radius_km, nearest first; courts about as close rank emptiest first"""
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise HTTPException(status_code=400, detail="lat must be within ±90 and lng within ±180")
+    if not 0 < radius_km <= MAX_NEAR_RADIUS_KM:
+        raise HTTPException(status_code=400, detail=f"radius_km must be between 0 and {MAX_NEAR_RADIUS_KM}")
+    if not 0 < limit <= 100:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
+    
+    query = {"is_active": True}
+    if amenities:
+        query["amenities"] = {"$all": amenities}
+    if surface_type:
+        query["surface_type"] = surface_type
+    if lighting is not None:
+        query["lighting"] = lighting
+    courts = await db.courts.aggregate([
+        {"$geoNear": {
+            "near": geo_point(lat, lng),
+            "key": "geo",
+            "distanceField": "distance_m",
+            "maxDistance": radius_km * 1000,
+            "spherical": True,
+            "query": query
+        }},
+        {"$limit": limit},
+        {"$project": COURT_PROJECTION}
+    ]).to_list(limit)
+    
+    results = []
+    for court in courts:
+        distance_km = round(court.pop("distance_m") / 1000, 3)
+        results.append(NearbyCourt(**court, current_count=court_occupancy.count(court["id"]), distance_km=distance_km))
+    results.sort(key=lambda court: near_rank(court.distance_km, court.current_count, court.max_players))
+    return results
 
 @api_router.get("/courts/{court_id}", response_model=Court)
 async def get_court(court_id: str):
-    court = await db.courts.find_one({"id": court_id, "is_active": True})
+    court = await db.courts.find_one({"id": court_id, "is_active": True}, COURT_PROJECTION)
     if not court:
         raise HTTPException(status_code=404, detail="Court not found")
-    return Court(**court)
+    return Court(**court, current_count=court_occupancy.count(court_id))
+
+@api_router.get("/courts/{court_id}/occupancy")
+async def get_court_occupancy(court_id: str):
+    return {
+        "court_id": court_id,
+        "current_count": court_occupancy.count(court_id),
+        "user_ids": sorted(court_occupancy.members(court_id))
+    }
+
+@api_router.get("/courts/{court_id}/waitlist")
+async def get_court_waitlist(court_id: str):
+    court_policy = access_policy.get(court_id)
+    return {
+        "court_id": court_id,
+        "capacity": court_policy.capacity if court_policy else None,
+        "current_count": court_occupancy.count(court_id),
+        "waitlist": court_occupancy.waitlist(court_id),
+        "holds": {user_id: expires_at.isoformat() for user_id, expires_at in court_occupancy.holds(court_id).items()}
+    }
+
+@api_router.delete("/courts/{court_id}/waitlist")
+async def leave_court_waitlist(court_id: str, current_user: User = Depends(get_current_user)):
+    if not court_occupancy.leave_waitlist(court_id, current_user.id):
+        raise HTTPException(status_code=404, detail="Not on this court's waitlist")
+    await announce_promotions()
+    return {"message": "Left the waitlist"}
 
 @api_router.post("/courts", response_model=Court)
 async def create_court(court_data: Court, current_user: User = Depends(get_current_user)):
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Only admins can create courts")
     
-    await db.courts.insert_one(court_data.dict())
+    await db.courts.insert_one({
+        **court_data.dict(exclude={"current_count"}),
+        "geo": geo_point(court_data.latitude, court_data.longitude)
+    })
+    access_policy.update_court(court_data.dict())
     return court_data
 
 # Challenge Routes
@@ -507,23 +730,58 @@ async def health_check():
 # WebSocket endpoint for real-time communication
 @app.websocket("/ws/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_id: str):
+    # Clients may ask for ?encoding=compact|msgpack and ?compression=deflate
+    codec = negotiate_codec(
+        websocket.query_params.get("encoding"),
+        websocket.query_params.get("compression")
+    )
+    # Browsers cannot set headers on WebSocket upgrades, and a ?token= would land in the
+    # access log, so the JWT comes in the first frame. Accepting first also means a
+    # rejected client sees 4401/4403 rather than an HTTP 403 on the handshake.
+    await websocket.accept()
+    try:
+        auth = json.loads(await asyncio.wait_for(websocket.receive_text(), WS_AUTH_TIMEOUT_SECONDS))
+        token = auth.get("token") if isinstance(auth, dict) and auth.get("type") == "auth" else None
+        principal = await get_websocket_user(token)
+    except WebSocketDisconnect:
+        return
+    except (asyncio.TimeoutError, ValueError, KeyError, HTTPException):
+        await websocket.close(code=4401)
+        return
+    if principal.id != user_id or not principal.is_active:
+        await websocket.close(code=4403)
+        return
+    
+    connection_id = None
     try:
-        connection_id = await manager.connect(websocket, user_id)
+        connection_id = await manager.connect(websocket, user_id, codec, accepted=True)
         logger.info(f"WebSocket connected for user {user_id}")
         
         while True:
             try:
                 # Receive message from client
                 data = await websocket.receive_text()
+                manager.touch(connection_id)
                 message = json.loads(data)
                 
                 # Handle different message types
                 message_type = message.get("type")
                 
-                if message_type == "subscribe_court":
+                if message_type == "subscribe":
+                    # {"type": "subscribe", "topics": ["court:<id>", "court:*", "tournament:<id>:matches"], "snapshot": true}
+                    topics = message.get("topics")
+                    if isinstance(topics, list):
+                        await manager.subscribe(connection_id, topics, bool(message.get("snapshot")))
+                
+                elif message_type == "unsubscribe":
+                    topics = message.get("topics")
+                    if isinstance(topics, list):
+                        await manager.unsubscribe(connection_id, topics)
+                
+                elif message_type == "subscribe_court":
                     court_id = message.get("court_id")
                     if court_id:
-                        await manager.subscribe_to_court(connection_id, court_id)
+                        await manager.subscribe_to_court(connection_id, court_id, bool(message.get("snapshot")))
                 
                 elif message_type == "unsubscribe_court":
                     court_id = message.get("court_id")
@@ -533,12 +791,35 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
                 elif message_type == "subscribe_game":
                     game_id = message.get("game_id")
                     if game_id:
-                        await manager.subscribe_to_game(connection_id, game_id)
+                        await manager.subscribe_to_game(connection_id, game_id, bool(message.get("snapshot")))
+                
+                elif message_type == "unsubscribe_game":
+                    game_id = message.get("game_id")
+                    if game_id:
+                        await manager.unsubscribe_from_game(connection_id, game_id)
                 
                 elif message_type == "subscribe_tournament":
                     tournament_id = message.get("tournament_id")
                     if tournament_id:
-                        await manager.subscribe_to_tournament(connection_id, tournament_id)
+                        await manager.subscribe_to_tournament(connection_id, tournament_id, bool(message.get("snapshot")))
+                
+                elif message_type == "unsubscribe_tournament":
+                    tournament_id = message.get("tournament_id")
+                    if tournament_id:
+                        await manager.unsubscribe_from_tournament(connection_id, tournament_id)
+                
+                elif message_type == "resume":
+                    # {"type": "resume", "topic": "game:<id>", "last_seq": 41, "epoch": "<epoch>"}
+                    topic = message.get("topic")
+                    last_seq = message.get("last_seq")
+                    # bool is an int subclass; reject it along with strings, floats and negatives
+                    if not topic or type(last_seq) is not int or last_seq < 0:
+                        await manager.send_personal_message({
+                            "type": "error",
+                            "message": "resume needs a topic and a non-negative integer last_seq"
+                        }, connection_id)
+                    else:
+                        await manager.resume(connection_id, topic, last_seq, message.get("epoch"))
                 
                 elif message_type == "ping":
                     await manager.send_personal_message({
@@ -563,17 +844,71 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
     except Exception as e:
         logger.error(f"WebSocket connection error: {e}")
     finally:
-        await manager.disconnect(connection_id)
+        if connection_id:
+            await manager.disconnect(connection_id)
+
+# Snapshot providers behind snapshot-on-subscribe and resumes whose gap is no longer buffered
+async def game_snapshot(game_id: str) -> Optional[Dict[str, Any]]:
+    game = await db.games.find_one(
+        {"id": game_id},
+        {"_id": 0, "id": 1, "status": 1, "score": 1, "period": 1, "game_time": 1, "updated_at": 1}
+    )
+    return game
+
+def apply_game_update(snapshot: Dict[str, Any], message: dict) -> Optional[Dict[str, Any]]:
+    # Keep hot games out of the database: score_update frames carry the full score state
+    if message.get("type") != "score_update":
+        return None
+    return {
+        **snapshot,
+        "score": {"team1": message.get("team1_score"), "team2": message.get("team2_score")},
+        "period": message.get("period"),
+        "game_time": message.get("game_time"),
+        "updated_at": message.get("timestamp")
+    }
+
+async def court_snapshot(court_id: str) -> Optional[Dict[str, Any]]:
+    presence = await db.court_presence.find(
+        {"court_id": court_id, "check_out_time": None},
+        {"_id": 0, "user_id": 1, "check_in_time": 1, "status": 1}
+    ).to_list(500)
+    return {"court_id": court_id, "presence": presence}
+
+async def tournament_snapshot(tournament_id: str) -> Optional[Dict[str, Any]]:
+    # Spectators see how full the field is, not who is in it; the roster stays behind REST
+    tournaments = await db.tournaments.aggregate([
+        {"$match": {"id": tournament_id}},
+        {"$project": {
+            "_id": 0, "id": 1, "status": 1, "current_round": 1, "max_participants": 1, "updated_at": 1,
+            "participant_count": {"$size": {"$ifNull": ["$participants", []]}}
+        }}
+    ]).to_list(1)
+    return tournaments[0] if tournaments else None
+
+manager.register_snapshot_provider("game", game_snapshot, apply_game_update)
+manager.register_snapshot_provider("court", court_snapshot)
+manager.register_snapshot_provider("tournament", tournament_snapshot)
 
 # WebSocket Stats
 @api_router.get("/websocket/stats")
 async def get_websocket_stats():
-    return manager.get_connection_stats()
+    stats = manager.get_connection_stats()
+    stats["principal_cache"] = ws_principal_cache.stats()
+    return stats
 
 # ==============================================================================
 # RFID SYSTEM ENDPOINTS
 # ==============================================================================
 
+async def next_card_sync_version() -> int:
+    counter = await db.counters.find_one_and_update(
+        {"_id": RFID_CARD_VERSION_COUNTER},
+        {"$inc": {"seq": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter["seq"]
+
 @api_router.post("/rfid/cards", response_model=RFIDCard)
 async def create_rfid_card(card_data: RFIDCard, current_user: User = Depends(get_current_user)):
     # Only admin or the card owner can create RFID cards
@@ -585,9 +920,45 @@ async def create_rfid_card(card_data: RFIDCard, current_user: User = Depends(get
     if existing_card:
         raise HTTPException(status_code=400, detail="RFID card UID already exists")
     
-    await db.rfid_cards.insert_one(card_data.dict())
+    await db.rfid_cards.insert_one({**card_data.dict(), "sync_version": await next_card_sync_version()})
+    rfid_card_index.upsert(card_data.dict())
     return card_data
 
+@api_router.post("/rfid/cards/{card_id}/deactivate", response_model=RFIDCard)
+async def deactivate_rfid_card(card_id: str, current_user: User = Depends(get_current_user)):
+    card = await db.rfid_cards.find_one({"id": card_id})
+    if not card:
+        raise HTTPException(status_code=404, detail="RFID card not found")
+    if current_user.role != UserRole.ADMIN and card["user_id"] != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to deactivate this RFID card")
+    
+    updated_at = datetime.utcnow()
+    await db.rfid_cards.update_one(
+        {"id": card_id},
+        {"$set": {"is_active": False, "updated_at": updated_at, "sync_version": await next_card_sync_version()}}
+    )
+    rfid_card_index.invalidate(card["card_uid"])
+    card.update({"is_active": False, "updated_at": updated_at})
+    return RFIDCard(**card)
+
+@api_router.get("/rfid/cache/stats")
+async def get_rfid_cache_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return rfid_card_index.stats()
+
+@api_router.get("/rfid/policy/stats")
+async def get_access_policy_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return access_policy.stats()
+
+@api_router.get("/rfid/audit/stats")
+async def get_audit_writer_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return audit_writer.stats()
+
 @api_router.get("/rfid/cards", response_model=List[RFIDCard])
 async def get_rfid_cards(current_user: User = Depends(get_current_user), skip: int = 0, limit: int = 100):
     if current_user.role == UserRole.ADMIN:
@@ -607,7 +978,7 @@ async def get_user_rfid_cards(user_id: str, current_user: User = Depends(get_cur
 @api_router.post("/rfid/checkin")
 async def rfid_checkin(request: RFIDCheckInRequest):
     # Find RFID card
-    card = await db.rfid_cards.find_one({"card_uid": request.card_uid, "is_active": True})
+    card = await rfid_card_index.lookup(request.card_uid, db.rfid_cards)
     if not card:
         # Log failed attempt
         event = RFIDEvent(
@@ -619,69 +990,102 @@ async def rfid_checkin(request: RFIDCheckInRequest):
             error_message="Invalid or inactive RFID card",
             device_id=request.device_id
         )
-        await db.rfid_events.insert_one(event.dict())
+        audit_writer.submit(event.dict())
         raise HTTPException(status_code=404, detail="Invalid or inactive RFID card")
     
     # Check card expiry
-    if card.get("expiry_date") and datetime.fromisoformat(card["expiry_date"]) < datetime.utcnow():
+    if card.is_expired():
         event = RFIDEvent(
             card_uid=request.card_uid,
-            user_id=card["user_id"],
+            user_id=card.user_id,
             court_id=request.court_id,
             event_type=RFIDEventType.ACCESS_DENIED,
             success=False,
             error_message="RFID card expired",
             device_id=request.device_id
         )
-        await db.rfid_events.insert_one(event.dict())
+        audit_writer.submit(event.dict())
         raise HTTPException(status_code=403, detail="RFID card expired")
     
-    # Check if user is already checked in
-    existing_presence = await db.court_presence.find_one({
-        "user_id": card["user_id"],
-        "court_id": request.court_id,
-        "check_out_time": None
-    })
+    # Check the court's required access level and opening hours
+    court_policy = await access_policy.lookup(request.court_id, db.courts)
+    denial = access_policy.decide(card, court_policy, datetime.utcnow())
+    if denial:
+        event = RFIDEvent(
+            card_uid=request.card_uid,
+            user_id=card.user_id,
+            court_id=request.court_id,
+            event_type=RFIDEventType.ACCESS_DENIED,
+            success=False,
+            error_message=denial,
+            device_id=request.device_id
+        )
+        audit_writer.submit(event.dict())
+        raise HTTPException(status_code=404 if court_policy is None else 403, detail=denial)
     
-    if existing_presence:
+    # Claim the slot in memory first: capacity check and claim happen with no await in between
+    admission, waitlist_position = court_occupancy.try_admit(request.court_id, card.user_id, court_policy.capacity)
+    if admission == Admission.ALREADY_PRESENT:
         raise HTTPException(status_code=400, detail="User already checked in to this court")
+    if admission == Admission.WAITLISTED:
+        event = RFIDEvent(
+            card_uid=request.card_uid,
+            user_id=card.user_id,
+            court_id=request.court_id,
+            event_type=RFIDEventType.WAITLISTED,
+            success=False,
+            error_message="Court at capacity",
+            device_id=request.device_id
+        )
+        audit_writer.submit(event.dict())
+        await announce_promotions()
+        raise HTTPException(status_code=409, detail={
+            "message": "Court at capacity",
+            "waitlist_position": waitlist_position
+        })
     
     # Create presence record
     presence = CourtPresence(
-        user_id=card["user_id"],
+        user_id=card.user_id,
         court_id=request.court_id,
         rfid_card_uid=request.card_uid,
         status=PresenceStatus.CHECKED_IN
     )
-    await db.court_presence.insert_one(presence.dict())
+    try:
+        await db.court_presence.insert_one(presence.dict())
+    except DuplicateKeyError:
+        # Another worker (or a session the occupancy load missed) already has them on this court
+        court_occupancy.check_out(request.court_id, card.user_id)
+        await announce_promotions()
+        raise HTTPException(status_code=400, detail="User already checked in to this court")
+    except Exception:
+        court_occupancy.check_out(request.court_id, card.user_id)
+        await announce_promotions()
+        raise
+    # Admission may have expired stale holds and promoted the next in line
+    await announce_promotions()
     
     # Log successful check-in
     event = RFIDEvent(
         card_uid=request.card_uid,
-        user_id=card["user_id"],
+        user_id=card.user_id,
         court_id=request.court_id,
         event_type=RFIDEventType.CHECK_IN,
         success=True,
         device_id=request.device_id
     )
-    await db.rfid_events.insert_one(event.dict())
-    
-    # Update court's current players
-    await db.courts.update_one(
-        {"id": request.court_id},
-        {"$addToSet": {"current_players": card["user_id"]}}
-    )
+    audit_writer.submit(event.dict())
     
     # Broadcast court presence update
     await manager.broadcast_to_court({
         "type": "player_checked_in",
         "court_id": request.court_id,
-        "user_id": card["user_id"],
+        "user_id": card.user_id,
         "rfid_card_uid": request.card_uid
     }, request.court_id)
     
     # Get user info for response
-    user = await db.users.find_one({"id": card["user_id"]})
+    user = await db.users.find_one({"id": card.user_id})
     
     return {
         "success": True,
@@ -697,7 +1101,7 @@ async def rfid_checkin(request: RFIDCheckInRequest):
 @api_router.post("/rfid/checkout")
 async def rfid_checkout(request: RFIDCheckOutRequest):
     # Find RFID card
-    card = await db.rfid_cards.find_one({"card_uid": request.card_uid, "is_active": True})
+    card = await rfid_card_index.lookup(request.card_uid, db.rfid_cards)
     if not card:
         event = RFIDEvent(
             card_uid=request.card_uid,
@@ -708,12 +1112,12 @@ async def rfid_checkout(request: RFIDCheckOutRequest):
             error_message="Invalid or inactive RFID card",
             device_id=request.device_id
         )
-        await db.rfid_events.insert_one(event.dict())
+        audit_writer.submit(event.dict())
         raise HTTPException(status_code=404, detail="Invalid or inactive RFID card")
     
     # Find active presence
     presence = await db.court_presence.find_one({
-        "user_id": card["user_id"],
+        "user_id": card.user_id,
         "court_id": request.court_id,
         "check_out_time": None
     })
@@ -737,30 +1141,26 @@ async def rfid_checkout(request: RFIDCheckOutRequest):
     # Log successful check-out
     event = RFIDEvent(
         card_uid=request.card_uid,
-        user_id=card["user_id"],
+        user_id=card.user_id,
         court_id=request.court_id,
         event_type=RFIDEventType.CHECK_OUT,
         success=True,
         device_id=request.device_id
     )
-    await db.rfid_events.insert_one(event.dict())
-    
-    # Remove from court's current players
-    await db.courts.update_one(
-        {"id": request.court_id},
-        {"$pull": {"current_players": card["user_id"]}}
-    )
+    audit_writer.submit(event.dict())
+    court_occupancy.check_out(request.court_id, card.user_id)
+    await announce_promotions()
     
     # Broadcast court presence update
     await manager.broadcast_to_court({
         "type": "player_checked_out",
         "court_id": request.court_id,
-        "user_id": card["user_id"],
+        "user_id": card.user_id,
         "rfid_card_uid": request.card_uid
     }, request.court_id)
     
     # Calculate session duration
-    check_in_time = datetime.fromisoformat(presence["check_in_time"])
+    check_in_time = coerce_datetime(presence["check_in_time"])
     duration = checkout_time - check_in_time
     
     return {
@@ -770,13 +1170,417 @@ async def rfid_checkout(request: RFIDCheckOutRequest):
         "check_out_time": checkout_time.isoformat()
     }
 
+async def announce_promotions():
+    """Tell each player promoted off a waitlist that a slot is held for them"""
+    for court_id, user_id, hold_expires_at in court_occupancy.drain_promotions():
+        await manager.send_to_user({
+            "type": "court_slot_available",
+            "court_id": court_id,
+            "hold_expires_at": hold_expires_at.isoformat()
+        }, user_id)
+
+def tap_metadata(tap: RFIDTap) -> Dict[str, Any]:
+    # Keep what an offline reader decided next to what the server decided
+    return {"offline_granted": tap.offline_granted} if tap.offline_granted is not None else {}
+
+async def undo_rfid_tap_writes(
+    claims: List[Dict[str, Any]],
+    inserted_presence_ids: List[str],
+    closed_presence_ids: List[str],
+    updated_at: datetime
+):
+    """Best-effort undo of a tap upload whose presence writes failed.
+
+    A claim left behind would make the retry ack its tap as a duplicate, and
+    the reader would drop a tap whose presence was never written.
+    """
+    try:
+        await db.rfid_events.delete_many({"id": {"$in": [event["id"] for event in claims]}})
+        if inserted_presence_ids:
+            await db.court_presence.delete_many({"id": {"$in": inserted_presence_ids}})
+        if closed_presence_ids:
+            # Reopen only the sessions this upload closed
+            await db.court_presence.update_many(
+                {"id": {"$in": closed_presence_ids}, "updated_at": updated_at},
+                {"$set": {"check_out_time": None, "status": PresenceStatus.CHECKED_IN}}
+            )
+    except Exception as e:
+        logger.error(f"Could not undo a failed tap upload: {e!r}")
+
+async def apply_rfid_taps(device_id: str, taps: List[RFIDTap]) -> List[Dict[str, Any]]:
+    """Apply one device's check-in/check-out taps in a handful of round trips; one result per tap"""
+    if not taps:
+        return []
+    
+    # Cards come from the index; at most one $in query for the ones it has not seen
+    cards = await rfid_card_index.lookup_many([tap.card_uid for tap in taps], db.rfid_cards)
+    
+    # One query for the open presence of every (user, court) the batch touches
+    user_ids = list({card.user_id for card in cards.values()})
+    court_ids = list({tap.court_id for tap in taps})
+    court_policies = {court_id: await access_policy.lookup(court_id, db.courts) for court_id in court_ids}
+    open_presence = {
+        (presence["user_id"], presence["court_id"]): presence
+        async for presence in db.court_presence.find({
+            "user_id": {"$in": user_ids},
+            "court_id": {"$in": court_ids},
+            "check_out_time": None
+        })
+    }
+    
+    results: List[Optional[Dict[str, Any]]] = [None] * len(taps)
+    events: List[Dict[str, Any]] = []
+    new_presence: Dict[str, Dict[str, Any]] = {}
+    presence_updates = []
+    closed_presence_ids: List[str] = []
+    checked_in: Dict[str, List[str]] = {}
+    checked_out: Dict[str, List[str]] = {}
+    # Occupancy changes made while replaying, as (admitted?, user_id, court_id); undone if the writes fail
+    occupancy_changes: List[tuple] = []
+    now = datetime.utcnow()
+    
+    def deny(
+        index: int,
+        tap: RFIDTap,
+        user_id: str,
+        status_code: int,
+        error: str,
+        log_event: bool = True,
+        event_type: RFIDEventType = RFIDEventType.ACCESS_DENIED
+    ):
+        # Offline uploads log every tap: the event row is what makes a re-upload idempotent
+        if log_event or tap.local_seq is not None:
+            events.append(RFIDEvent(
+                card_uid=tap.card_uid,
+                user_id=user_id,
+                court_id=tap.court_id,
+                event_type=event_type,
+                success=False,
+                error_message=error,
+                device_id=device_id,
+                timestamp=tap.timestamp,
+                local_seq=tap.local_seq,
+                metadata=tap_metadata(tap)
+            ).dict())
+        results[index] = {
+            "index": index,
+            "local_seq": tap.local_seq,
+            "card_uid": tap.card_uid,
+            "action": tap.action,
+            "success": False,
+            "status_code": status_code,
+            "error": error
+        }
+    
+    # Replay taps in the order the reader saw them; earlier taps decide later ones
+    for index, tap in sorted(enumerate(taps), key=lambda item: item[1].timestamp):
+        card = cards.get(tap.card_uid)
+        if card is None:
+            deny(index, tap, "unknown", 404, "Invalid or inactive RFID card")
+            continue
+        user_id = card.user_id
+        
+        if card.is_expired(now):
+            deny(index, tap, user_id, 403, "RFID card expired")
+            continue
+        
+        key = (user_id, tap.court_id)
+        presence = open_presence.get(key)
+        if tap.action == RFIDTapAction.CHECK_IN:
+            # Judged at tap time, so an offline upload gets the decision the reader should have made
+            court_policy = court_policies[tap.court_id]
+            denial = access_policy.decide(card, court_policy, tap.timestamp)
+            if denial:
+                deny(index, tap, user_id, 404 if court_policy is None else 403, denial)
+                continue
+            # Same outcomes as /rfid/checkin, which logs no event for a duplicate
+            if presence is not None:
+                deny(index, tap, user_id, 400, "User already checked in to this court", log_event=False)
+                continue
+            # A reader that let the player in while offline already spent the slot
+            capacity = None if tap.offline_granted else court_policy.capacity
+            admission, waitlist_position = court_occupancy.try_admit(tap.court_id, user_id, capacity)
+            if admission == Admission.ALREADY_PRESENT:
+                deny(index, tap, user_id, 400, "User already checked in to this court", log_event=False)
+                continue
+            if admission == Admission.WAITLISTED:
+                deny(index, tap, user_id, 409, "Court at capacity", event_type=RFIDEventType.WAITLISTED)
+                results[index]["waitlist_position"] = waitlist_position
+                continue
+            occupancy_changes.append((True, user_id, tap.court_id))
+            presence = CourtPresence(
+                user_id=user_id,
+                court_id=tap.court_id,
+                rfid_card_uid=tap.card_uid,
+                status=PresenceStatus.CHECKED_IN,
+                check_in_time=tap.timestamp
+            ).dict()
+            open_presence[key] = presence
+            new_presence[presence["id"]] = presence
+            checked_in.setdefault(tap.court_id, []).append(user_id)
+            event_type = RFIDEventType.CHECK_IN
+        else:
+            if presence is None:
+                deny(index, tap, user_id, 404, "No active check-in found", log_event=False)
+                continue
+            del open_presence[key]
+            if court_occupancy.check_out(tap.court_id, user_id):
+                occupancy_changes.append((False, user_id, tap.court_id))
+            changes = {
+                "check_out_time": tap.timestamp,
+                "status": PresenceStatus.CHECKED_OUT,
+                "updated_at": now
+            }
+            if presence["id"] in new_presence:
+                presence.update(changes)
+            else:
+                presence_updates.append(UpdateOne({"id": presence["id"]}, {"$set": changes}))
+                closed_presence_ids.append(presence["id"])
+            checked_out.setdefault(tap.court_id, []).append(user_id)
+            event_type = RFIDEventType.CHECK_OUT
+        
+        events.append(RFIDEvent(
+            card_uid=tap.card_uid,
+            user_id=user_id,
+            court_id=tap.court_id,
+            event_type=event_type,
+            success=True,
+            device_id=device_id,
+            timestamp=tap.timestamp,
+            local_seq=tap.local_seq,
+            metadata=tap_metadata(tap)
+        ).dict())
+        results[index] = {
+            "index": index,
+            "local_seq": tap.local_seq,
+            "card_uid": tap.card_uid,
+            "action": tap.action,
+            "success": True,
+            "user_id": user_id,
+            "presence_id": presence["id"]
+        }
+    
+    # Offline uploads write their events first: they claim (device_id, local_seq) before any side effect
+    claims = [event for event in events if event["local_seq"] is not None]
+    claimed = False
+    try:
+        if claims:
+            try:
+                await db.rfid_events.insert_many(claims, ordered=False)
+            except BulkWriteError:
+                # A concurrent upload claimed some of these taps; drop our claims so a retry starts clean
+                await db.rfid_events.delete_many({"id": {"$in": [event["id"] for event in claims]}})
+                raise
+            claimed = True
+        if new_presence:
+            await db.court_presence.insert_many(list(new_presence.values()), ordered=False)
+        if presence_updates:
+            await db.court_presence.bulk_write(presence_updates, ordered=False)
+    except Exception:
+        if claimed:
+            await undo_rfid_tap_writes(claims, list(new_presence), closed_presence_ids, now)
+        for was_admitted, user_id, court_id in reversed(occupancy_changes):
+            if was_admitted:
+                court_occupancy.check_out(court_id, user_id)
+            else:
+                court_occupancy.check_in(court_id, user_id)
+        await announce_promotions()
+        raise
+    # Offline taps can land in days the utilization cache already settled
+    earliest: Dict[str, datetime] = {}
+    for result in results:
+        if result["success"]:
+            tap = taps[result["index"]]
+            earliest[tap.court_id] = min(tap.timestamp, earliest.get(tap.court_id, tap.timestamp))
+    for court_id, since in earliest.items():
+        utilization_engine.invalidate(court_id, since, now)
+    # Counted and audited only once the presence writes are in
+    if claims:
+        await record_rfid_rollups(claims)
+    for event in events:
+        if event["local_seq"] is None:
+            audit_writer.submit(event)
+    await announce_promotions()
+    
+    # One coalesced presence broadcast per court instead of one per tap
+    for court_id in court_ids:
+        if checked_in.get(court_id) or checked_out.get(court_id):
+            await manager.broadcast_to_court({
+                "type": "court_presence_batch",
+                "court_id": court_id,
+                "device_id": device_id,
+                "checked_in": checked_in.get(court_id, []),
+                "checked_out": checked_out.get(court_id, [])
+            }, court_id)
+    
+    return results
+
+@api_router.post("/rfid/taps/batch")
+async def rfid_tap_batch(request: RFIDBatchRequest):
+    if len(request.taps) > MAX_RFID_BATCH_TAPS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_RFID_BATCH_TAPS} taps per batch")
+    
+    results = await apply_rfid_taps(request.device_id, request.taps)
+    return {
+        "device_id": request.device_id,
+        "processed": len(results),
+        "succeeded": sum(1 for result in results if result["success"]),
+        "results": results
+    }
+
+# Offline-capable readers: download a signed card list, validate taps locally,
+# upload the buffered tap log once the uplink is back.
+def require_reader_keys():
+    if reader_signing_key is None or not RFID_CARD_DIGEST_KEY:
+        raise HTTPException(status_code=503, detail="Reader sync is not configured")
+
+def digest_key_for(device_id: str) -> bytes:
+    return reader_digest_key(RFID_CARD_DIGEST_KEY.encode("utf-8"), device_id)
+
+async def get_current_reader(device_id: str, x_reader_key: Optional[str] = Header(None)) -> RFIDReader:
+    """Readers authenticate with the key issued when they were registered"""
+    if not x_reader_key:
+        raise HTTPException(status_code=401, detail="Missing reader key")
+    reader = await db.rfid_readers.find_one(
+        {"device_id": device_id, "key_hash": reader_key_hash(x_reader_key), "is_active": True},
+        {"_id": 0, "key_hash": 0}
+    )
+    if reader is None:
+        raise HTTPException(status_code=401, detail="Invalid reader key")
+    return RFIDReader(**reader)
+
+@api_router.post("/rfid/readers")
+async def register_rfid_reader(reader_data: RFIDReaderCreate, current_user: User = Depends(get_current_user)):
+    """Register a reader, or rotate its key; the key and provisioning material are only shown here"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    require_reader_keys()
+    if await access_policy.lookup(reader_data.court_id, db.courts) is None:
+        raise HTTPException(status_code=404, detail="Court not found")
+    
+    reader = RFIDReader(**reader_data.dict())
+    reader_key = new_reader_key()
+    await db.rfid_readers.replace_one(
+        {"device_id": reader.device_id},
+        {**reader.dict(), "key_hash": reader_key_hash(reader_key)},
+        upsert=True
+    )
+    return {
+        "reader": reader,
+        "reader_key": reader_key,
+        "digest_key": base64.b64encode(digest_key_for(reader.device_id)).decode("ascii"),
+        "algorithm": SIGNATURE_ALGORITHM,
+        "signing_public_key": public_key_b64(reader_signing_key)
+    }
+
+@api_router.post("/rfid/readers/{device_id}/deactivate", response_model=RFIDReader)
+async def deactivate_rfid_reader(device_id: str, current_user: User = Depends(get_current_user)):
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    reader = await db.rfid_readers.find_one_and_update(
+        {"device_id": device_id},
+        {"$set": {"is_active": False}},
+        projection={"_id": 0, "key_hash": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if reader is None:
+        raise HTTPException(status_code=404, detail="Reader not found")
+    return RFIDReader(**reader)
+
+@api_router.get("/rfid/readers/{device_id}/cards")
+async def get_reader_card_sync(
+    device_id: str,
+    court_id: Optional[str] = None,
+    since_version: Optional[int] = None,
+    reader: RFIDReader = Depends(get_current_reader)
+):
+    require_reader_keys()
+    court_id = court_id or reader.court_id
+    if court_id != reader.court_id:
+        raise HTTPException(status_code=403, detail="Reader is not registered for this court")
+    counter = await db.counters.find_one({"_id": RFID_CARD_VERSION_COUNTER})
+    version = counter["seq"] if counter else 0
+    projection = {"_id": 0, "card_uid": 1, "is_active": 1, "access_level": 1, "expiry_date": 1}
+    
+    if since_version is None or since_version > version:
+        # First sync, or a reader from a restored database: send everything
+        since_version = None
+        cards = await db.rfid_cards.find({"is_active": True}, projection).to_list(None)
+    else:
+        cards = await db.rfid_cards.find(
+            {"sync_version": {"$gt": since_version, "$lte": version}},
+            projection
+        ).to_list(None)
+    
+    court_policy = await access_policy.lookup(court_id, db.courts)
+    if court_policy is None:
+        raise HTTPException(status_code=404, detail="Court not found")
+    payload = build_card_sync(
+        cards, version, since_version, court_id, device_id, digest_key_for(device_id),
+        court_policy=court_policy.for_reader()
+    )
+    return {
+        "payload": payload,
+        "algorithm": SIGNATURE_ALGORITHM,
+        "signature": sign_payload(payload, reader_signing_key)
+    }
+
+@api_router.post("/rfid/readers/{device_id}/taps")
+async def upload_reader_taps(
+    device_id: str,
+    upload: RFIDReaderTapUpload,
+    reader: RFIDReader = Depends(get_current_reader)
+):
+    """Idempotent tap-log upload; taps already stored for (device_id, local_seq) are acknowledged, not reapplied"""
+    if len(upload.taps) > MAX_RFID_BATCH_TAPS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_RFID_BATCH_TAPS} taps per upload")
+    if any(tap.local_seq is None for tap in upload.taps):
+        raise HTTPException(status_code=400, detail="Every uploaded tap needs a local_seq")
+    if any(tap.court_id != reader.court_id for tap in upload.taps):
+        raise HTTPException(status_code=403, detail="Reader is not registered for this court")
+    
+    local_seqs = [tap.local_seq for tap in upload.taps]
+    seen = {
+        event["local_seq"]
+        async for event in db.rfid_events.find(
+            {"device_id": device_id, "local_seq": {"$in": local_seqs}},
+            {"_id": 0, "local_seq": 1}
+        )
+    }
+    duplicates = []
+    fresh = []
+    for tap in upload.taps:
+        if tap.local_seq in seen:
+            duplicates.append(tap.local_seq)
+        else:
+            seen.add(tap.local_seq)
+            fresh.append(tap)
+    
+    try:
+        results = await apply_rfid_taps(device_id, fresh)
+    except BulkWriteError:
+        raise HTTPException(status_code=409, detail="Overlapping upload in progress for this device; retry")
+    
+    return {
+        "device_id": device_id,
+        "applied": len(results),
+        "duplicates": duplicates,
+        # Everything up to here is stored; the reader may drop it from its buffer
+        "acked_through": max(local_seqs, default=None),
+        "results": results
+    }
+
 @api_router.get("/rfid/events", response_model=List[RFIDEvent])
 async def get_rfid_events(
+    response: Response,
     current_user: User = Depends(get_current_user),
     skip: int = 0,
     limit: int = 100,
     court_id: Optional[str] = None,
-    user_id: Optional[str] = None
+    user_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None
 ):
     filter_dict = {}
     
@@ -787,14 +1591,143 @@ async def get_rfid_events(
             filter_dict["court_id"] = court_id
         if user_id:
             filter_dict["user_id"] = user_id
-    
-    events = await db.rfid_events.find(filter_dict).sort("timestamp", -1).skip(skip).limit(limit).to_list(limit)
+    # Bounded by time, the (court_id|user_id, timestamp, id) indexes serve the sort
+    if since or until:
+        filter_dict["timestamp"] = {}
+        if since:
+            filter_dict["timestamp"]["$gte"] = since
+        if until:
+            filter_dict["timestamp"]["$lt"] = until
+    # Cursor pages seek straight to the last row seen; skip is kept for old clients
+    if cursor:
+        try:
+            filter_dict.update(keyset_filter("timestamp", cursor))
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        skip = 0
+    
+    events = await db.rfid_events.find(filter_dict).sort(keyset_sort("timestamp")).skip(skip).limit(limit).to_list(limit)
+    page_cursor = next_cursor(events, "timestamp", limit)
+    if page_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page_cursor
     return [RFIDEvent(**event) for event in events]
 
+@api_router.get("/rfid/history", response_model=List[RFIDEventRollup])
+async def get_rfid_history(
+    start: datetime,
+    end: datetime,
+    court_id: Optional[str] = None,
+    granularity: str = "hour",
+    current_user: User = Depends(get_current_user)
+):
+    """Check-ins, check-outs, denials and unique users per court, read from the hourly rollups"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    if granularity not in ("hour", "day"):
+        raise HTTPException(status_code=400, detail="granularity must be 'hour' or 'day'")
+    
+    filter_dict = {"hour": {"$gte": start, "$lt": end}}
+    if court_id:
+        filter_dict["court_id"] = court_id
+    docs = await db.rfid_event_rollups.find(filter_dict, {"_id": 0}).to_list(None)
+    return [RFIDEventRollup(**row) for row in merge_rollups(docs, granularity)]
+
 # ==============================================================================
 # COURT PRESENCE TRACKING
 # ==============================================================================
 
+PRESENCE_MAX_SESSION = timedelta(hours=float(os.environ.get("PRESENCE_MAX_SESSION_HOURS", 4)))
+
+async def sweep_stale_presence() -> Dict[str, int]:
+    """Close sessions of players who never tapped out; returns closed counts by reason"""
+    now = datetime.utcnow()
+    # Unclaimed waitlist holds lapse on the same schedule
+    court_occupancy.expire_holds(now)
+    
+    rows = await db.court_presence.find(
+        {"check_out_time": None},
+        {"_id": 0, "id": 1, "user_id": 1, "court_id": 1, "check_in_time": 1, "rfid_card_uid": 1}
+    ).to_list(None)
+    # Card types from the index, so cards admitted after hours are not closed for it
+    cards = await rfid_card_index.lookup_many(
+        list({row["rfid_card_uid"] for row in rows if row.get("rfid_card_uid")}), db.rfid_cards
+    )
+    card_types = {card_uid: card.card_type for card_uid, card in cards.items()}
+    stale = find_stale_sessions(rows, access_policy.get, now, PRESENCE_MAX_SESSION, card_types)
+    
+    closed: Dict[str, int] = {}
+    checked_out: Dict[str, List[str]] = {}
+    if stale:
+        # check_out_time None in the filter leaves sessions closed by a tap meanwhile alone
+        result = await db.court_presence.bulk_write([
+            UpdateOne(
+                {"id": row["id"], "check_out_time": None},
+                {"$set": {
+                    "check_out_time": checkout_time,
+                    "status": PresenceStatus.CHECKED_OUT,
+                    "auto_checkout_reason": reason,
+                    "updated_at": now
+                }}
+            )
+            for row, checkout_time, reason in stale
+        ], ordered=False)
+        if result.modified_count < len(stale):
+            # Some raced a real checkout (or another worker's sweep); keep only the rows this run closed
+            swept = {
+                row["id"] async for row in db.court_presence.find(
+                    {"id": {"$in": [row["id"] for row, _, _ in stale]}, "auto_checkout_reason": {"$ne": None}, "updated_at": now},
+                    {"_id": 0, "id": 1}
+                )
+            }
+            stale = [session for session in stale if session[0]["id"] in swept]
+        
+        for row, checkout_time, reason in stale:
+            closed[reason] = closed.get(reason, 0) + 1
+            # Capped sessions close back-dated
+            utilization_engine.invalidate(row["court_id"], checkout_time, now)
+            court_occupancy.check_out(row["court_id"], row["user_id"], now)
+            checked_out.setdefault(row["court_id"], []).append(row["user_id"])
+            audit_writer.submit(RFIDEvent(
+                card_uid=row.get("rfid_card_uid") or "unknown",
+                user_id=row["user_id"],
+                court_id=row["court_id"],
+                event_type=RFIDEventType.CHECK_OUT,
+                success=True,
+                device_id="presence-sweeper",
+                timestamp=checkout_time,
+                metadata={"auto_checkout_reason": reason}
+            ).dict())
+    
+    # One consolidated presence broadcast per court
+    for court_id, user_ids in checked_out.items():
+        await manager.broadcast_to_court({
+            "type": "court_presence_batch",
+            "court_id": court_id,
+            "device_id": "presence-sweeper",
+            "checked_in": [],
+            "checked_out": user_ids
+        }, court_id)
+    await announce_promotions()
+    return closed
+
+presence_sweeper = PresenceSweeper(
+    sweep_stale_presence,
+    interval=float(os.environ.get("PRESENCE_SWEEP_INTERVAL_SECONDS", 60))
+)
+
+@api_router.get("/presence/sweeper/stats")
+async def get_presence_sweeper_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return presence_sweeper.stats()
+
+@api_router.post("/presence/sweeper/run")
+async def run_presence_sweeper(current_user: User = Depends(get_current_user)):
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    closed = await presence_sweeper.run_once()
+    return {"closed": sum(closed.values()), "by_reason": closed}
+
 @api_router.get("/courts/{court_id}/presence", response_model=List[CourtPresence])
 async def get_court_presence(court_id: str):
     presence = await db.court_presence.find({
@@ -806,14 +1739,27 @@ async def get_court_presence(court_id: str):
 @api_router.get("/presence/user/{user_id}", response_model=List[CourtPresence])
 async def get_user_presence_history(
     user_id: str,
+    response: Response,
     current_user: User = Depends(get_current_user),
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    cursor: Optional[str] = None
 ):
     if current_user.role != UserRole.ADMIN and user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to view other user's presence history")
     
-    presence = await db.court_presence.find({"user_id": user_id}).sort("check_in_time", -1).skip(skip).limit(limit).to_list(limit)
+    filter_dict = {"user_id": user_id}
+    if cursor:
+        try:
+            filter_dict.update(keyset_filter("check_in_time", cursor))
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        skip = 0
+    
+    presence = await db.court_presence.find(filter_dict).sort(keyset_sort("check_in_time")).skip(skip).limit(limit).to_list(limit)
+    page_cursor = next_cursor(presence, "check_in_time", limit)
+    if page_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page_cursor
     return [CourtPresence(**p) for p in presence]
 
 # ==============================================================================
@@ -932,6 +1878,8 @@ async def update_live_score(
         {
             "$set": {
                 "score": {"team1": score_update.team1_score, "team2": score_update.team2_score},
+                "period": score_update.period,
+                "game_time": score_update.game_time,
                 "updated_at": datetime.utcnow()
             }
         }
@@ -1062,15 +2010,37 @@ async def get_matchmaking_suggestions(current_user: User = Depends(get_current_u
         "preferred_game_types": {"$in": profile["preferred_game_types"]}
     }).to_list(50)
     
+    # Home court locations, to keep suggestions within the player's max_distance
+    home_courts = {}
+    if profile.get("max_distance") and profile.get("home_court_id"):
+        court_ids = {profile["home_court_id"]} | {p["home_court_id"] for p in compatible_profiles if p.get("home_court_id")}
+        home_courts = {
+            court["id"]: court async for court in db.courts.find(
+                {"id": {"$in": list(court_ids)}, "latitude": {"$ne": None}, "longitude": {"$ne": None}},
+                {"_id": 0, "id": 1, "latitude": 1, "longitude": 1}
+            )
+        }
+    own_court = home_courts.get(profile.get("home_court_id"))
+    
     # Get user details for suggestions
     suggestions = []
     for comp_profile in compatible_profiles:
+        distance_km = None
+        their_court = home_courts.get(comp_profile.get("home_court_id"))
+        if own_court and their_court:
+            distance_km = round(haversine_km(
+                own_court["latitude"], own_court["longitude"],
+                their_court["latitude"], their_court["longitude"]
+            ), 2)
+            if distance_km > profile["max_distance"]:
+                continue
         user = await db.users.find_one({"id": comp_profile["user_id"]})
         if user:
             suggestions.append({
                 "user": UserResponse(**user).dict(),
                 "matchmaking_profile": ChallengeMatchmaking(**comp_profile).dict(),
-                "compatibility_score": calculate_compatibility_score(profile, comp_profile)
+                "compatibility_score": calculate_compatibility_score(profile, comp_profile),
+                "distance_km": distance_km
             })
     
     # Sort by compatibility score
@@ -1108,6 +2078,7 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Configure logging
@@ -1117,10 +2088,134 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def startup_backplane():
+    # Relay broadcasts between uvicorn workers/hosts when running more than one
+    if os.environ.get("WS_BACKPLANE", "local") == "mongo":
+        await manager.attach_backplane(MongoBackplane(db))
+        logger.info(f"WebSocket backplane attached (node {manager.node_id})")
+
+@app.on_event("startup")
+async def startup_heartbeat():
+    manager.start_heartbeat(
+        interval=float(os.environ.get("WS_HEARTBEAT_INTERVAL_SECONDS", 20)),
+        idle_timeout=float(os.environ.get("WS_IDLE_TIMEOUT_SECONDS", 60))
+    )
+
+@app.on_event("startup")
+async def startup_indexes():
+    try:
+        # Makes offline tap uploads idempotent per reader
+        await db.rfid_events.create_index(
+            [("device_id", 1), ("local_seq", 1)],
+            unique=True,
+            partialFilterExpression={"local_seq": {"$type": "number"}}
+        )
+        await db.rfid_cards.create_index("sync_version")
+        await db.rfid_readers.create_index("device_id", unique=True)
+        # Keyset-paginated event and presence listings, and the retention TTL
+        await db.rfid_events.create_index([("timestamp", -1), ("id", -1)])
+        await db.rfid_events.create_index([("court_id", 1), ("timestamp", -1), ("id", -1)])
+        await db.rfid_events.create_index([("user_id", 1), ("timestamp", -1), ("id", -1)])
+        await db.court_presence.create_index([("user_id", 1), ("check_in_time", -1), ("id", -1)])
+        # Open sessions, for the presence sweeper and court listings
+        await db.court_presence.create_index([("check_out_time", 1), ("court_id", 1)])
+        # Utilization reads a court's sessions by check-in time
+        await db.court_presence.create_index([("court_id", 1), ("check_in_time", 1)])
+        # GeoJSON points for /courts/near, backfilled for courts created before they were stored
+        async for court in db.courts.find(
+            {"geo": None, "latitude": {"$ne": None}, "longitude": {"$ne": None}},
+            {"_id": 0, "id": 1, "latitude": 1, "longitude": 1}
+        ):
+            await db.courts.update_one({"id": court["id"]}, {"$set": {"geo": geo_point(court["latitude"], court["longitude"])}})
+        await db.courts.create_index([("geo", "2dsphere")])
+        await db.rfid_event_rollups.create_index([("court_id", 1), ("hour", 1)], unique=True)
+    except Exception as e:
+        logger.error(f"Index creation failed: {e!r}")
+    # Separately, so a retention change that fails on one collection still applies to the other
+    for collection, field, days in (
+        (db.rfid_events, "timestamp", RFID_EVENT_RETENTION_DAYS),
+        (db.rfid_event_rollups, "hour", RFID_ROLLUP_RETENTION_DAYS),
+    ):
+        try:
+            await ensure_retention(collection, field, days)
+        except Exception as e:
+            logger.error(f"Retention index on {collection.name} failed: {e!r}")
+    try:
+        # One open session per player and court, whichever worker admitted them
+        await db.court_presence.create_index(
+            [("user_id", 1), ("court_id", 1)],
+            unique=True,
+            partialFilterExpression={"status": PresenceStatus.CHECKED_IN.value}
+        )
+    except Exception as e:
+        # Usually duplicate open sessions left from before the index; close them and restart
+        logger.error(f"Open presence index creation failed: {e!r}")
+
+@app.on_event("startup")
+async def startup_rfid_card_index():
+    try:
+        await rfid_card_index.load(db.rfid_cards)
+    except Exception as e:
+        # Lookups fall back to the database until the next refresh succeeds
+        logger.error(f"RFID card index load failed: {e!r}")
+    try:
+        rfid_card_index.start(
+            db.rfid_cards,
+            watch=os.environ.get("RFID_CARD_CHANGE_STREAM", "false").lower() == "true"
+        )
+    except Exception as e:
+        # Taps still validate through the database; a failed refresh loop must not stop the app
+        logger.error(f"RFID card index refresh failed to start: {e!r}")
+
+@app.on_event("startup")
+async def startup_court_occupancy():
+    try:
+        await court_occupancy.load(db.court_presence)
+    except Exception as e:
+        logger.error(f"Court occupancy load failed: {e!r}")
+
+@app.on_event("startup")
+async def startup_presence_sweeper():
+    presence_sweeper.start()
+
+@app.on_event("startup")
+async def startup_access_policy():
+    try:
+        await access_policy.load(db.courts)
+    except Exception as e:
+        # Courts are looked up one by one until the next refresh succeeds
+        logger.error(f"Access policy load failed: {e!r}")
+    try:
+        access_policy.start(db.courts)
+    except Exception as e:
+        logger.error(f"Access policy refresh failed to start: {e!r}")
+
+@app.on_event("startup")
+async def startup_audit_writer():
+    try:
+        audit_writer.start(db.rfid_events)
+    except Exception as e:
+        # Records queue up to the limit and are counted as dropped past it
+        logger.error(f"RFID audit writer failed to start: {e!r}")
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await presence_sweeper.stop()
+    # Before the client closes, so queued audit records still reach the database
+    await audit_writer.stop()
+    await access_policy.stop()
+    await rfid_card_index.stop()
+    await manager.stop_heartbeat()
+    await manager.detach_backplane()
     client.close()
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=8001,
+        # Protocol-level permessage-deflate; browsers negotiate it transparently
+        ws_per_message_deflate=os.environ.get("WS_PER_MESSAGE_DEFLATE", "true").lower() == "true"
+    )
\ No newline at end of file
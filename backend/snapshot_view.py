@@ -0,0 +1,120 @@
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Loads a topic's current state (by topic id) from the database
+SnapshotProvider = Callable[[str], Awaitable[Optional[Dict[str, Any]]]]
+# Folds one broadcast into a cached snapshot; returning None drops the entry instead
+SnapshotReducer = Callable[[Dict[str, Any], dict], Optional[Dict[str, Any]]]
+
+# How long a cached snapshot may serve subscribers, as a bound on writes that never broadcast
+SNAPSHOT_TTL_SECONDS = 5.0
+SNAPSHOT_VIEW_SIZE = 10_000
+
+class SnapshotView:
+    """In-memory materialized view of each topic's current state.
+
+    Every entry is tagged with the topic sequence number it reflects. An entry
+    is served only while that seq is still the topic's latest, so a broadcast
+    implicitly invalidates it unless a reducer folds the broadcast in. Misses
+    load through the scope's provider once, however many subscribers arrive
+    together.
+    """
+
+    def __init__(self, ttl_seconds: float = SNAPSHOT_TTL_SECONDS, max_entries: int = SNAPSHOT_VIEW_SIZE):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.providers: Dict[str, SnapshotProvider] = {}
+        self.reducers: Dict[str, SnapshotReducer] = {}
+        # topic -> (seq, expires_at, snapshot), least recently used first
+        self._entries: "OrderedDict[str, Tuple[int, float, Dict[str, Any]]]" = OrderedDict()
+        self._loads: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.reduced = 0
+
+    def register(self, scope: str, provider: SnapshotProvider, reducer: Optional[SnapshotReducer] = None):
+        self.providers[scope] = provider
+        if reducer is not None:
+            self.reducers[scope] = reducer
+
+    def _provider_for(self, topic: str) -> Optional[Tuple[SnapshotProvider, str]]:
+        # Providers cover the plain "scope:<id>" topics
+        scope, _, topic_id = topic.partition(":")
+        provider = self.providers.get(scope)
+        if provider is None or not topic_id or ":" in topic_id:
+            return None
+        return provider, topic_id
+
+    async def get(self, topic: str, current_seq: Callable[[], int]) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """(seq, snapshot) for a concrete topic; the snapshot reflects at least that seq"""
+        target = self._provider_for(topic)
+        if target is None:
+            return None
+
+        seq = current_seq()
+        entry = self._entries.get(topic)
+        if entry is not None and entry[0] == seq and entry[1] > time.monotonic():
+            self._entries.move_to_end(topic)
+            self.hits += 1
+            return seq, entry[2]
+
+        loading = self._loads.get(topic)
+        if loading is not None:
+            self.hits += 1
+            return await asyncio.shield(loading)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._loads[topic] = future
+        result = None
+        try:
+            provider, topic_id = target
+            snapshot = await provider(topic_id)
+            if snapshot is not None:
+                result = (seq, snapshot)
+                # A broadcast landed mid-load: still a valid floor, but too racy to cache
+                if current_seq() == seq:
+                    self._store(topic, seq, snapshot)
+        except Exception as e:
+            logger.error(f"Snapshot provider for {topic} failed: {e!r}")
+        finally:
+            del self._loads[topic]
+            future.set_result(result)
+        return result
+
+    def _store(self, topic: str, seq: int, snapshot: Dict[str, Any]):
+        self._entries[topic] = (seq, time.monotonic() + self.ttl_seconds, snapshot)
+        self._entries.move_to_end(topic)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def apply(self, topic: str, message: dict):
+        """Fold a just-stamped broadcast into the cached snapshot, if it was current"""
+        entry = self._entries.get(topic)
+        if entry is None or entry[0] != message.get("seq", 0) - 1:
+            return
+        reducer = self.reducers.get(topic.partition(":")[0])
+        snapshot = reducer(entry[2], message) if reducer is not None else None
+        if snapshot is None:
+            del self._entries[topic]
+            return
+        self.reduced += 1
+        self._entries[topic] = (message["seq"], entry[1], snapshot)
+
+    def discard(self, topic: str):
+        self._entries.pop(topic, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "reduced": self.reduced,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None
+        }
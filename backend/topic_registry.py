@@ -0,0 +1,117 @@
+from typing import Dict, Set, Tuple
+
+# First segment of every topic, e.g. "court:<id>", "game:<id>", "tournament:<id>:matches"
+TOPIC_SCOPES = {"court", "game", "tournament"}
+# Matches exactly one topic segment, e.g. "court:*" or "tournament:*:matches"
+WILDCARD = "*"
+MAX_TOPIC_SEGMENTS = 4
+
+class SubscriptionError(ValueError):
+    pass
+
+def parse_topic(topic: str) -> Tuple[str, ...]:
+    """Split and validate a topic or pattern into its segments"""
+    if not isinstance(topic, str):
+        raise SubscriptionError("Topic must be a string")
+    segments = tuple(topic.split(":"))
+    if len(segments) < 2 or len(segments) > MAX_TOPIC_SEGMENTS:
+        raise SubscriptionError(f"Topic must have 2-{MAX_TOPIC_SEGMENTS} segments")
+    if segments[0] not in TOPIC_SCOPES:
+        raise SubscriptionError(f"Unknown topic scope '{segments[0]}'")
+    if any(not segment for segment in segments):
+        raise SubscriptionError("Topic segments must not be empty")
+    return segments
+
+def topic_for(scope: str, topic_id: str, *sub_topics: str) -> str:
+    return ":".join((scope, topic_id) + sub_topics)
+
+class TopicRegistry:
+    """Exact and wildcard topic subscriptions with a per-connection reverse index"""
+
+    def __init__(self, max_subscriptions_per_connection: int):
+        self.max_subscriptions_per_connection = max_subscriptions_per_connection
+        # Concrete topic -> connection ids
+        self.exact: Dict[str, Set[str]] = {}
+        # Wildcard pattern -> (segments, connection ids)
+        self.patterns: Dict[str, Tuple[Tuple[str, ...], Set[str]]] = {}
+        # Connection id -> topics and patterns it holds
+        self.by_connection: Dict[str, Set[str]] = {}
+
+    def subscribe(self, connection_id: str, topic: str) -> bool:
+        """Add a subscription; returns False if it already existed"""
+        segments = parse_topic(topic)
+        held = self.by_connection.setdefault(connection_id, set())
+        if topic in held:
+            return False
+        if len(held) >= self.max_subscriptions_per_connection:
+            raise SubscriptionError(
+                f"Subscription limit of {self.max_subscriptions_per_connection} reached; use a wildcard topic"
+            )
+
+        if WILDCARD in segments:
+            self.patterns.setdefault(topic, (segments, set()))[1].add(connection_id)
+        else:
+            self.exact.setdefault(topic, set()).add(connection_id)
+        held.add(topic)
+        return True
+
+    def unsubscribe(self, connection_id: str, topic: str) -> bool:
+        held = self.by_connection.get(connection_id)
+        if not held or topic not in held:
+            return False
+        held.discard(topic)
+        if not held:
+            del self.by_connection[connection_id]
+        self._discard(connection_id, topic)
+        return True
+
+    def remove_connection(self, connection_id: str):
+        """Drop every subscription of a connection, touching only the topics it joined"""
+        for topic in self.by_connection.pop(connection_id, ()):
+            self._discard(connection_id, topic)
+
+    def _discard(self, connection_id: str, topic: str):
+        subscribers = self.exact.get(topic)
+        if subscribers is not None:
+            subscribers.discard(connection_id)
+            # Garbage-collect empty topics
+            if not subscribers:
+                del self.exact[topic]
+            return
+        pattern = self.patterns.get(topic)
+        if pattern is not None:
+            pattern[1].discard(connection_id)
+            if not pattern[1]:
+                del self.patterns[topic]
+
+    def subscribers(self, topic: str) -> Set[str]:
+        """Connections subscribed to a concrete topic, directly or via a wildcard"""
+        subscribers = set(self.exact.get(topic, ()))
+        if self.patterns:
+            segments = topic.split(":")
+            for pattern_segments, connection_ids in self.patterns.values():
+                if len(pattern_segments) == len(segments) and all(
+                    expected == WILDCARD or expected == actual
+                    for expected, actual in zip(pattern_segments, segments)
+                ):
+                    subscribers |= connection_ids
+        return subscribers
+
+    def topics_of(self, connection_id: str) -> Set[str]:
+        return set(self.by_connection.get(connection_id, ()))
+
+    def counts_by_scope(self, scope: str) -> Dict[str, int]:
+        """Subscriber counts for "scope:<id>" topics, keyed by id"""
+        prefix = f"{scope}:"
+        return {
+            topic[len(prefix):]: len(connection_ids)
+            for topic, connection_ids in self.exact.items()
+            if topic.startswith(prefix) and topic.count(":") == 1
+        }
+
+    def stats(self) -> dict:
+        return {
+            "topics": len(self.exact),
+            "patterns": {pattern: len(entry[1]) for pattern, entry in self.patterns.items()},
+            "max_subscriptions_per_connection": self.max_subscriptions_per_connection
+        }
@@ -1,238 +1,770 @@
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import Dict, List, Set
-import json
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+from collections import OrderedDict, deque
+from enum import Enum
 import asyncio
 import logging
+import os
+import time
 from datetime import datetime
 import uuid
 
+from broadcast_backplane import Backplane
+from snapshot_view import SnapshotProvider, SnapshotReducer, SnapshotView
+from topic_registry import SubscriptionError, TopicRegistry, WILDCARD, parse_topic, topic_for
+from wire_format import DEFAULT_CODEC, Frame, WireCodec
+
 logger = logging.getLogger(__name__)
 
+# Maximum time a single send may take before the connection is considered dead
+SEND_TIMEOUT_SECONDS = 5.0
+# Frames buffered per connection before the overflow policy kicks in
+MAX_OUTBOUND_QUEUE = 256
+# Concurrent connections (tabs/devices) allowed per user; the oldest is dropped beyond this
+MAX_CONNECTIONS_PER_USER = 5
+# Topics/patterns one connection may hold; dashboards should use wildcards like "court:*"
+MAX_SUBSCRIPTIONS_PER_CONNECTION = 200
+# Message types that carry full state, so a newer frame supersedes a queued one
+COALESCIBLE_MESSAGE_TYPES = {"score_update"}
+# Default per-topic coalescing window for state messages (0 disables coalescing)
+COALESCE_WINDOW_SECONDS = 0.0
+# Server heartbeat cadence, how long a silent connection may live, and reap batch size
+HEARTBEAT_INTERVAL_SECONDS = 20.0
+IDLE_TIMEOUT_SECONDS = 60.0
+REAP_BATCH_SIZE = 500
+# Upper bounds (seconds) of the connection age histogram buckets
+CONNECTION_AGE_BUCKETS = [(60, "<1m"), (300, "1-5m"), (1800, "5-30m"), (7200, "30m-2h")]
+
+# Frames kept per topic for resume, and how many topics keep a replay buffer
+REPLAY_BUFFER_SIZE = 512
+MAX_REPLAY_TOPICS = 10_000
+
+class QueuePolicy(str, Enum):
+    DROP_OLDEST = "drop_oldest"
+    COALESCE = "coalesce"
+    DISCONNECT = "disconnect"
+
+class ClientConnection:
+    """A WebSocket plus its bounded outbound queue, drained by a writer task"""
+
+    def __init__(
+        self,
+        connection_id: str,
+        websocket: WebSocket,
+        user_id: str,
+        codec: WireCodec,
+        max_queue: int,
+        policy: QueuePolicy,
+        send_timeout: float,
+        on_failure: Callable[[str], Awaitable[None]]
+    ):
+        self.connection_id = connection_id
+        self.websocket = websocket
+        self.user_id = user_id
+        self.codec = codec
+        self.connected_at = datetime.utcnow()
+        # Monotonic time of the last frame received from the client
+        self.last_seen = time.monotonic()
+        self.max_queue = max_queue
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.on_failure = on_failure
+        # Pending frames as (coalesce_key, payload)
+        self.queue: Deque[Tuple[Optional[str], Frame]] = deque()
+        self.sending = False
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.frames_coalesced = 0
+        self._wakeup = asyncio.Event()
+        self.writer_task = asyncio.create_task(self._writer())
+
+    @property
+    def idle(self) -> bool:
+        return not self.queue and not self.sending
+
+    def enqueue(self, payload: Frame, coalesce_key: Optional[str] = None) -> bool:
+        """Queue a frame without blocking; returns False if the client must be evicted"""
+        if coalesce_key is not None and self.policy == QueuePolicy.COALESCE:
+            for index, (key, _) in enumerate(self.queue):
+                if key == coalesce_key:
+                    self.queue[index] = (coalesce_key, payload)
+                    self.frames_coalesced += 1
+                    return True
+        
+        if len(self.queue) >= self.max_queue:
+            if self.policy == QueuePolicy.DISCONNECT:
+                return False
+            self.queue.popleft()
+            self.frames_dropped += 1
+        
+        self.queue.append((coalesce_key, payload))
+        self._wakeup.set()
+        return True
+
+    async def _writer(self):
+        while True:
+            if not self.queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            
+            _, payload = self.queue.popleft()
+            self.sending = True
+            try:
+                if isinstance(payload, bytes):
+                    await asyncio.wait_for(self.websocket.send_bytes(payload), self.send_timeout)
+                else:
+                    await asyncio.wait_for(self.websocket.send_text(payload), self.send_timeout)
+                self.frames_sent += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error sending to {self.connection_id}: {e!r}")
+                await self.on_failure(self.connection_id)
+                return
+            finally:
+                self.sending = False
+
+class TopicStream:
+    """Monotonic sequence numbers and a bounded replay buffer for one topic"""
+
+    def __init__(self, buffer_size: int):
+        self.last_seq = 0
+        self.buffer: Deque[Tuple[int, dict]] = deque(maxlen=buffer_size)
+
+    def stamp(self, topic: str, message: dict) -> dict:
+        self.last_seq += 1
+        stamped = {**message, "topic": topic, "seq": self.last_seq}
+        self.buffer.append((self.last_seq, stamped))
+        return stamped
+
+    def replay_after(self, last_seq: int) -> Optional[List[dict]]:
+        """Frames newer than last_seq, or None if some of them were already evicted"""
+        oldest_seq = self.buffer[0][0] if self.buffer else self.last_seq + 1
+        if last_seq < oldest_seq - 1 or last_seq > self.last_seq:
+            return None
+        return [message for seq, message in self.buffer if seq > last_seq]
+
+def _coalesce_key(message: dict, topic: str) -> Optional[str]:
+    if message.get("type") in COALESCIBLE_MESSAGE_TYPES:
+        return f"{message['type']}:{topic}"
+    return None
+
 class ConnectionManager:
-    def __init__(self):
+    def __init__(
+        self,
+        send_timeout: float = SEND_TIMEOUT_SECONDS,
+        max_queue_size: int = MAX_OUTBOUND_QUEUE,
+        overflow_policy: QueuePolicy = QueuePolicy.DROP_OLDEST,
+        max_connections_per_user: int = MAX_CONNECTIONS_PER_USER,
+        node_id: Optional[str] = None,
+        coalesce_window: float = COALESCE_WINDOW_SECONDS,
+        max_subscriptions_per_connection: int = MAX_SUBSCRIPTIONS_PER_CONNECTION
+    ):
+        # Identifies this worker on the broadcast backplane
+        self.node_id = node_id or str(uuid.uuid4())
+        self.backplane: Optional[Backplane] = None
+        self.send_timeout = send_timeout
+        self.max_connections_per_user = max_connections_per_user
+        self.max_queue_size = max_queue_size
+        self.overflow_policy = overflow_policy
+        self.coalesce_window = coalesce_window
+        # Per-topic window overrides (topic -> seconds)
+        self.coalesce_overrides: Dict[str, float] = {}
+        # Latest state message held back during an open window, and the window timers
+        self._coalesce_pending: Dict[str, dict] = {}
+        self._coalesce_windows: Dict[str, asyncio.Task] = {}
+        self.frames_superseded = 0
+        # Per-topic sequence streams (topic -> TopicStream), least recently used first
+        self.replay_buffer_size = REPLAY_BUFFER_SIZE
+        self._streams: "OrderedDict[str, TopicStream]" = OrderedDict()
+        # Current state per topic, for subscribe confirmations and stale resumes
+        self.snapshots = SnapshotView()
+        self.resumes_replayed = 0
+        self.resumes_snapshotted = 0
+        # Heartbeat/reaper state
+        self.heartbeat_interval = HEARTBEAT_INTERVAL_SECONDS
+        self.idle_timeout = IDLE_TIMEOUT_SECONDS
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self.reaped_total = 0
+        self.last_reap_count = 0
+        # Slow consumers disconnected because their queue overflowed
+        self.slow_consumer_evictions = 0
+        # Frames dropped by connections that have since gone away
+        self.retired_frames_dropped = 0
         # Active WebSocket connections
-        self.active_connections: Dict[str, WebSocket] = {}
-        # User ID to connection ID mapping
-        self.user_connections: Dict[str, str] = {}
-        # Court subscriptions (court_id -> set of connection_ids)
-        self.court_subscriptions: Dict[str, Set[str]] = {}
-        # Game subscriptions (game_id -> set of connection_ids)
-        self.game_subscriptions: Dict[str, Set[str]] = {}
-        # Tournament subscriptions (tournament_id -> set of connection_ids)
-        self.tournament_subscriptions: Dict[str, Set[str]] = {}
+        self.active_connections: Dict[str, ClientConnection] = {}
+        # User ID to connection IDs (one per tab/device)
+        self.user_connections: Dict[str, Set[str]] = {}
+        # Court/game/tournament topic subscriptions, including wildcards
+        self.topics = TopicRegistry(max_subscriptions_per_connection)
         # General subscriptions (all users)
         self.general_subscriptions: Set[str] = set()
 
-    async def connect(self, websocket: WebSocket, user_id: str) -> str:
-        """Accept a WebSocket connection and register user"""
-        await websocket.accept()
+    async def connect(self, websocket: WebSocket, user_id: str, codec: WireCodec = DEFAULT_CODEC, accepted: bool = False) -> str:
+        """Accept a WebSocket connection (unless the caller already did, e.g. to authenticate it) and register user"""
+        if not accepted:
+            await websocket.accept()
         connection_id = str(uuid.uuid4())
         
-        self.active_connections[connection_id] = websocket
-        self.user_connections[user_id] = connection_id
+        self.active_connections[connection_id] = ClientConnection(
+            connection_id,
+            websocket,
+            user_id,
+            codec,
+            self.max_queue_size,
+            self.overflow_policy,
+            self.send_timeout,
+            self._on_send_failure
+        )
+        user_connection_ids = self.user_connections.setdefault(user_id, set())
+        first_connection = not user_connection_ids
+        user_connection_ids.add(connection_id)
         self.general_subscriptions.add(connection_id)
         
         logger.info(f"User {user_id} connected with connection {connection_id}")
         
+        # Enforce the per-user cap by dropping the user's oldest connections
+        if len(user_connection_ids) > self.max_connections_per_user:
+            surplus = sorted(
+                (cid for cid in user_connection_ids if cid != connection_id),
+                key=lambda cid: self.active_connections[cid].connected_at
+            )[:len(user_connection_ids) - self.max_connections_per_user]
+            logger.info(f"User {user_id} exceeded {self.max_connections_per_user} connections, closing {len(surplus)}")
+            await self._evict(surplus, code=1008)
+        
         # Send welcome message
         await self.send_personal_message({
             "type": "connection_established",
             "message": "Connected to M2DG Basketball real-time system",
             "connection_id": connection_id,
+            # Sequence numbers are only comparable within one epoch (this worker's lifetime)
+            "epoch": self.node_id,
+            "encoding": codec.encoding.value,
+            "compression": codec.compression.value,
             "timestamp": datetime.utcnow().isoformat()
         }, connection_id)
         
-        # Broadcast user connected event
-        await self.broadcast_general({
-            "type": "user_connected",
-            "user_id": user_id,
-            "timestamp": datetime.utcnow().isoformat()
-        })
+        # Broadcast user connected event for the user's first device only
+        if first_connection:
+            await self.broadcast_general({
+                "type": "user_connected",
+                "user_id": user_id,
+                "timestamp": datetime.utcnow().isoformat()
+            })
         
         return connection_id
 
+    def _remove_connection(self, connection_id: str) -> Optional[str]:
+        """Drop a connection from every index; returns the user ID if it was their last one"""
+        connection = self.active_connections.pop(connection_id)
+        self.retired_frames_dropped += connection.frames_dropped
+        if connection.writer_task is not asyncio.current_task():
+            connection.writer_task.cancel()
+        
+        # Remove only from the topics this connection joined
+        self.general_subscriptions.discard(connection_id)
+        self.topics.remove_connection(connection_id)
+        
+        # Only report the user as gone once their last device disconnects
+        user_id = None
+        user_connection_ids = self.user_connections.get(connection.user_id)
+        if user_connection_ids is not None:
+            user_connection_ids.discard(connection_id)
+            if not user_connection_ids:
+                user_id = connection.user_id
+                del self.user_connections[user_id]
+        
+        logger.info(f"Connection {connection_id} (user: {connection.user_id}) disconnected")
+        return user_id
+
     async def disconnect(self, connection_id: str):
         """Remove connection and clean up subscriptions"""
         if connection_id in self.active_connections:
-            # Find user ID
-            user_id = None
-            for uid, conn_id in self.user_connections.items():
-                if conn_id == connection_id:
-                    user_id = uid
-                    break
-            
-            # Remove from all subscriptions
-            self.general_subscriptions.discard(connection_id)
-            
-            for court_subs in self.court_subscriptions.values():
-                court_subs.discard(connection_id)
-            
-            for game_subs in self.game_subscriptions.values():
-                game_subs.discard(connection_id)
-            
-            for tournament_subs in self.tournament_subscriptions.values():
-                tournament_subs.discard(connection_id)
-            
-            # Remove connection
-            del self.active_connections[connection_id]
+            user_id = self._remove_connection(connection_id)
             if user_id:
-                self.user_connections.pop(user_id, None)
-                
                 # Broadcast user disconnected event
                 await self.broadcast_general({
                     "type": "user_disconnected",
                     "user_id": user_id,
                     "timestamp": datetime.utcnow().isoformat()
                 })
-            
-            logger.info(f"Connection {connection_id} (user: {user_id}) disconnected")
+
+    async def _evict(self, connection_ids: List[str], code: int = 1011):
+        """Disconnect a batch of failed connections in a single pass"""
+        websockets = []
+        departed_users = []
+        for connection_id in connection_ids:
+            connection = self.active_connections.get(connection_id)
+            if connection is None:
+                continue
+            websockets.append(connection.websocket)
+            user_id = self._remove_connection(connection_id)
+            if user_id:
+                departed_users.append(user_id)
+        
+        # Best-effort close so the client notices and reconnects
+        await asyncio.gather(
+            *(asyncio.wait_for(ws.close(code=code), self.send_timeout) for ws in websockets),
+            return_exceptions=True
+        )
+        
+        for user_id in departed_users:
+            await self.broadcast_general({
+                "type": "user_disconnected",
+                "user_id": user_id,
+                "timestamp": datetime.utcnow().isoformat()
+            })
+
+    async def _on_send_failure(self, connection_id: str):
+        """Called by a writer task whose send failed or timed out"""
+        await self._evict([connection_id])
+
+    async def _fan_out(self, message: dict, connection_ids: Iterable[str], coalesce_key: Optional[str] = None):
+        """Encode a message once per wire format and queue it on every target connection"""
+        targets = [
+            self.active_connections[connection_id]
+            for connection_id in connection_ids
+            if connection_id in self.active_connections
+        ]
+        if not targets:
+            return
+        
+        payloads: Dict[str, Frame] = {}
+        overflowed = []
+        for connection in targets:
+            codec = connection.codec
+            payload = payloads.get(codec.key)
+            if payload is None:
+                payload = payloads[codec.key] = codec.encode(message)
+            if not connection.enqueue(payload, coalesce_key):
+                overflowed.append(connection.connection_id)
+        
+        # Clean up slow consumers that could not keep up
+        if overflowed:
+            logger.warning(f"Evicting {len(overflowed)} slow consumer(s) on {message.get('type')}")
+            self.slow_consumer_evictions += len(overflowed)
+            await self._evict(overflowed)
+
+    async def wait_until_drained(self, timeout: float = SEND_TIMEOUT_SECONDS):
+        """Wait until every outbound queue has been flushed to its socket"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while loop.time() < deadline:
+            if all(connection.idle for connection in self.active_connections.values()):
+                return True
+            await asyncio.sleep(0.005)
+        return False
 
     async def send_personal_message(self, message: dict, connection_id: str):
         """Send a message to a specific connection"""
-        if connection_id in self.active_connections:
-            try:
-                websocket = self.active_connections[connection_id]
-                await websocket.send_text(json.dumps(message))
-            except Exception as e:
-                logger.error(f"Error sending message to {connection_id}: {e}")
-                await self.disconnect(connection_id)
+        await self._fan_out(message, [connection_id])
 
     async def send_to_user(self, message: dict, user_id: str):
-        """Send a message to a specific user"""
-        connection_id = self.user_connections.get(user_id)
-        if connection_id:
-            await self.send_personal_message(message, connection_id)
+        """Send a message to every connection of a specific user"""
+        connection_ids = self.user_connections.get(user_id)
+        if connection_ids:
+            await self._fan_out(message, list(connection_ids))
 
-    async def broadcast_general(self, message: dict):
-        """Broadcast message to all connected users"""
+    async def attach_backplane(self, backplane: Backplane):
+        """Relay broadcasts through a backplane so every worker's clients receive them"""
+        self.backplane = backplane
+        await backplane.start(self._on_backplane_envelope)
+
+    async def detach_backplane(self):
+        if self.backplane is not None:
+            await self.backplane.stop()
+            self.backplane = None
+
+    async def _on_backplane_envelope(self, envelope: dict):
+        # Our own broadcasts were already delivered locally
+        if envelope.get("origin") == self.node_id:
+            return
+        await self._deliver(envelope.get("topic"), envelope["message"])
+
+    async def _publish(self, topic: Optional[str], message: dict):
+        """Deliver to local subscribers, then relay to the other workers (topic None = everyone)"""
         message["timestamp"] = datetime.utcnow().isoformat()
-        disconnected_connections = []
-        
-        for connection_id in list(self.general_subscriptions):
+        await self._deliver(topic, message)
+        if self.backplane is not None:
             try:
-                if connection_id in self.active_connections:
-                    websocket = self.active_connections[connection_id]
-                    await websocket.send_text(json.dumps(message))
+                await self.backplane.publish({
+                    "origin": self.node_id,
+                    "topic": topic,
+                    "message": message
+                })
             except Exception as e:
-                logger.error(f"Error broadcasting to {connection_id}: {e}")
-                disconnected_connections.append(connection_id)
+                logger.error(f"Error publishing {message.get('type')} to backplane: {e!r}")
+
+    def set_coalesce_window(self, topic: str, window: Optional[float]):
+        """Override the coalescing window for one topic; None restores the default"""
+        if window is None:
+            self.coalesce_overrides.pop(topic, None)
+        else:
+            self.coalesce_overrides[topic] = window
+
+    async def _deliver(self, topic: Optional[str], message: dict):
+        """Fan a broadcast out to this worker's subscribers, coalescing state bursts"""
+        if topic is None:
+            await self._fan_out(message, list(self.general_subscriptions))
+            return
+        
+        window = self.coalesce_overrides.get(topic, self.coalesce_window)
+        if window <= 0:
+            await self._deliver_now(topic, message)
+            return
+        
+        if message.get("type") not in COALESCIBLE_MESSAGE_TYPES:
+            # Ordered events go straight through, after any held-back state
+            pending = self._coalesce_pending.pop(topic, None)
+            if pending is not None:
+                await self._deliver_now(topic, pending)
+            await self._deliver_now(topic, message)
+            return
+        
+        if topic in self._coalesce_windows:
+            # Inside an open window: keep only the latest state
+            if topic in self._coalesce_pending:
+                self.frames_superseded += 1
+            self._coalesce_pending[topic] = message
+            return
         
-        # Clean up disconnected connections
-        for connection_id in disconnected_connections:
-            await self.disconnect(connection_id)
+        # Leading edge goes out immediately and opens a window
+        await self._deliver_now(topic, message)
+        self._coalesce_windows[topic] = asyncio.create_task(self._close_coalesce_window(topic, window))
 
-    async def subscribe_to_court(self, connection_id: str, court_id: str):
-        """Subscribe connection to court updates"""
-        if court_id not in self.court_subscriptions:
-            self.court_subscriptions[court_id] = set()
-        self.court_subscriptions[court_id].add(connection_id)
+    async def _close_coalesce_window(self, topic: str, window: float):
+        """Flush the trailing state so clients never keep a stale score"""
+        try:
+            while True:
+                await asyncio.sleep(window)
+                pending = self._coalesce_pending.pop(topic, None)
+                if pending is None:
+                    break
+                await self._deliver_now(topic, pending)
+        finally:
+            self._coalesce_windows.pop(topic, None)
+
+    async def _deliver_now(self, topic: str, message: dict):
+        # Stamp even without subscribers so a lone reconnecting client can resume
+        message = self._stream(topic).stamp(topic, message)
+        self.snapshots.apply(topic, message)
+        subscribers = self.topics.subscribers(topic)
+        if subscribers:
+            await self._fan_out(message, list(subscribers), _coalesce_key(message, topic))
+
+    def _stream(self, topic: str) -> TopicStream:
+        stream = self._streams.get(topic)
+        if stream is None:
+            stream = self._streams[topic] = TopicStream(self.replay_buffer_size)
+            if len(self._streams) > MAX_REPLAY_TOPICS:
+                evicted, _ = self._streams.popitem(last=False)
+                # Its seq restarts at 0, so a cached snapshot could match by accident
+                self.snapshots.discard(evicted)
+        else:
+            self._streams.move_to_end(topic)
+        return stream
+
+    def _last_seq(self, topic: str) -> int:
+        stream = self._streams.get(topic)
+        return stream.last_seq if stream else 0
+
+    def register_snapshot_provider(
+        self,
+        scope: str,
+        provider: SnapshotProvider,
+        reducer: Optional[SnapshotReducer] = None
+    ):
+        """Install the coroutine that loads a topic's current state, and optionally a
+        reducer that keeps the cached state current from the scope's broadcasts"""
+        self.snapshots.register(scope, provider, reducer)
+
+    async def current_state(self, topic: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """(seq, snapshot) for a concrete topic from the materialized view"""
+        return await self.snapshots.get(topic, lambda: self._last_seq(topic))
+
+    async def resume(self, connection_id: str, topic: str, last_seq: int, epoch: Optional[str]):
+        """Re-subscribe a reconnecting client and send only the frames it missed"""
+        if connection_id not in self.active_connections:
+            return
+        try:
+            segments = parse_topic(topic)
+            if WILDCARD in segments:
+                raise SubscriptionError("Resume needs a concrete topic")
+            self.topics.subscribe(connection_id, topic)
+        except SubscriptionError as e:
+            await self._send_subscription_error(connection_id, topic, str(e))
+            return
+        
+        stream = self._streams.get(topic)
+        missed = None
+        if epoch == self.node_id:
+            missed = stream.replay_after(last_seq) if stream else ([] if last_seq == 0 else None)
         
+        if missed is not None:
+            self.resumes_replayed += 1
+            for message in missed:
+                await self._fan_out(message, [connection_id])
+            await self.send_personal_message({
+                "type": "resume_complete",
+                "topic": topic,
+                "replayed": len(missed),
+                "seq": stream.last_seq if stream else 0,
+                "timestamp": datetime.utcnow().isoformat()
+            }, connection_id)
+            return
+        
+        # Gap too old (or a different worker/epoch): fall back to a state snapshot
+        self.resumes_snapshotted += 1
+        state = await self.current_state(topic)
+        seq, snapshot = state if state is not None else (self._last_seq(topic), None)
         await self.send_personal_message({
-            "type": "subscription_confirmed",
-            "subscription_type": "court",
-            "court_id": court_id,
+            "type": "snapshot" if snapshot is not None else "resync_required",
+            "topic": topic,
+            "epoch": self.node_id,
+            # Frames with a higher seq than this may follow and apply on top
+            "seq": seq,
+            "data": snapshot,
             "timestamp": datetime.utcnow().isoformat()
         }, connection_id)
 
+    async def _send_subscription_error(self, connection_id: str, topic, reason: str):
+        await self.send_personal_message({
+            "type": "error",
+            "message": reason,
+            "topic": topic,
+            "timestamp": datetime.utcnow().isoformat()
+        }, connection_id)
+
+    async def subscribe(self, connection_id: str, topics: List[str], snapshot: bool = False):
+        """Subscribe to a batch of topics/patterns and confirm them in one frame,
+        optionally with the current state of each concrete topic"""
+        if connection_id not in self.active_connections:
+            return
+        accepted = []
+        rejected = []
+        for topic in topics:
+            try:
+                self.topics.subscribe(connection_id, topic)
+                accepted.append(topic)
+            except SubscriptionError as e:
+                rejected.append({"topic": topic, "reason": str(e)})
+        
+        confirmation = {
+            "type": "subscription_confirmed",
+            "topics": accepted,
+            "rejected": rejected,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        if snapshot:
+            concrete = [topic for topic in accepted if WILDCARD not in topic.split(":")]
+            states = await asyncio.gather(*(self.current_state(topic) for topic in concrete))
+            # Frames with a higher seq than a snapshot's may follow and apply on top
+            confirmation["snapshots"] = {
+                topic: {"seq": state[0], "data": state[1]}
+                for topic, state in zip(concrete, states) if state is not None
+            }
+        await self.send_personal_message(confirmation, connection_id)
+
+    async def unsubscribe(self, connection_id: str, topics: List[str]):
+        """Drop a batch of topics/patterns"""
+        for topic in topics:
+            self.topics.unsubscribe(connection_id, topic)
+
+    async def _subscribe_legacy(self, connection_id: str, scope: str, topic_id: str, snapshot: bool):
+        """Single-topic subscribe that keeps the original confirmation shape"""
+        if connection_id not in self.active_connections:
+            return
+        topic = topic_for(scope, topic_id)
+        try:
+            self.topics.subscribe(connection_id, topic)
+        except SubscriptionError as e:
+            await self._send_subscription_error(connection_id, topic, str(e))
+            return
+        
+        confirmation = {
+            "type": "subscription_confirmed",
+            "subscription_type": scope,
+            f"{scope}_id": topic_id,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        if snapshot:
+            state = await self.current_state(topic)
+            confirmation["topic"] = topic
+            confirmation["seq"] = state[0] if state is not None else self._last_seq(topic)
+            confirmation["snapshot"] = state[1] if state is not None else None
+        await self.send_personal_message(confirmation, connection_id)
+
+    async def broadcast_general(self, message: dict):
+        """Broadcast message to all connected users"""
+        await self._publish(None, message)
+
+    async def broadcast_to_topic(self, message: dict, topic: str):
+        """Broadcast message to all subscribers of a concrete topic"""
+        await self._publish(topic, message)
+
+    async def subscribe_to_court(self, connection_id: str, court_id: str, snapshot: bool = False):
+        """Subscribe connection to court updates"""
+        await self._subscribe_legacy(connection_id, "court", court_id, snapshot)
+
     async def unsubscribe_from_court(self, connection_id: str, court_id: str):
         """Unsubscribe connection from court updates"""
-        if court_id in self.court_subscriptions:
-            self.court_subscriptions[court_id].discard(connection_id)
-            if not self.court_subscriptions[court_id]:
-                del self.court_subscriptions[court_id]
+        self.topics.unsubscribe(connection_id, topic_for("court", court_id))
 
     async def broadcast_to_court(self, message: dict, court_id: str):
         """Broadcast message to all court subscribers"""
-        if court_id in self.court_subscriptions:
-            message["timestamp"] = datetime.utcnow().isoformat()
-            disconnected_connections = []
-            
-            for connection_id in list(self.court_subscriptions[court_id]):
-                try:
-                    if connection_id in self.active_connections:
-                        websocket = self.active_connections[connection_id]
-                        await websocket.send_text(json.dumps(message))
-                except Exception as e:
-                    logger.error(f"Error broadcasting court update to {connection_id}: {e}")
-                    disconnected_connections.append(connection_id)
-            
-            # Clean up disconnected connections
-            for connection_id in disconnected_connections:
-                self.court_subscriptions[court_id].discard(connection_id)
+        await self._publish(topic_for("court", court_id), message)
 
-    async def subscribe_to_game(self, connection_id: str, game_id: str):
+    async def subscribe_to_game(self, connection_id: str, game_id: str, snapshot: bool = False):
         """Subscribe connection to game updates"""
-        if game_id not in self.game_subscriptions:
-            self.game_subscriptions[game_id] = set()
-        self.game_subscriptions[game_id].add(connection_id)
-        
-        await self.send_personal_message({
-            "type": "subscription_confirmed",
-            "subscription_type": "game",
-            "game_id": game_id,
-            "timestamp": datetime.utcnow().isoformat()
-        }, connection_id)
+        await self._subscribe_legacy(connection_id, "game", game_id, snapshot)
+
+    async def unsubscribe_from_game(self, connection_id: str, game_id: str):
+        """Unsubscribe connection from game updates"""
+        self.topics.unsubscribe(connection_id, topic_for("game", game_id))
 
     async def broadcast_to_game(self, message: dict, game_id: str):
         """Broadcast message to all game subscribers"""
-        if game_id in self.game_subscriptions:
-            message["timestamp"] = datetime.utcnow().isoformat()
-            disconnected_connections = []
-            
-            for connection_id in list(self.game_subscriptions[game_id]):
-                try:
-                    if connection_id in self.active_connections:
-                        websocket = self.active_connections[connection_id]
-                        await websocket.send_text(json.dumps(message))
-                except Exception as e:
-                    logger.error(f"Error broadcasting game update to {connection_id}: {e}")
-                    disconnected_connections.append(connection_id)
-            
-            # Clean up disconnected connections
-            for connection_id in disconnected_connections:
-                self.game_subscriptions[game_id].discard(connection_id)
+        await self._publish(topic_for("game", game_id), message)
 
-    async def subscribe_to_tournament(self, connection_id: str, tournament_id: str):
+    async def subscribe_to_tournament(self, connection_id: str, tournament_id: str, snapshot: bool = False):
         """Subscribe connection to tournament updates"""
-        if tournament_id not in self.tournament_subscriptions:
-            self.tournament_subscriptions[tournament_id] = set()
-        self.tournament_subscriptions[tournament_id].add(connection_id)
-        
-        await self.send_personal_message({
-            "type": "subscription_confirmed",
-            "subscription_type": "tournament",
-            "tournament_id": tournament_id,
-            "timestamp": datetime.utcnow().isoformat()
-        }, connection_id)
+        await self._subscribe_legacy(connection_id, "tournament", tournament_id, snapshot)
+
+    async def unsubscribe_from_tournament(self, connection_id: str, tournament_id: str):
+        """Unsubscribe connection from tournament updates"""
+        self.topics.unsubscribe(connection_id, topic_for("tournament", tournament_id))
 
     async def broadcast_to_tournament(self, message: dict, tournament_id: str):
         """Broadcast message to all tournament subscribers"""
-        if tournament_id in self.tournament_subscriptions:
-            message["timestamp"] = datetime.utcnow().isoformat()
-            disconnected_connections = []
-            
-            for connection_id in list(self.tournament_subscriptions[tournament_id]):
-                try:
-                    if connection_id in self.active_connections:
-                        websocket = self.active_connections[connection_id]
-                        await websocket.send_text(json.dumps(message))
-                except Exception as e:
-                    logger.error(f"Error broadcasting tournament update to {connection_id}: {e}")
-                    disconnected_connections.append(connection_id)
-            
-            # Clean up disconnected connections
-            for connection_id in disconnected_connections:
-                self.tournament_subscriptions[tournament_id].discard(connection_id)
+        await self._publish(topic_for("tournament", tournament_id), message)
+
+    def touch(self, connection_id: str):
+        """Record that a frame arrived from this connection"""
+        connection = self.active_connections.get(connection_id)
+        if connection is not None:
+            connection.last_seen = time.monotonic()
+
+    def start_heartbeat(
+        self,
+        interval: float = HEARTBEAT_INTERVAL_SECONDS,
+        idle_timeout: float = IDLE_TIMEOUT_SECONDS
+    ):
+        """Start pinging connections and reaping ones that stay silent"""
+        self.heartbeat_interval = interval
+        self.idle_timeout = idle_timeout
+        if self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop_heartbeat(self):
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            await asyncio.gather(self._heartbeat_task, return_exceptions=True)
+            self._heartbeat_task = None
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.heartbeat_once()
+            except Exception as e:
+                logger.error(f"Heartbeat failed: {e!r}")
+
+    async def heartbeat_once(self) -> int:
+        """Reap idle connections in batches, then ping the quiet ones; returns the reaped count"""
+        now = time.monotonic()
+        idle = [
+            connection_id
+            for connection_id, connection in self.active_connections.items()
+            if now - connection.last_seen > self.idle_timeout
+        ]
+        for start in range(0, len(idle), REAP_BATCH_SIZE):
+            await self._evict(idle[start:start + REAP_BATCH_SIZE], code=1001)
+            # Let other work run between batches
+            await asyncio.sleep(0)
+        self.last_reap_count = len(idle)
+        self.reaped_total += len(idle)
+        if idle:
+            logger.info(f"Reaped {len(idle)} idle WebSocket connection(s)")
+        
+        # Only connections we have not heard from this interval need a ping
+        quiet = [
+            connection_id
+            for connection_id, connection in self.active_connections.items()
+            if now - connection.last_seen >= self.heartbeat_interval
+        ]
+        if quiet:
+            await self._fan_out({"type": "heartbeat", "timestamp": datetime.utcnow().isoformat()}, quiet)
+        return len(idle)
+
+    def _connection_age_histogram(self) -> Dict[str, int]:
+        histogram = {label: 0 for _, label in CONNECTION_AGE_BUCKETS}
+        histogram[">2h"] = 0
+        now = datetime.utcnow()
+        for connection in self.active_connections.values():
+            age = (now - connection.connected_at).total_seconds()
+            for upper_bound, label in CONNECTION_AGE_BUCKETS:
+                if age < upper_bound:
+                    histogram[label] += 1
+                    break
+            else:
+                histogram[">2h"] += 1
+        return histogram
 
     def get_connection_stats(self) -> dict:
         """Get connection statistics"""
         return {
             "total_connections": len(self.active_connections),
-            "court_subscriptions": {court_id: len(subs) for court_id, subs in self.court_subscriptions.items()},
-            "game_subscriptions": {game_id: len(subs) for game_id, subs in self.game_subscriptions.items()},
-            "tournament_subscriptions": {tournament_id: len(subs) for tournament_id, subs in self.tournament_subscriptions.items()},
-            "general_subscriptions": len(self.general_subscriptions)
+            "connected_users": len(self.user_connections),
+            "court_subscriptions": self.topics.counts_by_scope("court"),
+            "game_subscriptions": self.topics.counts_by_scope("game"),
+            "tournament_subscriptions": self.topics.counts_by_scope("tournament"),
+            "topics": self.topics.stats(),
+            "general_subscriptions": len(self.general_subscriptions),
+            "coalescing": {
+                "window_ms": self.coalesce_window * 1000,
+                "topic_overrides": len(self.coalesce_overrides),
+                "open_windows": len(self._coalesce_windows),
+                "frames_superseded": self.frames_superseded
+            },
+            "replay": {
+                "topics": len(self._streams),
+                "buffered_frames": sum(len(stream.buffer) for stream in self._streams.values()),
+                "resumes_replayed": self.resumes_replayed,
+                "resumes_snapshotted": self.resumes_snapshotted
+            },
+            "snapshots": self.snapshots.stats(),
+            "heartbeat": {
+                "running": self._heartbeat_task is not None,
+                "interval_seconds": self.heartbeat_interval,
+                "idle_timeout_seconds": self.idle_timeout,
+                "reaped_total": self.reaped_total,
+                "last_reap_count": self.last_reap_count,
+                "connection_age_histogram": self._connection_age_histogram()
+            },
+            "node_id": self.node_id,
+            "backplane": type(self.backplane).__name__ if self.backplane else None,
+            "outbound_queues": {
+                "max_queue_size": self.max_queue_size,
+                "overflow_policy": self.overflow_policy.value,
+                "queued_frames": sum(len(c.queue) for c in self.active_connections.values()),
+                "max_queue_depth": max((len(c.queue) for c in self.active_connections.values()), default=0),
+                "frames_sent": sum(c.frames_sent for c in self.active_connections.values()),
+                "frames_dropped": self.retired_frames_dropped + sum(
+                    c.frames_dropped for c in self.active_connections.values()
+                ),
+                "frames_coalesced": sum(c.frames_coalesced for c in self.active_connections.values()),
+                "slow_consumer_evictions": self.slow_consumer_evictions
+            }
         }
 
 # Global connection manager instance
-manager = ConnectionManager()
\ No newline at end of file
+manager = ConnectionManager(
+    max_queue_size=int(os.environ.get("WS_OUTBOUND_QUEUE_SIZE", MAX_OUTBOUND_QUEUE)),
+    overflow_policy=QueuePolicy(os.environ.get("WS_OVERFLOW_POLICY", QueuePolicy.DROP_OLDEST.value)),
+    max_connections_per_user=int(os.environ.get("WS_MAX_CONNECTIONS_PER_USER", MAX_CONNECTIONS_PER_USER)),
+    coalesce_window=float(os.environ.get("WS_COALESCE_WINDOW_MS", COALESCE_WINDOW_SECONDS * 1000)) / 1000,
+    max_subscriptions_per_connection=int(
+        os.environ.get("WS_MAX_SUBSCRIPTIONS_PER_CONNECTION", MAX_SUBSCRIPTIONS_PER_CONNECTION)
+    )
+)
\ No newline at end of file
@@ -0,0 +1,117 @@
+from typing import Dict, Optional, Union
+from datetime import datetime, timezone
+from enum import Enum
+import json
+import zlib
+
+try:
+    import msgpack
+except ImportError:  # Optional: only needed for the "msgpack" encoding
+    msgpack = None
+
+Frame = Union[str, bytes]
+
+# Version tag carried by every compact frame; bump when COMPACT_KEYS changes.
+# frontend/src/services/websocket.js keeps the matching decoder table.
+COMPACT_SCHEMA_VERSION = 1
+COMPACT_KEYS: Dict[str, str] = {
+    "type": "t",
+    "timestamp": "ts",
+    "user_id": "u",
+    "court_id": "c",
+    "game_id": "g",
+    "tournament_id": "tn",
+    "connection_id": "ci",
+    "subscription_type": "st",
+    "message": "m",
+    "team1_score": "s1",
+    "team2_score": "s2",
+    "game_time": "gt",
+    "period": "p",
+    "event_description": "d",
+    "rfid_card_uid": "r",
+    "participant_count": "pc",
+    "role": "ro",
+    "session_type": "sn",
+}
+
+class WireEncoding(str, Enum):
+    JSON = "json"
+    COMPACT = "compact"
+    MSGPACK = "msgpack"
+
+class WireCompression(str, Enum):
+    NONE = "none"
+    DEFLATE = "deflate"
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _epoch_millis(value) -> Optional[int]:
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    # Server timestamps are naive utcnow() strings; read them as UTC, not the host's local time
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+def compact_message(message: dict) -> dict:
+    """Shorten well-known top-level keys and turn the ISO timestamp into epoch millis"""
+    compact = {"_v": COMPACT_SCHEMA_VERSION}
+    for key, value in message.items():
+        if key == "timestamp" and isinstance(value, str):
+            millis = _epoch_millis(value)
+            if millis is not None:
+                value = millis
+        compact[COMPACT_KEYS.get(key, key)] = value
+    return compact
+
+class WireCodec:
+    """Negotiated frame format for one connection"""
+
+    def __init__(self, encoding: WireEncoding = WireEncoding.JSON, compression: WireCompression = WireCompression.NONE):
+        self.encoding = encoding
+        self.compression = compression
+
+    @property
+    def key(self) -> str:
+        return f"{self.encoding.value}+{self.compression.value}"
+
+    def encode(self, message: dict) -> Frame:
+        if self.encoding == WireEncoding.MSGPACK:
+            frame = msgpack.packb(compact_message(message), default=_json_default)
+        elif self.encoding == WireEncoding.COMPACT:
+            frame = json.dumps(compact_message(message), default=_json_default, separators=(",", ":"))
+        else:
+            frame = json.dumps(message, default=_json_default)
+
+        if self.compression == WireCompression.DEFLATE:
+            if isinstance(frame, str):
+                frame = frame.encode("utf-8")
+            # Raw deflate (no zlib header), matching DecompressionStream("deflate-raw")
+            compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+            frame = compressor.compress(frame) + compressor.flush()
+        return frame
+
+def negotiate_codec(encoding: Optional[str], compression: Optional[str]) -> WireCodec:
+    """Pick the codec a client asked for, falling back to what this server supports"""
+    try:
+        chosen_encoding = WireEncoding(encoding or WireEncoding.JSON.value)
+    except ValueError:
+        chosen_encoding = WireEncoding.JSON
+    if chosen_encoding == WireEncoding.MSGPACK and msgpack is None:
+        chosen_encoding = WireEncoding.COMPACT
+
+    try:
+        chosen_compression = WireCompression(compression or WireCompression.NONE.value)
+    except ValueError:
+        chosen_compression = WireCompression.NONE
+    return WireCodec(chosen_encoding, chosen_compression)
+
+DEFAULT_CODEC = WireCodec()
@@ -440,7 +440,7 @@ def test_websocket_system():
             ws_thread = None
             
             def run_websocket():
-                ws_url = f"{WS_URL}/{user_ids['player']}"
+                ws_url = f"{WS_URL}/{user_ids['player']}?token={tokens['player']}"
                 ws = websocket.WebSocketApp(
                     ws_url,
                     on_open=on_open,
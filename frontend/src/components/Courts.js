@@ -6,12 +6,35 @@ const Courts = () => {
   const [courts, setCourts] = useState([]);
   const [loading, setLoading] = useState(true);
   const [selectedCourt, setSelectedCourt] = useState(null);
+  const [location, setLocation] = useState(null);
+  const [locating, setLocating] = useState(false);
+  const [radiusKm, setRadiusKm] = useState(10);
+  const [surfaceType, setSurfaceType] = useState('');
+  const [lightingOnly, setLightingOnly] = useState(false);
+  const [amenity, setAmenity] = useState('');
+  const [debouncedAmenity, setDebouncedAmenity] = useState('');
 
+  // Wait for a pause in typing before searching on the amenity filter
   useEffect(() => {
+    const timer = setTimeout(() => setDebouncedAmenity(amenity.trim()), 400);
+    return () => clearTimeout(timer);
+  }, [amenity]);
+
+  useEffect(() => {
+    let stale = false;
     const fetchCourts = async () => {
       try {
-        const response = await courtsAPI.getCourts();
-        setCourts(response.data);
+        // With a location the server filters and ranks; without one, list every court
+        const response = location
+          ? await courtsAPI.getNearbyCourts(location.lat, location.lng, {
+              radiusKm,
+              amenities: debouncedAmenity ? [debouncedAmenity] : [],
+              surfaceType: surfaceType || null,
+              lighting: lightingOnly ? true : null,
+            })
+          : await courtsAPI.getCourts();
+        // A slower response from an earlier filter must not overwrite a newer one
+        if (!stale) setCourts(response.data);
       } catch (error) {
         console.error('Error fetching courts:', error);
       } finally {
@@ -20,7 +43,25 @@ const Courts = () => {
     };
 
     fetchCourts();
-  }, []);
+    return () => {
+      stale = true;
+    };
+  }, [location, radiusKm, surfaceType, lightingOnly, debouncedAmenity]);
+
+  const findNearMe = () => {
+    if (!navigator.geolocation) return;
+    setLocating(true);
+    navigator.geolocation.getCurrentPosition(
+      (position) => {
+        setLocation({ lat: position.coords.latitude, lng: position.coords.longitude });
+        setLocating(false);
+      },
+      (error) => {
+        console.error('Error getting location:', error);
+        setLocating(false);
+      }
+    );
+  };
 
   const CourtCard = ({ court }) => (
     <div className="bg-white rounded-lg shadow-md overflow-hidden hover:shadow-lg transition-shadow duration-300">
@@ -58,6 +99,7 @@ const Courts = () => {
         
         <div className="flex items-center text-sm text-gray-500 mb-3">
           <span className="mr-4">📍 {court.location}</span>
+          {court.distance_km !== undefined && <span className="mr-4">{court.distance_km} km</span>}
           <span className="mr-4">🏠 {court.surface_type}</span>
           {court.lighting && <span className="mr-4">💡 Lighting</span>}
         </div>
@@ -77,7 +119,7 @@ const Courts = () => {
         
         <div className="flex justify-between items-center">
           <div className="text-sm text-gray-500">
-            <span className="font-medium">{court.current_players.length}/{court.max_players}</span> players
+            <span className="font-medium">{court.current_count}/{court.max_players}</span> players
           </div>
           <button
             onClick={() => setSelectedCourt(court)}
@@ -134,7 +176,7 @@ const Courts = () => {
             </div>
             <div className="flex items-center text-sm">
               <span className="font-medium text-gray-900">Currently:</span>
-              <span className="ml-2 text-gray-600">{court.current_players.length} players</span>
+              <span className="ml-2 text-gray-600">{court.current_count} players</span>
             </div>
             <div className="flex items-center text-sm">
               <span className="font-medium text-gray-900">Rating:</span>
@@ -205,6 +247,54 @@ const Courts = () => {
           <p className="text-gray-600">Find the perfect court for your next game</p>
         </div>
 
+        <div className="flex flex-wrap items-center gap-3 mb-6">
+          <button
+            onClick={location ? () => setLocation(null) : findNearMe}
+            disabled={locating}
+            className="bg-orange-500 hover:bg-orange-600 disabled:opacity-50 text-white px-4 py-2 rounded-md text-sm font-medium transition-colors"
+          >
+            {locating ? 'Locating...' : location ? 'Show All Courts' : '📍 Near Me'}
+          </button>
+          {location && (
+            <>
+              <select
+                value={radiusKm}
+                onChange={(e) => setRadiusKm(Number(e.target.value))}
+                className="border border-gray-300 rounded-md px-3 py-2 text-sm"
+              >
+                {[2, 5, 10, 25, 50].map((km) => (
+                  <option key={km} value={km}>Within {km} km</option>
+                ))}
+              </select>
+              <select
+                value={surfaceType}
+                onChange={(e) => setSurfaceType(e.target.value)}
+                className="border border-gray-300 rounded-md px-3 py-2 text-sm"
+              >
+                <option value="">Any surface</option>
+                <option value="indoor">Indoor</option>
+                <option value="outdoor">Outdoor</option>
+              </select>
+              <label className="flex items-center text-sm text-gray-700">
+                <input
+                  type="checkbox"
+                  checked={lightingOnly}
+                  onChange={(e) => setLightingOnly(e.target.checked)}
+                  className="mr-2"
+                />
+                Lighting
+              </label>
+              <input
+                type="text"
+                value={amenity}
+                onChange={(e) => setAmenity(e.target.value)}
+                placeholder="Amenity (e.g. Parking)"
+                className="border border-gray-300 rounded-md px-3 py-2 text-sm"
+              />
+            </>
+          )}
+        </div>
+
         <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
           {courts.map((court) => (
             <CourtCard key={court.id} court={court} />
@@ -215,7 +305,9 @@ const Courts = () => {
           <div className="text-center py-12">
             <span className="text-6xl">🏀</span>
             <h3 className="mt-4 text-lg font-medium text-gray-900">No courts found</h3>
-            <p className="mt-2 text-gray-500">Check back later for new courts.</p>
+            <p className="mt-2 text-gray-500">
+              {location ? 'Try a wider radius or fewer filters.' : 'Check back later for new courts.'}
+            </p>
           </div>
         )}
 
@@ -191,7 +191,7 @@ const Dashboard = () => {
                         </div>
                         <div className="ml-4">
                           <span className="text-sm text-gray-500">
-                            {court.current_players.length}/{court.max_players} 👥
+                            {court.current_count}/{court.max_players} 👥
                           </span>
                         </div>
                       </div>
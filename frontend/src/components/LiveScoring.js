@@ -42,6 +42,9 @@ const LiveScoring = () => {
       // Subscribe to real-time updates
       if (websocketService.isConnected()) {
         websocketService.subscribeToGame(selectedGame.id);
+        websocketService.on('subscription_confirmed', handleSubscriptionConfirmed);
+        websocketService.on('snapshot', handleSnapshot);
+        websocketService.on('resync_required', handleResyncRequired);
         websocketService.on('score_update', handleScoreUpdate);
         websocketService.on('user_joined', handleUserJoined);
       }
@@ -58,11 +61,15 @@ const LiveScoring = () => {
 
     return () => {
       if (selectedGame && websocketService.isConnected()) {
+        websocketService.off('subscription_confirmed', handleSubscriptionConfirmed);
+        websocketService.off('snapshot', handleSnapshot);
+        websocketService.off('resync_required', handleResyncRequired);
         websocketService.off('score_update', handleScoreUpdate);
         websocketService.off('user_joined', handleUserJoined);
       }
     };
-  }, [selectedGame]);
+    // Keyed on the id: score updates replace selectedGame and must not re-subscribe or re-join
+  }, [selectedGame?.id]);
 
   const fetchGameEvents = async () => {
     if (!selectedGame) return;
@@ -85,6 +92,45 @@ const LiveScoring = () => {
     }
   };
 
+  const applyGameState = (state) => {
+    if (!state || !state.score) return;
+    setSelectedGame(prev => ({ ...prev, score: state.score }));
+    setScoreForm(prev => ({
+      ...prev,
+      team1_score: state.score.team1 || 0,
+      team2_score: state.score.team2 || 0,
+      game_time: state.game_time || prev.game_time,
+      period: state.period || prev.period
+    }));
+  };
+
+  const handleSubscriptionConfirmed = (data) => {
+    // Current score straight from the subscribe round trip; a null snapshot is
+    // missing or older than live frames already applied
+    if (!selectedGame || data.game_id !== selectedGame.id) return;
+    applyGameState(data.snapshot);
+  };
+
+  const handleSnapshot = (data) => {
+    // Sent instead of a replay when a resume gap is too old or the server restarted
+    if (!selectedGame || data.topic !== `game:${selectedGame.id}`) return;
+    applyGameState(data.data);
+    fetchGameEvents();
+  };
+
+  const handleResyncRequired = async (data) => {
+    // The server has no state to send either; fall back to REST
+    if (!selectedGame || data.topic !== `game:${selectedGame.id}`) return;
+    try {
+      const response = await gamesAPI.getGames(0, 100, 'in_progress');
+      setGames(response.data);
+      applyGameState(response.data.find(game => game.id === selectedGame.id));
+    } catch (error) {
+      console.error('Error resyncing game:', error);
+    }
+    fetchGameEvents();
+  };
+
   const handleScoreUpdate = (data) => {
     console.log('Real-time score update:', data);
     
@@ -46,11 +46,19 @@ const RFIDCheckin = () => {
     if (websocketService.isConnected()) {
       websocketService.on('player_checked_in', handleRealTimeUpdate);
       websocketService.on('player_checked_out', handleRealTimeUpdate);
+      websocketService.on('court_presence_batch', handleRealTimeUpdate);
+      websocketService.on('court_slot_available', handleSlotAvailable);
+      websocketService.on('snapshot', handleCourtResync);
+      websocketService.on('resync_required', handleCourtResync);
     }
 
     return () => {
       websocketService.off('player_checked_in', handleRealTimeUpdate);
       websocketService.off('player_checked_out', handleRealTimeUpdate);
+      websocketService.off('court_presence_batch', handleRealTimeUpdate);
+      websocketService.off('court_slot_available', handleSlotAvailable);
+      websocketService.off('snapshot', handleCourtResync);
+      websocketService.off('resync_required', handleCourtResync);
     };
   }, [user.id]);
 
@@ -60,6 +68,24 @@ const RFIDCheckin = () => {
     refreshEvents();
   };
 
+  const handleCourtResync = async (data) => {
+    // A court resume that could not be replayed: check-ins may have been missed, and this
+    // page lists events and history rather than the presence snapshot, so reload them
+    if (!data.topic || !data.topic.startsWith('court:')) return;
+    await refreshEvents();
+    try {
+      const presenceRes = await presenceAPI.getUserPresenceHistory(user.id, 0, 20);
+      setPresenceHistory(presenceRes.data);
+    } catch (error) {
+      console.error('Error refreshing presence history:', error);
+    }
+  };
+
+  const handleSlotAvailable = (data) => {
+    const holdUntil = new Date(data.hold_expires_at + 'Z').toLocaleTimeString();
+    alert(`🏀 A spot opened up on court ${data.court_id}!\nIt is held for you until ${holdUntil} - tap in to claim it.`);
+  };
+
   const refreshEvents = async () => {
     try {
       const eventsRes = await rfidAPI.getEvents(0, 20);
@@ -87,8 +113,12 @@ const RFIDCheckin = () => {
       setFormData({ ...formData, cardUid: '', courtId: '' });
       
     } catch (error) {
-      const errorMessage = error.response?.data?.detail || 'Check-in failed';
-      alert(`❌ Check-in failed: ${errorMessage}`);
+      const detail = error.response?.data?.detail;
+      if (error.response?.status === 409 && detail?.waitlist_position) {
+        alert(`⏳ Court is full. You are #${detail.waitlist_position} on the waitlist - we'll notify you when a spot opens.`);
+      } else {
+        alert(`❌ Check-in failed: ${detail || 'Check-in failed'}`);
+      }
     } finally {
       setIsProcessing(false);
     }
@@ -405,6 +435,7 @@ const RFIDCheckin = () => {
                             {event.event_type === 'check_out' && '❌ Check Out'}
                             {event.event_type === 'access_granted' && '🔓 Access Granted'}
                             {event.event_type === 'access_denied' && '🔒 Access Denied'}
+                            {event.event_type === 'waitlisted' && '⏳ Waitlisted'}
                           </h3>
                           <p className="text-sm text-gray-600">
                             {court ? court.name : 'Unknown Court'} • {event.card_uid}
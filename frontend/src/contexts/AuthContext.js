@@ -105,6 +105,17 @@ export const AuthProvider = ({ children }) => {
     websocketService.disconnect();
   };
 
+  // The socket closes with 4401/4403 when the token expired or belongs to someone else;
+  // there is no refresh token, so sign out as the REST client does on a 401
+  useEffect(() => {
+    const handleAuthFailed = () => {
+      logout();
+      window.location.href = '/login';
+    };
+    websocketService.on('auth_failed', handleAuthFailed);
+    return () => websocketService.off('auth_failed', handleAuthFailed);
+  }, []);
+
   const updateUser = (updatedUser) => {
     localStorage.setItem('user', JSON.stringify(updatedUser));
     setUser(updatedUser);
@@ -54,9 +54,18 @@ export const usersAPI = {
 // Courts API
 export const courtsAPI = {
   getCourts: (skip = 0, limit = 100) => api.get(`/courts?skip=${skip}&limit=${limit}`),
+  getNearbyCourts: (lat, lng, { radiusKm = 10, amenities = [], surfaceType = null, lighting = null } = {}) => {
+    const params = new URLSearchParams({ lat, lng, radius_km: radiusKm });
+    amenities.forEach((amenity) => params.append('amenities', amenity));
+    if (surfaceType) params.append('surface_type', surfaceType);
+    if (lighting !== null) params.append('lighting', lighting);
+    return api.get(`/courts/near?${params}`);
+  },
   getCourt: (courtId) => api.get(`/courts/${courtId}`),
   createCourt: (courtData) => api.post('/courts', courtData),
   getCourtPresence: (courtId) => api.get(`/courts/${courtId}/presence`),
+  getCourtWaitlist: (courtId) => api.get(`/courts/${courtId}/waitlist`),
+  leaveCourtWaitlist: (courtId) => api.delete(`/courts/${courtId}/waitlist`),
 };
 
 // Challenges API
@@ -113,19 +122,26 @@ export const rfidAPI = {
   createCard: (cardData) => api.post('/rfid/cards', cardData),
   getCards: (skip = 0, limit = 100) => api.get(`/rfid/cards?skip=${skip}&limit=${limit}`),
   getUserCards: (userId) => api.get(`/rfid/cards/user/${userId}`),
+  deactivateCard: (cardId) => api.post(`/rfid/cards/${cardId}/deactivate`),
   checkIn: (cardUid, courtId, deviceId = null) => api.post('/rfid/checkin', { card_uid: cardUid, court_id: courtId, device_id: deviceId }),
   checkOut: (cardUid, courtId, deviceId = null) => api.post('/rfid/checkout', { card_uid: cardUid, court_id: courtId, device_id: deviceId }),
-  getEvents: (skip = 0, limit = 100, courtId = null, userId = null) => {
+  // Pass the previous response's X-Next-Cursor header as cursor for the next page
+  getEvents: (skip = 0, limit = 100, courtId = null, userId = null, cursor = null) => {
     const params = new URLSearchParams({ skip, limit });
     if (courtId) params.append('court_id', courtId);
     if (userId) params.append('user_id', userId);
+    if (cursor) params.append('cursor', cursor);
     return api.get(`/rfid/events?${params}`);
   },
 };
 
 // Presence API (Phase 2)
 export const presenceAPI = {
-  getUserPresenceHistory: (userId, skip = 0, limit = 100) => api.get(`/presence/user/${userId}?skip=${skip}&limit=${limit}`),
+  getUserPresenceHistory: (userId, skip = 0, limit = 100, cursor = null) => {
+    const params = new URLSearchParams({ skip, limit });
+    if (cursor) params.append('cursor', cursor);
+    return api.get(`/presence/user/${userId}?${params}`);
+  },
 };
 
 // Tournament API (Phase 2)
@@ -1,3 +1,53 @@
+// Mirrors COMPACT_KEYS in backend/wire_format.py (schema version 1)
+const COMPACT_SCHEMA_VERSION = 1;
+const COMPACT_KEYS = {
+  t: 'type',
+  ts: 'timestamp',
+  u: 'user_id',
+  c: 'court_id',
+  g: 'game_id',
+  tn: 'tournament_id',
+  ci: 'connection_id',
+  st: 'subscription_type',
+  m: 'message',
+  s1: 'team1_score',
+  s2: 'team2_score',
+  gt: 'game_time',
+  p: 'period',
+  d: 'event_description',
+  r: 'rfid_card_uid',
+  pc: 'participant_count',
+  ro: 'role',
+  sn: 'session_type',
+};
+
+// Expand a compact frame back into the verbose message shape the app uses
+const decodeFrame = (raw) => {
+  const frame = JSON.parse(raw);
+  if (frame._v === undefined) {
+    return frame;
+  }
+  if (frame._v !== COMPACT_SCHEMA_VERSION) {
+    throw new Error(`Unsupported compact schema version ${frame._v}`);
+  }
+
+  const message = {};
+  Object.entries(frame).forEach(([key, value]) => {
+    if (key === '_v') return;
+    const fullKey = COMPACT_KEYS[key] || key;
+    message[fullKey] = fullKey === 'timestamp' && typeof value === 'number'
+      ? new Date(value).toISOString()
+      : value;
+  });
+  return message;
+};
+
+// Close codes the server uses for a bad/expired token (4401) or the wrong user (4403);
+// reconnecting with the same token cannot succeed
+const AUTH_CLOSE_CODES = new Set([4401, 4403]);
+// Policy close sent to a user's oldest tab when they open more than the per-user connection cap
+const CONNECTION_CAP_CLOSE_CODE = 1008;
+
 class WebSocketService {
   constructor() {
     this.socket = null;
@@ -7,6 +57,11 @@ class WebSocketService {
     this.listeners = new Map();
     this.isConnecting = false;
     this.userId = null;
+    // Resume state: server epoch plus last sequence number seen per topic ("game:<id>")
+    this.epoch = null;
+    this.topicSeqs = new Map();
+    // Wildcard patterns ("court:*") have no sequence of their own; re-subscribe them on reconnect
+    this.topicPatterns = new Set();
   }
 
   connect(userId) {
@@ -20,11 +75,17 @@ class WebSocketService {
     const backendUrl = process.env.REACT_APP_BACKEND_URL;
     const wsUrl = backendUrl.replace('https://', 'wss://').replace('http://', 'ws://');
     
+    // Browsers cannot send an Authorization header on the upgrade, and query strings end up in
+    // access logs, so the JWT goes in the first frame instead
+    const params = new URLSearchParams({ encoding: 'compact' });
+    
     try {
-      this.socket = new WebSocket(`${wsUrl}/ws/${userId}`);
+      // Compact JSON keeps frames small; the browser negotiates permessage-deflate itself
+      this.socket = new WebSocket(`${wsUrl}/ws/${userId}?${params}`);
       
       this.socket.onopen = (event) => {
         console.log('🏀 WebSocket connected to M2DG Basketball');
+        this.socket.send(JSON.stringify({ type: 'auth', token: localStorage.getItem('accessToken') || '' }));
         this.isConnecting = false;
         this.reconnectAttempts = 0;
         this.emit('connected', { event });
@@ -32,7 +93,12 @@ class WebSocketService {
 
       this.socket.onmessage = (event) => {
         try {
-          const data = JSON.parse(event.data);
+          const data = decodeFrame(event.data);
+          this.trackSequence(data);
+          // Answer server heartbeats so the connection is not reaped as idle
+          if (data.type === 'heartbeat') {
+            this.send({ type: 'pong' });
+          }
           console.log('📨 WebSocket message received:', data);
           this.emit(data.type, data);
           this.emit('message', data);
@@ -47,6 +113,16 @@ class WebSocketService {
         this.socket = null;
         this.emit('disconnected', { event });
         
+        if (AUTH_CLOSE_CODES.has(event.code)) {
+          this.emit('auth_failed', { code: event.code, reason: event.reason });
+          return;
+        }
+        // Reconnecting would evict the next-oldest tab, which would then do the same
+        if (event.code === CONNECTION_CAP_CLOSE_CODE) {
+          this.emit('evicted', { code: event.code, reason: event.reason });
+          return;
+        }
+        
         // Attempt to reconnect
         if (this.reconnectAttempts < this.maxReconnectAttempts) {
           this.reconnectAttempts++;
@@ -69,6 +145,55 @@ class WebSocketService {
     }
   }
 
+  trackSequence(data) {
+    if (data.type === 'connection_established') {
+      const previousEpoch = this.epoch;
+      this.epoch = data.epoch;
+      // Ask the server for only what we missed on each topic we were following
+      if (previousEpoch) {
+        if (this.topicPatterns.size) {
+          this.send({ type: 'subscribe', topics: [...this.topicPatterns] });
+        }
+        this.topicSeqs.forEach((lastSeq, topic) => {
+          this.send({ type: 'resume', topic, last_seq: lastSeq, epoch: previousEpoch });
+          // Sequence numbers restart with a new epoch
+          if (data.epoch !== previousEpoch) {
+            this.topicSeqs.set(topic, 0);
+          }
+        });
+      }
+      return;
+    }
+    if (data.type === 'subscription_confirmed') {
+      // Live frames can arrive before the confirmation; drop snapshots older than what they already applied
+      if (data.snapshots) {
+        Object.entries(data.snapshots).forEach(([topic, { seq }]) => {
+          if (seq < (this.topicSeqs.get(topic) || 0)) {
+            delete data.snapshots[topic];
+          } else {
+            this.topicSeqs.set(topic, seq);
+          }
+        });
+      } else if (data.topic && typeof data.seq === 'number') {
+        if (data.seq < (this.topicSeqs.get(data.topic) || 0)) {
+          data.snapshot = null;
+        } else {
+          this.topicSeqs.set(data.topic, data.seq);
+        }
+      }
+      return;
+    }
+    if (data.topic && typeof data.seq === 'number') {
+      this.topicSeqs.set(data.topic, data.seq);
+    }
+  }
+
+  followTopic(topic) {
+    if (!this.topicSeqs.has(topic)) {
+      this.topicSeqs.set(topic, 0);
+    }
+  }
+
   disconnect() {
     if (this.socket) {
       this.socket.close();
@@ -77,6 +202,9 @@ class WebSocketService {
     this.isConnecting = false;
     this.userId = null;
     this.reconnectAttempts = 0;
+    this.epoch = null;
+    this.topicSeqs.clear();
+    this.topicPatterns.clear();
   }
 
   send(message) {
@@ -119,32 +247,60 @@ class WebSocketService {
     }
   }
 
+  // Batched topic subscriptions, e.g. ['court:*', 'tournament:<id>:matches']
+  subscribe(topics, { snapshot = false } = {}) {
+    topics.forEach(topic => {
+      if (topic.includes('*')) {
+        this.topicPatterns.add(topic);
+      } else {
+        this.followTopic(topic);
+      }
+    });
+    return this.send({ type: 'subscribe', topics, snapshot });
+  }
+
+  unsubscribe(topics) {
+    topics.forEach(topic => {
+      this.topicPatterns.delete(topic);
+      this.topicSeqs.delete(topic);
+    });
+    return this.send({ type: 'unsubscribe', topics });
+  }
+
   // Convenience methods for basketball-specific subscriptions
-  subscribeToCourt(courtId) {
+  // With snapshot, subscription_confirmed carries the current state so no REST fetch is needed
+  subscribeToCourt(courtId, { snapshot = true } = {}) {
+    this.followTopic(`court:${courtId}`);
     return this.send({
       type: 'subscribe_court',
       court_id: courtId,
+      snapshot,
     });
   }
 
   unsubscribeFromCourt(courtId) {
+    this.topicSeqs.delete(`court:${courtId}`);
     return this.send({
       type: 'unsubscribe_court',
       court_id: courtId,
     });
   }
 
-  subscribeToGame(gameId) {
+  subscribeToGame(gameId, { snapshot = true } = {}) {
+    this.followTopic(`game:${gameId}`);
     return this.send({
       type: 'subscribe_game',
       game_id: gameId,
+      snapshot,
     });
   }
 
-  subscribeToTournament(tournamentId) {
+  subscribeToTournament(tournamentId, { snapshot = true } = {}) {
+    this.followTopic(`tournament:${tournamentId}`);
     return this.send({
       type: 'subscribe_tournament',
       tournament_id: tournamentId,
+      snapshot,
     });
   }
 
@@ -0,0 +1,105 @@
+import asyncio
+import importlib
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# The backend modules use flat imports (``from websocket_manager import manager``)
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+
+class FakeCollection:
+    """Just enough of a motor collection for find/find_one over a list of documents"""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.reads = 0
+
+    def _matches(self, doc, query):
+        for key, expected in query.items():
+            if isinstance(expected, dict):
+                if doc.get(key) not in expected["$in"]:
+                    return False
+            elif doc.get(key) != expected:
+                return False
+        return True
+
+    async def find_one(self, query):
+        self.reads += 1
+        return next((doc for doc in self.docs if self._matches(doc, query)), None)
+
+    async def find(self, query, projection=None):
+        self.reads += 1
+        for doc in self.docs:
+            if self._matches(doc, query):
+                yield doc
+
+
+@pytest.fixture
+def fake_collection():
+    """Factory for in-memory collections: ``fake_collection([doc, ...])``"""
+    return FakeCollection
+
+
+@pytest.fixture
+def server_module():
+    """A freshly imported ``server`` on an in-memory MongoDB, so endpoint tests share no state"""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "test_database")
+    import server
+    server = importlib.reload(server)
+    server.db = mongomock_motor.AsyncMongoMockClient()["test_database"]
+    return server
+
+
+@pytest.fixture
+def api(server_module):
+    """Runs ``scenario(client)`` against the app, between its startup and shutdown hooks"""
+    import httpx
+
+    def run(scenario):
+        async def main():
+            await server_module.app.router.startup()
+            try:
+                transport = httpx.ASGITransport(app=server_module.app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                    return await scenario(client)
+            finally:
+                await server_module.app.router.shutdown()
+
+        return asyncio.run(main())
+
+    return run
+
+
+@pytest.fixture
+def seed_rfid(server_module):
+    """Insert a court and an active card per uid (owned by ``user-<uid>``)"""
+    from models_extended import RFIDCard
+
+    async def seed(court_id="court-1", card_uids=("CARD-1",), **court_fields):
+        court = server_module.Court(
+            id=court_id, name=court_id, description="", location="", address="", **court_fields
+        )
+        await server_module.db.courts.insert_one(court.dict(exclude={"current_count"}))
+        for card_uid in card_uids:
+            await server_module.db.rfid_cards.insert_one(RFIDCard(card_uid=card_uid, user_id=f"user-{card_uid}").dict())
+
+    return seed
+
+
+@pytest.fixture
+def auth_headers(server_module):
+    """Insert a user with ``role`` and return bearer headers for them"""
+    async def headers(user_id="admin-1", role="admin"):
+        await server_module.db.users.insert_one(server_module.User(
+            id=user_id, username=user_id, email=f"{user_id}@m2dg.com", password_hash="x", full_name=user_id, role=role
+        ).dict())
+        return {"Authorization": f"Bearer {server_module.create_access_token({'sub': user_id})}"}
+
+    return headers
@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime
+
+from access_policy import AccessPolicy, CourtPolicy, parse_operating_hours
+from rfid_card_cache import CachedCard
+from reader_sync import build_card_sync
+
+# 2025-06-02 is a Monday
+MONDAY = datetime(2025, 6, 2)
+
+
+def card(level, card_type="standard"):
+    return CachedCard({"card_uid": "A", "user_id": "u1", "access_level": level, "card_type": card_type})
+
+
+def test_operating_hours_parse_into_daily_minute_windows():
+    windows = parse_operating_hours({
+        "monday": "6:00 AM - 10:00 PM",
+        "tuesday": "24 hours",
+        "wednesday": "5:00 AM - 12:00 AM",
+        "friday": "6:00 PM - 2:00 AM",
+        "saturday": "Closed",
+    })
+    assert windows[0] == ((360, 1320),)
+    assert windows[1] == ((0, 1440),)
+    assert windows[2] == ((300, 1440),)
+    # Thursday is missing, so closed; Friday's late session runs into Saturday
+    assert windows[3] == ()
+    assert windows[4] == ((1080, 1440),)
+    assert windows[5] == ((0, 120),)
+    assert parse_operating_hours({}) is None
+
+
+def test_taps_are_decided_from_the_court_table(fake_collection):
+    async def scenario():
+        courts = fake_collection([
+            {"id": "open", "is_active": True},
+            {"id": "vip", "is_active": True, "required_access_level": 3},
+            {"id": "nyc", "is_active": True, "timezone": "America/New_York",
+             "operating_hours": {"monday": "6:00 AM - 10:00 PM"}},
+            {"id": "closed", "is_active": False},
+        ])
+        policy = AccessPolicy()
+        await policy.load(courts)
+        reads = courts.reads
+
+        assert policy.decide(card(1), policy.get("open"), MONDAY) is None
+        assert "below court requirement 3" in policy.decide(card(2), policy.get("vip"), MONDAY)
+        assert policy.decide(card(3), policy.get("vip"), MONDAY) is None
+
+        # 12:00 UTC is 8:00 in New York (open); 03:00 UTC is 23:00 Sunday there (closed)
+        nyc = policy.get("nyc")
+        assert policy.decide(card(1), nyc, MONDAY.replace(hour=12)) is None
+        assert policy.decide(card(1), nyc, MONDAY.replace(hour=3)) == "Court is closed"
+        assert policy.decide(card(1, "admin"), nyc, MONDAY.replace(hour=3)) is None
+        assert courts.reads == reads
+
+        assert await policy.lookup("closed", courts) is None
+        assert policy.decide(card(3), None, MONDAY) == "Unknown or inactive court"
+        policy.update_court({"id": "new", "is_active": True, "required_access_level": 2})
+        assert policy.get("new").required_level == 2
+        assert policy.stats()["denials"] == 3
+
+        payload = build_card_sync([], 1, None, "nyc", "gate-1", b"key", now=MONDAY, court_policy=nyc.for_reader())
+        assert payload["policy"]["tz"] == "America/New_York"
+        assert payload["policy"]["hours"][0] == [[360, 1320]]
+
+    asyncio.run(scenario())
+
+
+def test_hours_are_only_enforced_where_the_court_timezone_is_known():
+    hours = {"monday": "6:00 AM - 10:00 PM"}
+    # 23:00 UTC Monday is evening in the US; without a timezone the court cannot be judged closed
+    assert CourtPolicy({"id": "seeded", "operating_hours": hours}).is_open(MONDAY.replace(hour=23))
+    assert CourtPolicy({"id": "typo", "timezone": "America/Nowhere", "operating_hours": hours}).is_open(MONDAY.replace(hour=23))
+    assert not CourtPolicy({"id": "seeded", "operating_hours": hours}, "UTC").is_open(MONDAY.replace(hour=23))
+    assert CourtPolicy({"id": "chicago", "timezone": "America/Chicago", "operating_hours": hours}).is_open(MONDAY.replace(hour=23))
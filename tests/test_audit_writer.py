@@ -0,0 +1,47 @@
+import asyncio
+
+from pymongo.errors import AutoReconnect
+
+from audit_writer import AuditWriter
+
+
+class FakeEvents:
+    def __init__(self):
+        self.batches = []
+        self.fail = False
+
+    async def insert_many(self, docs, ordered=True):
+        if self.fail:
+            raise AutoReconnect("primary stepped down")
+        self.batches.append(list(docs))
+
+
+def test_records_are_batched_by_size_and_time_and_flushed_on_stop():
+    async def scenario():
+        events = FakeEvents()
+        writer = AuditWriter(batch_size=3, flush_seconds=0.05, queue_limit=5)
+        writer.start(events)
+
+        for i in range(3):
+            assert writer.submit({"id": i})
+        await asyncio.sleep(0.01)
+        # A full batch wakes the writer before the interval
+        assert events.batches == [[{"id": 0}, {"id": 1}, {"id": 2}]]
+
+        writer.submit({"id": 3})
+        await asyncio.sleep(0.1)
+        assert events.batches[-1] == [{"id": 3}]
+
+        # A failed write keeps the records; overflow is counted, not raised
+        events.fail = True
+        for i in range(4, 10):
+            writer.submit({"id": i})
+        assert writer.stats()["dropped"] == 1
+        await asyncio.sleep(0.01)
+        events.fail = False
+        await writer.stop()
+        assert [doc["id"] for doc in events.batches[-2] + events.batches[-1]] == [4, 5, 6, 7, 8]
+        stats = writer.stats()
+        assert stats["queued"] == 0 and stats["written"] == 9 and stats["failures"] >= 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,190 @@
+import asyncio
+import multiprocessing
+import os
+
+import pytest
+
+from broadcast_backplane import InMemoryBackplane, MongoBackplane
+from websocket_manager import ConnectionManager
+from tests.test_websocket_manager import FakeWebSocket
+
+
+def test_in_memory_backplane_delivers_across_managers():
+    async def scenario():
+        backplane = InMemoryBackplane()
+        worker_a = ConnectionManager()
+        worker_b = ConnectionManager()
+        await worker_a.attach_backplane(backplane)
+        await worker_b.attach_backplane(backplane)
+
+        spectator_a = FakeWebSocket()
+        spectator_b = FakeWebSocket()
+        connection_a = await worker_a.connect(spectator_a, "spectator-a")
+        connection_b = await worker_b.connect(spectator_b, "spectator-b")
+        await worker_a.subscribe_to_game(connection_a, "game-1")
+        await worker_b.subscribe_to_game(connection_b, "game-1")
+
+        await worker_a.broadcast_to_game({"type": "score_update", "team1_score": 10}, "game-1")
+        await worker_a.wait_until_drained()
+        await worker_b.wait_until_drained()
+
+        # Delivered exactly once on each worker
+        assert len(spectator_a.messages("score_update")) == 1
+        assert len(spectator_b.messages("score_update")) == 1
+
+    asyncio.run(scenario())
+
+
+class _TailCursor:
+    """One pass over a capped collection in insertion order, then dead"""
+
+    def __init__(self, docs):
+        self.docs = list(docs)
+        self.alive = True
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.docs:
+            self.alive = False
+            raise StopAsyncIteration
+        return self.docs.pop(0)
+
+    async def close(self):
+        pass
+
+
+class _CappedCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+
+    def find(self, query, **kwargs):
+        self.queries.append(query)
+        return _TailCursor(self.docs)
+
+
+def test_mongo_backplane_resumes_in_insertion_order_not_by_object_id():
+    from bson import ObjectId
+
+    async def run():
+        # Another worker's envelope can carry a smaller ObjectId yet be inserted later
+        seen_before = {"_id": ObjectId("650000000000000000000002"), "message": {"n": 1}}
+        later_with_smaller_id = {"_id": ObjectId("650000000000000000000001"), "message": {"n": 2}}
+        collection = _CappedCollection([{"_id": ObjectId("650000000000000000000000"), "noop": True}, seen_before])
+        backplane = MongoBackplane(None)
+        backplane.db = {"ws_backplane": collection}
+        received = []
+
+        async def handler(envelope):
+            received.append(envelope["message"]["n"])
+
+        tail = asyncio.create_task(backplane._tail(handler, seen_before["_id"]))
+        await asyncio.sleep(0.1)
+        collection.docs.append(later_with_smaller_id)
+        await asyncio.sleep(0.6)
+        tail.cancel()
+        await asyncio.gather(tail, return_exceptions=True)
+
+        assert received == [2]
+        assert all(query == {} for query in collection.queries)
+
+    asyncio.run(run())
+
+
+def test_mongo_backplane_carries_on_when_its_resume_point_aged_out():
+    from bson import ObjectId
+
+    async def run():
+        collection = _CappedCollection([{"_id": ObjectId(), "message": {"n": 1}}])
+        backplane = MongoBackplane(None)
+        backplane.db = {"ws_backplane": collection}
+        received = []
+
+        async def handler(envelope):
+            received.append(envelope["message"]["n"])
+
+        tail = asyncio.create_task(backplane._tail(handler, ObjectId()))
+        await asyncio.sleep(0.1)
+        collection.docs.append({"_id": ObjectId(), "message": {"n": 2}})
+        await asyncio.sleep(0.6)
+        tail.cancel()
+        await asyncio.gather(tail, return_exceptions=True)
+
+        assert received == [2]
+
+    asyncio.run(run())
+
+
+def _mongo_url():
+    return os.environ.get("MONGO_URL")
+
+
+def _mongo_available() -> bool:
+    if not _mongo_url():
+        return False
+    from pymongo import MongoClient
+    try:
+        MongoClient(_mongo_url(), serverSelectionTimeoutMS=500).admin.command("ping")
+        return True
+    except Exception:
+        return False
+
+
+def _spectator_worker(db_name, collection_name, ready, results):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    async def run():
+        db = AsyncIOMotorClient(_mongo_url())[db_name]
+        worker = ConnectionManager()
+        await worker.attach_backplane(MongoBackplane(db, collection_name))
+        spectator = FakeWebSocket()
+        connection_id = await worker.connect(spectator, "spectator")
+        await worker.subscribe_to_game(connection_id, "game-1")
+        ready.set()
+        for _ in range(200):
+            await asyncio.sleep(0.05)
+            scores = spectator.messages("score_update")
+            if scores:
+                results.put(scores[0]["team1_score"])
+                break
+        await worker.detach_backplane()
+
+    asyncio.run(run())
+
+
+def _scorer_worker(db_name, collection_name):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    async def run():
+        db = AsyncIOMotorClient(_mongo_url())[db_name]
+        worker = ConnectionManager()
+        await worker.attach_backplane(MongoBackplane(db, collection_name))
+        await worker.broadcast_to_game({"type": "score_update", "team1_score": 42}, "game-1")
+        await worker.detach_backplane()
+
+    asyncio.run(run())
+
+
+@pytest.mark.skipif(not _mongo_available(), reason="requires a reachable MONGO_URL")
+def test_mongo_backplane_delivers_across_processes():
+    context = multiprocessing.get_context("spawn")
+    db_name = os.environ.get("DB_NAME", "test_database")
+    collection_name = f"ws_backplane_test_{os.getpid()}"
+    ready = context.Event()
+    results = context.Queue()
+
+    spectator = context.Process(target=_spectator_worker, args=(db_name, collection_name, ready, results))
+    spectator.start()
+    assert ready.wait(10)
+
+    scorer = context.Process(target=_scorer_worker, args=(db_name, collection_name))
+    scorer.start()
+    scorer.join(10)
+    spectator.join(15)
+
+    from pymongo import MongoClient
+    MongoClient(_mongo_url())[db_name].drop_collection(collection_name)
+
+    assert results.get(timeout=1) == 42
@@ -0,0 +1,109 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from court_occupancy import Admission, CourtOccupancy
+
+
+def test_occupancy_is_rebuilt_from_open_presence_and_tracks_taps(fake_collection):
+    async def scenario():
+        presence = fake_collection([
+            {"court_id": "c1", "user_id": "u1", "check_out_time": None},
+            {"court_id": "c1", "user_id": "u2", "check_out_time": None},
+            {"court_id": "c1", "user_id": "u3", "check_out_time": "2025-06-01T10:00:00"},
+            {"court_id": "c2", "user_id": "u3", "check_out_time": None},
+        ])
+        occupancy = CourtOccupancy()
+        await occupancy.load(presence)
+
+        assert occupancy.count("c1") == 2 and occupancy.members("c2") == {"u3"}
+        assert occupancy.count("empty") == 0
+
+        assert not occupancy.check_in("c1", "u1")
+        assert occupancy.check_in("c1", "u4") and occupancy.is_present("c1", "u4")
+        assert occupancy.check_out("c2", "u3") and not occupancy.check_out("c2", "u3")
+        assert occupancy.stats()["courts"] == 1 and occupancy.stats()["players"] == 3
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_taps_never_oversubscribe_and_waitlist_is_fifo():
+    async def scenario():
+        occupancy = CourtOccupancy(hold_seconds=60)
+        capacity = 10
+        peak = 0
+
+        async def tap(user_id):
+            nonlocal peak
+            # Taps interleave at every await, as they do across gate requests
+            await asyncio.sleep(0)
+            admission, position = occupancy.try_admit("c1", user_id, capacity)
+            await asyncio.sleep(0)
+            peak = max(peak, occupancy.count("c1"))
+            return user_id, admission, position
+
+        outcomes = await asyncio.gather(*(tap(f"u{i}") for i in range(200)))
+        admitted = [user_id for user_id, admission, _ in outcomes if admission == Admission.ADMITTED]
+        waitlisted = [user_id for user_id, admission, _ in outcomes if admission == Admission.WAITLISTED]
+        assert len(admitted) == capacity and peak == capacity
+        assert occupancy.waitlist("c1") == waitlisted
+        assert [position for _, _, position in outcomes if position] == list(range(1, 191))
+
+        # Freed slots go to the head of the line as holds that only the holder can take
+        for user_id in admitted[:3]:
+            assert occupancy.check_out("c1", user_id)
+        promoted = [user_id for _, user_id, _ in occupancy.drain_promotions()]
+        assert promoted == waitlisted[:3]
+        assert occupancy.try_admit("c1", waitlisted[5], capacity)[0] == Admission.WAITLISTED
+        assert occupancy.try_admit("c1", promoted[0], capacity)[0] == Admission.ADMITTED
+
+        # An unclaimed hold expires and passes to the next in line
+        later = datetime.utcnow() + timedelta(seconds=61)
+        assert occupancy.expire_holds(later) == 2
+        assert [user_id for _, user_id, _ in occupancy.drain_promotions()] == waitlisted[3:5]
+        assert occupancy.count("c1") + len(occupancy.holds("c1")) == capacity
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_checkins_through_the_endpoint_fill_the_court_once(server_module, api, seed_rfid):
+    card_uids = [f"CARD-{i}" for i in range(40)]
+
+    async def scenario(client):
+        db = server_module.db
+        await seed_rfid(card_uids=card_uids, max_players=10)
+
+        responses = await asyncio.gather(*(
+            client.post("/api/rfid/checkin", json={"card_uid": card_uid, "court_id": "court-1", "device_id": "gate-1"})
+            for card_uid in card_uids
+        ))
+        statuses = [response.status_code for response in responses]
+        assert statuses.count(200) == 10 and statuses.count(409) == 30
+        positions = sorted(response.json()["detail"]["waitlist_position"] for response in responses if response.status_code == 409)
+        assert positions == list(range(1, 31))
+        assert await db.court_presence.count_documents({"court_id": "court-1", "check_out_time": None}) == 10
+        assert server_module.court_occupancy.count("court-1") == 10
+
+        # Waitlisted taps are logged as such, not as denials
+        await server_module.audit_writer.flush()
+        assert await db.rfid_events.count_documents({"event_type": "waitlisted"}) == 30
+        assert await db.rfid_events.count_documents({"event_type": "access_denied"}) == 0
+        rollup = await db.rfid_event_rollups.find_one({"court_id": "court-1"})
+        assert rollup["check_ins"] == 10 and rollup["waitlisted"] == 30 and "denials" not in rollup
+
+    api(scenario)
+
+
+def test_the_database_refuses_a_second_open_session_the_occupancy_missed(server_module, api, seed_rfid):
+    async def scenario(client):
+        db = server_module.db
+        await seed_rfid(card_uids=("CARD-1",))
+        # Admitted by another worker, so this one's occupancy has never seen it
+        await db.court_presence.insert_one(server_module.CourtPresence(user_id="user-CARD-1", court_id="court-1").dict())
+
+        response = await client.post("/api/rfid/checkin", json={"card_uid": "CARD-1", "court_id": "court-1"})
+        assert response.status_code == 400
+        assert response.json()["detail"] == "User already checked in to this court"
+        assert await db.court_presence.count_documents({"user_id": "user-CARD-1", "check_out_time": None}) == 1
+        assert server_module.court_occupancy.count("court-1") == 0
+
+    api(scenario)
@@ -0,0 +1,102 @@
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from court_utilization import UtilizationEngine, hour_edges, occupancy_seconds, peak_concurrency, summarize, to_epoch_seconds
+
+
+class FakePresence:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    def find(self, query, projection=None):
+        self.queries += 1
+        rows = [row for row in self.rows if row["court_id"] in query["court_id"]["$in"]]
+        return FakeCursor(rows)
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def to_list(self, length):
+        return self.rows
+
+
+def test_interval_sweep_matches_a_per_row_count():
+    rng = np.random.default_rng(24)
+    check_ins = rng.uniform(0, 86_400, 500)
+    check_outs = check_ins + rng.uniform(0, 4 * 3600, 500)
+    edges = np.arange(0, 86_400 + 1, 3600.0)
+
+    expected = [
+        sum(max(0.0, min(out, right) - max(start, left)) for start, out in zip(check_ins, check_outs))
+        for left, right in zip(edges[:-1], edges[1:])
+    ]
+    assert np.allclose(occupancy_seconds(check_ins, check_outs, edges), expected)
+    # Back-to-back sessions do not overlap
+    assert peak_concurrency(np.array([0.0, 10.0, 5.0]), np.array([10.0, 20.0, 30.0])) == 2
+    assert np.isnan(to_epoch_seconds([datetime(1970, 1, 1, 0, 1), None])).tolist() == [False, True]
+
+
+def test_dst_days_have_local_hour_bins():
+    edges, labels = hour_edges(date(2025, 3, 9), ZoneInfo("America/New_York"))
+    assert len(edges) == 24 and 2 not in labels.tolist()
+    edges, labels = hour_edges(date(2025, 6, 2), timezone.utc)
+    assert edges[0] == datetime(2025, 6, 2, tzinfo=timezone.utc).timestamp() and labels.tolist() == list(range(24))
+
+
+def test_daily_usage_is_summarized_and_final_days_are_cached():
+    async def scenario():
+        presence = FakePresence([
+            # Two players 18:00-20:00 on June 2nd, one session crossing midnight into the 3rd
+            {"court_id": "c1", "user_id": "u1", "check_in_time": datetime(2025, 6, 2, 18), "check_out_time": datetime(2025, 6, 2, 20)},
+            {"court_id": "c1", "user_id": "u2", "check_in_time": datetime(2025, 6, 2, 18), "check_out_time": datetime(2025, 6, 2, 20)},
+            {"court_id": "c1", "user_id": "u1", "check_in_time": datetime(2025, 6, 2, 23), "check_out_time": datetime(2025, 6, 3, 1)},
+            # Still on court
+            {"court_id": "c1", "user_id": "u3", "check_in_time": datetime(2025, 6, 10, 9), "check_out_time": None},
+        ])
+        engine = UtilizationEngine()
+        now = datetime(2025, 6, 10, 10)
+        courts = {"c1": (timezone.utc, "UTC")}
+
+        days = (await engine.court_days(courts, date(2025, 6, 2), date(2025, 6, 10), presence, now))["c1"]
+        summary = summarize("c1", days, 10, "UTC")
+        assert summary["daily"][0] == {"date": "2025-06-02", "player_hours": 5.0, "peak_concurrent": 2, "sessions": 3, "unique_visitors": 2}
+        assert summary["daily"][1]["player_hours"] == 1.0 and summary["daily"][1]["sessions"] == 0
+        assert summary["peak_hours"][:2] == [18, 19]
+        assert summary["average_session_minutes"] == 120.0
+        assert summary["unique_visitors"] == 3 and summary["player_hours"] == 7.0
+        assert summary["hourly_utilization"][18] == round(2 / 9 / 10, 4)
+
+        # Only the two unsettled days are recomputed
+        await engine.court_days(courts, date(2025, 6, 2), date(2025, 6, 10), presence, now)
+        assert presence.queries == 2 and engine.stats()["hits"] == 7
+
+    asyncio.run(scenario())
+
+
+def test_back_dated_presence_invalidates_settled_days():
+    async def scenario():
+        rows = [{"court_id": "c1", "user_id": "u1", "check_in_time": datetime(2025, 6, 2, 18), "check_out_time": datetime(2025, 6, 2, 20)}]
+        presence = FakePresence(rows)
+        engine = UtilizationEngine()
+        now = datetime(2025, 6, 10, 10)
+        courts = {"c1": (timezone.utc, "UTC"), "c2": (timezone.utc, "UTC")}
+        await engine.court_days(courts, date(2025, 6, 2), date(2025, 6, 5), presence, now)
+
+        # An offline upload brings in a session from June 4th
+        rows.append({"court_id": "c1", "user_id": "u2", "check_in_time": datetime(2025, 6, 4, 9), "check_out_time": datetime(2025, 6, 4, 10)})
+        engine.invalidate("c1", datetime(2025, 6, 4, 9), now)
+        # Recent writes cannot touch a cached day
+        engine.invalidate("c2", now - timedelta(hours=1), now)
+
+        days = await engine.court_days(courts, date(2025, 6, 2), date(2025, 6, 5), presence, now)
+        assert [day.hourly_seconds.sum() / 3600 for day in days["c1"]] == [2.0, 0.0, 1.0, 0.0]
+        # June 3rd onwards for c1 (a day of padding for timezones); nothing for c2
+        assert engine.stats()["invalidations"] == 3 and engine.stats()["hits"] == 5
+
+    asyncio.run(scenario())
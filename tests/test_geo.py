@@ -0,0 +1,25 @@
+import pytest
+
+from geo import NEAR_DISTANCE_BAND_KM, geo_point, haversine_km, near_rank
+
+
+def test_geo_point_is_longitude_first_and_needs_both_coordinates():
+    assert geo_point(40.7128, -74.006) == {"type": "Point", "coordinates": [-74.006, 40.7128]}
+    assert geo_point(None, -74.006) is None and geo_point(40.7128, None) is None
+
+
+def test_haversine_matches_known_distances():
+    # New York City Hall to Los Angeles City Hall
+    assert haversine_km(40.7128, -74.006, 34.0522, -118.2437) == pytest.approx(3936, rel=0.005)
+    assert haversine_km(51.5, -0.12, 51.5, -0.12) == 0
+
+
+def test_courts_in_the_same_distance_band_rank_emptier_first():
+    courts = [
+        ("full_nearby", 0.1, 10, 10),
+        ("empty_nearby", 0.1 + NEAR_DISTANCE_BAND_KM / 2, 0, 10),
+        ("empty_far", 3.0, 0, 10),
+        ("half_nearby", 0.2, 5, 10),
+    ]
+    ranked = sorted(courts, key=lambda court: near_rank(*court[1:]))
+    assert [name for name, *_ in ranked] == ["empty_nearby", "half_nearby", "full_nearby", "empty_far"]
@@ -0,0 +1,26 @@
+from datetime import datetime
+
+import pytest
+
+from pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_filter, next_cursor
+
+
+def test_cursor_round_trips_and_seeks_past_the_last_row():
+    moment = datetime(2025, 6, 2, 9, 30, 0, 123000)
+    cursor = encode_cursor(moment, "event-7")
+    assert "=" not in cursor and decode_cursor(cursor) == (moment, "event-7")
+    assert keyset_filter("timestamp", cursor) == {"$or": [
+        {"timestamp": {"$lt": moment}},
+        {"timestamp": moment, "id": {"$lt": "event-7"}}
+    ]}
+
+    page = [{"id": "b", "timestamp": moment}, {"id": "a", "timestamp": moment}]
+    assert decode_cursor(next_cursor(page, "timestamp", 2)) == (moment, "a")
+    # A short page is the last one
+    assert next_cursor(page, "timestamp", 3) is None
+
+
+@pytest.mark.parametrize("cursor", ["garbage", encode_cursor(datetime(2025, 1, 1), "x")[:-4], "WzFd"])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
@@ -0,0 +1,111 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from access_policy import CourtPolicy
+from presence_sweeper import COURT_CLOSED, SESSION_CAP, PresenceSweeper, find_stale_sessions
+
+# 2025-06-02 is a Monday
+NOW = datetime(2025, 6, 2, 23, 0)
+
+
+def test_sessions_close_at_their_cap_or_when_the_court_closes():
+    policies = {
+        "open": CourtPolicy({"id": "open"}),
+        "short": CourtPolicy({"id": "short", "max_session_minutes": 60}),
+        "evening": CourtPolicy({"id": "evening", "timezone": "UTC", "operating_hours": {"monday": "6:00 AM - 10:00 PM"}}),
+    }
+    rows = [
+        {"id": "p1", "court_id": "open", "check_in_time": NOW - timedelta(hours=5)},
+        {"id": "p2", "court_id": "open", "check_in_time": NOW - timedelta(hours=1)},
+        {"id": "p3", "court_id": "short", "check_in_time": (NOW - timedelta(minutes=90)).isoformat()},
+        {"id": "p4", "court_id": "evening", "check_in_time": NOW - timedelta(hours=2)},
+        {"id": "p5", "court_id": "unknown", "check_in_time": NOW - timedelta(hours=2)},
+        # Admin cards may stay after hours, but not past the session cap
+        {"id": "p6", "court_id": "evening", "check_in_time": NOW - timedelta(hours=2), "rfid_card_uid": "ADMIN"},
+        {"id": "p7", "court_id": "evening", "check_in_time": NOW - timedelta(hours=5), "rfid_card_uid": "ADMIN"},
+    ]
+    stale = find_stale_sessions(rows, policies.get, NOW, timedelta(hours=4), {"ADMIN": "admin"})
+
+    assert [(row["id"], checkout_time, reason) for row, checkout_time, reason in stale] == [
+        ("p1", NOW - timedelta(hours=1), SESSION_CAP),
+        ("p3", NOW - timedelta(minutes=30), SESSION_CAP),
+        ("p4", NOW, COURT_CLOSED),
+        ("p7", NOW - timedelta(hours=1), SESSION_CAP),
+    ]
+
+
+def test_sweeper_reports_closed_sessions_per_run():
+    async def scenario():
+        results = [{SESSION_CAP: 2, COURT_CLOSED: 1}, {}]
+
+        async def sweep():
+            return results.pop(0)
+
+        sweeper = PresenceSweeper(sweep, interval=0.01)
+        sweeper.start()
+        await asyncio.sleep(0.05)
+        await sweeper.stop()
+
+        stats = sweeper.stats()
+        assert stats["total_closed"] == 3 and stats["runs"] >= 2
+        # Runs after the scripted ones fail, and the loop keeps going
+        assert stats["failures"] >= 1 and stats["last_run"]["closed"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_sweep_closes_stale_sessions_in_bulk_and_leaves_tapped_out_ones(server_module, api, seed_rfid, monkeypatch):
+    from models_extended import CourtPresence, RFIDCard
+
+    now = datetime.utcnow()
+    # No day listed, so the court is closed all week
+    closed_hours = {"monday": "Closed"}
+
+    async def scenario(client):
+        db = server_module.db
+        await seed_rfid(court_id="open", card_uids=("LONG",))
+        await seed_rfid(court_id="closed", card_uids=("LATE", "RACED"), timezone="UTC", operating_hours=closed_hours)
+        await db.rfid_cards.insert_one(RFIDCard(card_uid="ADMIN", user_id="user-ADMIN", card_type="admin").dict())
+        sessions = {
+            card_uid: CourtPresence(
+                user_id=f"user-{card_uid}", court_id=court_id, rfid_card_uid=card_uid, check_in_time=now - age
+            ).dict()
+            for card_uid, court_id, age in [
+                ("LONG", "open", timedelta(hours=5)),
+                ("LATE", "closed", timedelta(minutes=30)),
+                ("RACED", "closed", timedelta(minutes=30)),
+                ("ADMIN", "closed", timedelta(minutes=30)),
+            ]
+        }
+        await db.court_presence.insert_many(list(sessions.values()))
+        await server_module.court_occupancy.load(db.court_presence)
+        await server_module.access_policy.load(db.courts)
+
+        # A tap-out lands between the sweeper's read and its write
+        collection_type = type(db.court_presence)
+        bulk_write = collection_type.bulk_write
+        tapped_out_at = now - timedelta(minutes=1)
+
+        async def racing_bulk_write(self, requests, *args, **kwargs):
+            await db.court_presence.update_one(
+                {"id": sessions["RACED"]["id"]}, {"$set": {"check_out_time": tapped_out_at}}
+            )
+            return await bulk_write(self, requests, *args, **kwargs)
+
+        monkeypatch.setattr(collection_type, "bulk_write", racing_bulk_write)
+        closed = await server_module.sweep_stale_presence()
+        monkeypatch.setattr(collection_type, "bulk_write", bulk_write)
+
+        assert closed == {SESSION_CAP: 1, COURT_CLOSED: 1}
+        rows = {row["rfid_card_uid"]: row async for row in db.court_presence.find({}, {"_id": 0})}
+        assert rows["LONG"]["auto_checkout_reason"] == SESSION_CAP
+        assert abs(rows["LONG"]["check_out_time"] - (now - timedelta(hours=1))) < timedelta(seconds=1)
+        assert rows["LATE"]["auto_checkout_reason"] == COURT_CLOSED
+        assert abs(rows["RACED"]["check_out_time"] - tapped_out_at) < timedelta(seconds=1)
+        assert rows["RACED"]["auto_checkout_reason"] is None
+        assert rows["ADMIN"]["check_out_time"] is None
+        # The tap path keeps occupancy for the raced session; the sweep only releases what it closed
+        assert server_module.court_occupancy.members("closed") == {"user-ADMIN", "user-RACED"}
+        assert server_module.court_occupancy.count("open") == 0
+
+    api(scenario)
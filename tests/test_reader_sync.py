@@ -0,0 +1,80 @@
+import base64
+from datetime import datetime, timedelta
+
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+
+from reader_sync import build_card_sync, card_uid_digest, reader_digest_key, sign_payload, verify_payload
+
+DIGEST_KEY = reader_digest_key(b"server-key", "gate-1")
+
+
+def test_card_sync_is_signed_and_revokes_inactive_or_expired_cards():
+    now = datetime(2025, 6, 1, 12, 0, 0)
+    cards = [
+        {"card_uid": "A", "is_active": True, "access_level": 2, "expiry_date": None},
+        {"card_uid": "B", "is_active": False, "access_level": 1},
+        {"card_uid": "C", "is_active": True, "access_level": 1, "expiry_date": (now - timedelta(days=1)).isoformat()},
+        {"card_uid": "D", "is_active": True, "access_level": 3, "expiry_date": now + timedelta(days=30)},
+    ]
+    payload = build_card_sync(cards, 7, 5, "court-1", "gate-1", DIGEST_KEY, now=now)
+
+    assert payload["full"] is False
+    assert [card["h"] for card in payload["cards"]] == [card_uid_digest("A", DIGEST_KEY), card_uid_digest("D", DIGEST_KEY)]
+    assert payload["cards"][1]["x"] == int((now + timedelta(days=30) - datetime(1970, 1, 1)).total_seconds())
+    assert payload["revoked"] == [card_uid_digest("B", DIGEST_KEY), card_uid_digest("C", DIGEST_KEY)]
+    assert "A" not in str(payload["cards"])
+
+    signing_key = Ed25519PrivateKey.generate()
+    signature = sign_payload(payload, signing_key)
+    assert verify_payload(payload, signature, signing_key.public_key())
+    payload["cards"][0]["l"] = 3
+    assert not verify_payload(payload, signature, signing_key.public_key())
+
+
+def test_card_digests_are_keyed_per_reader():
+    other_reader = reader_digest_key(b"server-key", "gate-2")
+    assert card_uid_digest("A", DIGEST_KEY) != card_uid_digest("A", other_reader)
+    assert card_uid_digest("A", DIGEST_KEY) != card_uid_digest("A", reader_digest_key(b"other-server", "gate-1"))
+
+
+def test_reader_endpoints_need_the_readers_own_key(server_module, api, seed_rfid, auth_headers):
+    async def scenario(client):
+        await seed_rfid(card_uids=("CARD-1",))
+        await seed_rfid(court_id="court-2", card_uids=())
+        admin = await auth_headers()
+        register = {"device_id": "gate-1", "court_id": "court-1"}
+
+        # Nothing to sign with until the keys are configured
+        assert (await client.post("/api/rfid/readers", json=register, headers=admin)).status_code == 503
+        server_module.reader_signing_key = Ed25519PrivateKey.generate()
+        server_module.RFID_CARD_DIGEST_KEY = "digest-key"
+
+        assert (await client.get("/api/rfid/readers/gate-1/cards")).status_code == 401
+        player = await auth_headers("player-1", "player")
+        assert (await client.post("/api/rfid/readers", json=register, headers=player)).status_code == 403
+
+        provisioned = (await client.post("/api/rfid/readers", json=register, headers=admin)).json()
+        reader = {"X-Reader-Key": provisioned["reader_key"]}
+        assert (await client.get("/api/rfid/readers/gate-1/cards", headers={"X-Reader-Key": "guess"})).status_code == 401
+        # A key only opens its own reader, and a reader only its own court
+        assert (await client.get("/api/rfid/readers/gate-2/cards", headers=reader)).status_code == 401
+        assert (await client.get("/api/rfid/readers/gate-1/cards?court_id=court-2", headers=reader)).status_code == 403
+
+        response = await client.get("/api/rfid/readers/gate-1/cards", headers=reader)
+        assert response.status_code == 200
+        sync = response.json()
+        public_key = Ed25519PublicKey.from_public_bytes(base64.b64decode(provisioned["signing_public_key"]))
+        assert sync["algorithm"] == "Ed25519" and verify_payload(sync["payload"], sync["signature"], public_key)
+        digest_key = base64.b64decode(provisioned["digest_key"])
+        assert [card["h"] for card in sync["payload"]["cards"]] == [card_uid_digest("CARD-1", digest_key)]
+
+        # Re-registering rotates the key
+        rotated = (await client.post("/api/rfid/readers", json=register, headers=admin)).json()
+        assert (await client.get("/api/rfid/readers/gate-1/cards", headers=reader)).status_code == 401
+        reader = {"X-Reader-Key": rotated["reader_key"]}
+        assert (await client.get("/api/rfid/readers/gate-1/cards", headers=reader)).status_code == 200
+
+        assert (await client.post("/api/rfid/readers/gate-1/deactivate", headers=admin)).status_code == 200
+        assert (await client.get("/api/rfid/readers/gate-1/cards", headers=reader)).status_code == 401
+
+    api(scenario)
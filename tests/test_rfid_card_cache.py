@@ -0,0 +1,43 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from rfid_card_cache import RFIDCardIndex, coerce_datetime
+
+
+def test_taps_validate_from_the_index_and_follow_card_changes(fake_collection):
+    async def scenario():
+        expired = (datetime.utcnow() - timedelta(days=1)).isoformat()
+        cards = fake_collection([
+            {"card_uid": "A", "user_id": "u1", "is_active": True, "expiry_date": None},
+            {"card_uid": "B", "user_id": "u2", "is_active": True, "expiry_date": expired},
+            {"card_uid": "C", "user_id": "u3", "is_active": False},
+        ])
+        index = RFIDCardIndex()
+        await index.load(cards)
+        reads = cards.reads
+
+        card = await index.lookup("A", cards)
+        assert card.user_id == "u1" and not card.is_expired()
+        assert (await index.lookup("B", cards)).is_expired()
+        assert cards.reads == reads
+
+        # Misses (unknown here, or issued on another worker) go to the database once
+        cards.docs.append({"card_uid": "D", "user_id": "u4", "is_active": True})
+        assert (await index.lookup("D", cards)).user_id == "u4"
+        assert await index.lookup("C", cards) is None
+        found = await index.lookup_many(["A", "D", "C", "E"], cards)
+        assert set(found) == {"A", "D"}
+        assert cards.reads == reads + 3
+
+        index.upsert({"card_uid": "A", "user_id": "u1", "is_active": False})
+        assert index.get("A") is None
+        assert index.stats()["invalidations"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_coerce_datetime_accepts_bson_dates_and_iso_strings():
+    moment = datetime(2025, 1, 2, 3, 4, 5)
+    assert coerce_datetime(moment) is moment
+    assert coerce_datetime(moment.isoformat()) == moment
+    assert coerce_datetime(None) is None
@@ -0,0 +1,85 @@
+import asyncio
+from datetime import datetime, timezone
+
+from pymongo.errors import OperationFailure
+
+from rfid_rollups import ensure_retention, hour_bucket, merge_rollups, rollup_updates
+
+
+def event(court_id, user_id, event_type, timestamp):
+    return {"court_id": court_id, "user_id": user_id, "event_type": event_type, "timestamp": timestamp}
+
+
+def test_events_fold_into_hourly_counters_per_court():
+    updates = rollup_updates([
+        event("c1", "u1", "check_in", datetime(2025, 6, 2, 9, 5)),
+        event("c1", "u2", "check_in", datetime(2025, 6, 2, 9, 40)),
+        event("c1", "u1", "check_out", datetime(2025, 6, 2, 9, 55)),
+        event("c1", "unknown", "access_denied", datetime(2025, 6, 2, 9, 58)),
+        event("c1", "u3", "waitlisted", datetime(2025, 6, 2, 9, 59)),
+        event("c1", "u1", "check_in", datetime(2025, 6, 2, 10, 1)),
+        event("c2", "u3", "access_granted", datetime(2025, 6, 2, 9, 0)),
+    ])
+    by_key = {(update._filter["court_id"], update._filter["hour"]): update._doc for update in updates}
+    assert set(by_key) == {("c1", datetime(2025, 6, 2, 9)), ("c1", datetime(2025, 6, 2, 10))}
+    assert by_key[("c1", datetime(2025, 6, 2, 9))] == {
+        "$inc": {"check_ins": 2, "check_outs": 1, "denials": 1, "waitlisted": 1},
+        "$addToSet": {"user_ids": {"$each": ["u1", "u2", "u3"]}}
+    }
+    assert all(update._upsert for update in updates)
+    assert hour_bucket(datetime(2025, 6, 2, 9, 30, tzinfo=timezone.utc)) == datetime(2025, 6, 2, 9)
+
+
+def test_hourly_rollups_merge_into_days_with_distinct_users():
+    docs = [
+        {"court_id": "c1", "hour": datetime(2025, 6, 2, 9), "check_ins": 2, "denials": 1, "user_ids": ["u1", "u2"]},
+        {"court_id": "c1", "hour": datetime(2025, 6, 2, 18), "check_ins": 1, "check_outs": 3, "user_ids": ["u1"]},
+        {"court_id": "c1", "hour": datetime(2025, 6, 3, 7), "check_ins": 1, "user_ids": ["u4"]},
+    ]
+    assert [row["unique_users"] for row in merge_rollups(docs)] == [2, 1, 1]
+    days = merge_rollups(docs, "day")
+    assert days[0] == {
+        "court_id": "c1",
+        "period_start": datetime(2025, 6, 2),
+        "check_ins": 3,
+        "check_outs": 3,
+        "denials": 1,
+        "waitlisted": 0,
+        "unique_users": 2
+    }
+    assert days[1]["period_start"] == datetime(2025, 6, 3)
+
+
+class IndexedCollection:
+    """Single-field indexes with MongoDB's conflict rule: same key, different TTL options -> code 85"""
+
+    def __init__(self):
+        self.name = "rfid_events"
+        self.database = self
+        self.indexes = {}
+
+    async def create_index(self, field, **options):
+        existing = self.indexes.get(field)
+        if existing is not None and existing != options:
+            raise OperationFailure("Index already exists with different options", code=85)
+        self.indexes[field] = options
+
+    async def drop_index(self, keys):
+        del self.indexes[keys[0][0]]
+
+    async def command(self, name, collection, index):
+        self.indexes[next(iter(index["keyPattern"]))]["expireAfterSeconds"] = index["expireAfterSeconds"]
+
+
+def test_retention_can_be_changed_and_turned_off():
+    async def scenario():
+        events = IndexedCollection()
+        await ensure_retention(events, "timestamp", 90)
+        await ensure_retention(events, "timestamp", 30)
+        assert events.indexes == {"timestamp": {"expireAfterSeconds": 30 * 86400}}
+        # 0 keeps events: the existing TTL has to go
+        await ensure_retention(events, "timestamp", 0)
+        assert events.indexes == {"timestamp": {}}
+        await ensure_retention(events, "timestamp", 0)
+
+    asyncio.run(scenario())
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models_extended import RFIDTap
+
+T0 = datetime(2025, 6, 2, 18, 0)
+
+
+def test_tap_timestamps_are_naive_utc():
+    tap = RFIDTap(card_uid="A", court_id="c1", action="check_in", timestamp="2025-06-02T20:00:00+02:00")
+    assert tap.timestamp == T0 and tap.timestamp.tzinfo is None
+
+
+def test_batch_replays_taps_in_reader_order_and_denies_per_tap(server_module, api, seed_rfid):
+    async def scenario(client):
+        await seed_rfid(card_uids=("CARD-1",))
+        response = await client.post("/api/rfid/taps/batch", json={
+            "device_id": "gate-1",
+            "taps": [
+                # Uploaded out of order, with "Z" and naive timestamps mixed
+                {"card_uid": "CARD-1", "court_id": "court-1", "action": "check_out", "timestamp": "2025-06-02T18:00:10Z"},
+                {"card_uid": "CARD-1", "court_id": "court-1", "action": "check_in", "timestamp": T0.isoformat()},
+                {"card_uid": "NOPE", "court_id": "court-1", "action": "check_in", "timestamp": "2025-06-02T18:00:05Z"},
+                {"card_uid": "CARD-1", "court_id": "court-1", "action": "check_out", "timestamp": "2025-06-02T18:00:20"},
+            ]
+        })
+        assert response.status_code == 200
+        body = response.json()
+        assert body["processed"] == 4 and body["succeeded"] == 2
+        results = body["results"]
+        assert results[1]["success"] and results[0]["success"]
+        assert results[1]["presence_id"] == results[0]["presence_id"]
+        assert (results[2]["status_code"], results[3]["status_code"]) == (404, 404)
+
+        presence = await server_module.db.court_presence.find_one({"id": results[1]["presence_id"]})
+        assert presence["check_in_time"] == T0
+        assert presence["check_out_time"] == T0 + timedelta(seconds=10)
+        assert server_module.court_occupancy.count("court-1") == 0
+
+    api(scenario)
+
+
+def test_batch_is_capped(server_module, api):
+    async def scenario(client):
+        tap = {"card_uid": "CARD-1", "court_id": "court-1", "action": "check_in", "timestamp": T0.isoformat()}
+        response = await client.post("/api/rfid/taps/batch", json={
+            "device_id": "gate-1",
+            "taps": [tap] * (server_module.MAX_RFID_BATCH_TAPS + 1)
+        })
+        assert response.status_code == 413
+
+    api(scenario)
+
+
+def test_failed_upload_leaves_nothing_behind_and_retry_applies_it(server_module, api, seed_rfid, auth_headers, monkeypatch):
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+    from pymongo.errors import AutoReconnect
+
+    collection_type = type(server_module.db.court_presence)
+    insert_many = collection_type.insert_many
+    failures = []
+
+    def flaky_insert_many(self, documents, *args, **kwargs):
+        if self.name == "court_presence" and not failures:
+            failures.append(documents)
+            raise AutoReconnect("primary stepped down")
+        return insert_many(self, documents, *args, **kwargs)
+
+    monkeypatch.setattr(collection_type, "insert_many", flaky_insert_many)
+    monkeypatch.setattr(server_module, "reader_signing_key", Ed25519PrivateKey.generate())
+    monkeypatch.setattr(server_module, "RFID_CARD_DIGEST_KEY", "digest-key")
+
+    # Recent enough to outlive the rfid_events retention index
+    tapped_at = (datetime.utcnow() - timedelta(minutes=5)).isoformat()
+
+    async def scenario(client):
+        await seed_rfid(card_uids=("CARD-1", "CARD-2"))
+        provisioned = await client.post(
+            "/api/rfid/readers", json={"device_id": "gate-1", "court_id": "court-1"}, headers=await auth_headers()
+        )
+        reader = {"X-Reader-Key": provisioned.json()["reader_key"]}
+        upload = {"taps": [
+            {"card_uid": "CARD-1", "court_id": "court-1", "action": "check_in", "timestamp": tapped_at, "local_seq": 1},
+            {"card_uid": "CARD-2", "court_id": "court-1", "action": "check_in", "timestamp": tapped_at, "local_seq": 2},
+        ]}
+
+        with pytest.raises(AutoReconnect):
+            await client.post("/api/rfid/readers/gate-1/taps", json=upload, headers=reader)
+        assert failures
+        assert await server_module.db.rfid_events.count_documents({}) == 0
+        assert server_module.court_occupancy.count("court-1") == 0
+
+        retry = (await client.post("/api/rfid/readers/gate-1/taps", json=upload, headers=reader)).json()
+        assert retry["duplicates"] == [] and retry["applied"] == 2 and retry["acked_through"] == 2
+        assert await server_module.db.court_presence.count_documents({"check_out_time": None}) == 2
+        assert await server_module.db.rfid_events.count_documents({"device_id": "gate-1"}) == 2
+
+        again = (await client.post("/api/rfid/readers/gate-1/taps", json=upload, headers=reader)).json()
+        assert again["duplicates"] == [1, 2] and again["applied"] == 0
+
+    api(scenario)
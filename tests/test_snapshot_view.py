@@ -0,0 +1,60 @@
+import asyncio
+
+from websocket_manager import ConnectionManager
+from tests.test_websocket_manager import _connect
+
+
+def test_subscribe_snapshots_share_one_load_and_track_broadcasts():
+    async def scenario():
+        manager = ConnectionManager()
+        loads = 0
+
+        async def game_snapshot(game_id):
+            nonlocal loads
+            loads += 1
+            await asyncio.sleep(0.01)
+            return {"id": game_id, "score": {"team1": 0, "team2": 0}}
+
+        def apply_score(snapshot, message):
+            if message["type"] != "score_update":
+                return None
+            return {**snapshot, "score": {"team1": message["team1_score"], "team2": 0}}
+
+        manager.register_snapshot_provider("game", game_snapshot, apply_score)
+        clients = [await _connect(manager, f"fan-{i}") for i in range(20)]
+        await asyncio.gather(*(manager.subscribe_to_game(cid, "game-1", snapshot=True) for _, cid in clients))
+        await manager.wait_until_drained()
+        assert loads == 1
+        confirmation = clients[0][0].messages("subscription_confirmed")[0]
+        assert confirmation["snapshot"]["score"] == {"team1": 0, "team2": 0}
+        assert confirmation["seq"] == 0
+
+        # Score frames are folded into the cached state without another load
+        await manager.broadcast_to_game({"type": "score_update", "team1_score": 7}, "game-1")
+        websocket, connection_id = await _connect(manager, "late")
+        await manager.subscribe(connection_id, ["game:game-1", "court:*"], snapshot=True)
+        await manager.wait_until_drained()
+        snapshots = websocket.messages("subscription_confirmed")[0]["snapshots"]
+        assert snapshots == {"game:game-1": {"seq": 1, "data": {"id": "game-1", "score": {"team1": 7, "team2": 0}}}}
+        assert loads == 1
+
+        # Anything the reducer cannot fold drops the entry
+        await manager.broadcast_to_game({"type": "user_joined", "user_id": "late"}, "game-1")
+        assert (await manager.current_state("game:game-1"))[0] == 2
+        assert loads == 2
+
+    asyncio.run(scenario())
+
+
+def test_tournament_snapshot_counts_participants_instead_of_listing_them(server_module):
+    async def scenario():
+        await server_module.db.tournaments.insert_one({
+            "id": "t1", "status": "in_progress", "current_round": 2, "max_participants": 64,
+            "participants": [f"user-{i}" for i in range(48)], "bracket": {"rounds": []}
+        })
+        assert await server_module.tournament_snapshot("t1") == {
+            "id": "t1", "status": "in_progress", "current_round": 2, "max_participants": 64, "participant_count": 48
+        }
+        assert await server_module.tournament_snapshot("missing") is None
+
+    asyncio.run(scenario())
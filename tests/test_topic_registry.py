@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from topic_registry import SubscriptionError, TopicRegistry
+from websocket_manager import ConnectionManager
+from tests.test_websocket_manager import _connect
+
+
+def test_wildcards_match_one_segment_and_limits_apply():
+    registry = TopicRegistry(max_subscriptions_per_connection=2)
+    registry.subscribe("a", "court:*")
+    registry.subscribe("b", "tournament:t-1:matches")
+    registry.subscribe("c", "tournament:*:matches")
+
+    assert registry.subscribers("court:court-9") == {"a"}
+    assert registry.subscribers("court:court-9:queue") == set()
+    assert registry.subscribers("tournament:t-1:matches") == {"b", "c"}
+    assert registry.subscribers("tournament:t-1") == set()
+
+    registry.subscribe("a", "game:g-1")
+    with pytest.raises(SubscriptionError):
+        registry.subscribe("a", "game:g-2")
+    with pytest.raises(SubscriptionError):
+        registry.subscribe("b", "lobby:1")
+
+    registry.remove_connection("a")
+    assert registry.patterns.keys() == {"tournament:*:matches"}
+    assert "game:g-1" not in registry.exact
+
+
+def test_batched_subscribe_confirms_once_and_routes_wildcards():
+    async def scenario():
+        manager = ConnectionManager(max_subscriptions_per_connection=2)
+        websocket, connection_id = await _connect(manager, "dashboard")
+
+        await manager.subscribe(connection_id, ["court:*", "tournament:t-1:matches", "game:g-1", "nope"])
+        await manager.wait_until_drained()
+        [confirmation] = websocket.messages("subscription_confirmed")
+        assert confirmation["topics"] == ["court:*", "tournament:t-1:matches"]
+        assert [r["topic"] for r in confirmation["rejected"]] == ["game:g-1", "nope"]
+
+        await manager.broadcast_to_court({"type": "court_status_update"}, "court-7")
+        await manager.broadcast_to_topic({"type": "match_scheduled"}, "tournament:t-1:matches")
+        await manager.wait_until_drained()
+        assert websocket.messages("court_status_update")[0]["topic"] == "court:court-7"
+        assert len(websocket.messages("match_scheduled")) == 1
+
+        await manager.unsubscribe(connection_id, ["court:*"])
+        await manager.broadcast_to_court({"type": "court_status_update"}, "court-7")
+        await manager.wait_until_drained()
+        assert len(websocket.messages("court_status_update")) == 1
+
+    asyncio.run(scenario())
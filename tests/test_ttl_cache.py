@@ -0,0 +1,44 @@
+import asyncio
+import time
+
+from ttl_cache import TTLCache
+
+
+def test_concurrent_misses_share_one_load():
+    async def scenario():
+        cache = TTLCache(ttl_seconds=60)
+        loads = 0
+
+        async def loader():
+            nonlocal loads
+            loads += 1
+            await asyncio.sleep(0.01)
+            return {"id": "user-1"}
+
+        results = await asyncio.gather(*(cache.get_or_load("user-1", loader) for _ in range(100)))
+        assert loads == 1
+        assert all(result == {"id": "user-1"} for result in results)
+        assert cache.stats()["misses"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_entries_expire_and_missing_values_are_not_cached():
+    async def scenario():
+        cache = TTLCache(ttl_seconds=60)
+        cache.set("short", "value", ttl_seconds=0.01)
+        time.sleep(0.02)
+        assert cache.get("short") is None
+
+        calls = 0
+
+        async def missing():
+            nonlocal calls
+            calls += 1
+            return None
+
+        await cache.get_or_load("ghost", missing)
+        await cache.get_or_load("ghost", missing)
+        assert calls == 2
+
+    asyncio.run(scenario())
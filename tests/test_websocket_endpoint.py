@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+from starlette.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+
+def token_for(auth_headers, user_id):
+    return asyncio.run(auth_headers(user_id, "player"))["Authorization"].split()[1]
+
+
+def receive(websocket, *message_types):
+    """Next frame of one of ``message_types``, skipping presence broadcasts and the like"""
+    while True:
+        message = websocket.receive_json()
+        if message["type"] in message_types:
+            return message
+
+
+def test_resume_with_a_bad_last_seq_gets_a_specific_error(server_module, auth_headers):
+    token = token_for(auth_headers, "u1")
+    with TestClient(server_module.app) as client:
+        with client.websocket_connect("/ws/u1") as websocket:
+            websocket.send_json({"type": "auth", "token": token})
+            for bad in ({"topic": "game:g1", "last_seq": "x"}, {"topic": "game:g1"}, {"topic": "game:g1", "last_seq": -1}, {"last_seq": 3}):
+                websocket.send_json({"type": "resume", **bad})
+                # The ping's pong would come first if the resume were accepted silently
+                websocket.send_json({"type": "ping"})
+                assert receive(websocket, "error", "pong") == {
+                    "type": "error",
+                    "message": "resume needs a topic and a non-negative integer last_seq"
+                }
+                assert receive(websocket, "pong")
+
+
+@pytest.mark.parametrize("user_id, auth, code", [
+    ("u1", {"type": "auth", "token": "not-a-jwt"}, 4401),
+    ("u1", {"type": "ping"}, 4401),
+    ("u2", None, 4403),
+])
+def test_rejected_handshakes_close_with_an_application_code(server_module, auth_headers, user_id, auth, code):
+    auth = auth or {"type": "auth", "token": token_for(auth_headers, "u1")}
+    with TestClient(server_module.app) as client:
+        with client.websocket_connect(f"/ws/{user_id}") as websocket:
+            websocket.send_json(auth)
+            with pytest.raises(WebSocketDisconnect) as closed:
+                websocket.receive_json()
+    assert closed.value.code == code
+
+
+def test_a_token_in_the_query_string_is_not_accepted(server_module, auth_headers, monkeypatch):
+    # Query strings are written to the access log, so the token must come in the first frame
+    monkeypatch.setattr(server_module, "WS_AUTH_TIMEOUT_SECONDS", 0.2)
+    token = token_for(auth_headers, "u1")
+    with TestClient(server_module.app) as client:
+        with client.websocket_connect(f"/ws/u1?token={token}") as websocket:
+            with pytest.raises(WebSocketDisconnect) as closed:
+                websocket.receive_json()
+    assert closed.value.code == 4401
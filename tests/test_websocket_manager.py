@@ -0,0 +1,333 @@
+import asyncio
+import json
+
+from websocket_manager import ConnectionManager, QueuePolicy
+
+
+class FakeWebSocket:
+    """Minimal stand-in for a Starlette WebSocket"""
+
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.sent = []
+        self.closed = False
+        self.close_code = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("socket gone")
+        self.sent.append(json.loads(data))
+
+    async def close(self, code: int = 1000):
+        self.closed = True
+        self.close_code = code
+
+    def messages(self, message_type: str):
+        return [m for m in self.sent if m["type"] == message_type]
+
+
+async def _connect(manager, user_id, **kwargs):
+    websocket = FakeWebSocket(**kwargs)
+    connection_id = await manager.connect(websocket, user_id)
+    await manager.wait_until_drained()
+    return websocket, connection_id
+
+
+def test_broadcast_does_not_wait_for_slow_subscribers():
+    async def scenario():
+        manager = ConnectionManager()
+        sockets = []
+        for i in range(20):
+            websocket, connection_id = await _connect(manager, f"user-{i}")
+            await manager.subscribe_to_game(connection_id, "game-1")
+            sockets.append(websocket)
+        await manager.wait_until_drained()
+        for websocket in sockets:
+            websocket.delay = 0.05
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await manager.broadcast_to_game({"type": "score_update", "game_id": "game-1"}, "game-1")
+        assert loop.time() - started < 0.02
+
+        # Writers drain concurrently; serial sends would take 20 * 50ms
+        assert await manager.wait_until_drained(timeout=0.5)
+        assert all(len(ws.messages("score_update")) == 1 for ws in sockets)
+
+    asyncio.run(scenario())
+
+
+def test_failed_and_slow_sends_are_evicted():
+    async def scenario():
+        manager = ConnectionManager(send_timeout=0.05)
+        healthy, healthy_id = await _connect(manager, "healthy")
+        broken, broken_id = await _connect(manager, "broken")
+        slow, slow_id = await _connect(manager, "slow")
+        for connection_id in (healthy_id, broken_id, slow_id):
+            await manager.subscribe_to_court(connection_id, "court-1")
+
+        broken.fail = True
+        slow.delay = 1.0
+        await manager.broadcast_to_court({"type": "player_checked_in", "court_id": "court-1"}, "court-1")
+        await asyncio.sleep(0.2)
+        await manager.wait_until_drained()
+
+        assert len(healthy.messages("player_checked_in")) == 1
+        assert set(manager.active_connections) == {healthy_id}
+        assert broken.closed and slow.closed
+        departed = {m["user_id"] for m in healthy.messages("user_disconnected")}
+        assert departed == {"broken", "slow"}
+
+    asyncio.run(scenario())
+
+
+def test_drop_oldest_policy_keeps_newest_frames():
+    async def scenario():
+        manager = ConnectionManager(max_queue_size=3, overflow_policy=QueuePolicy.DROP_OLDEST)
+        websocket, connection_id = await _connect(manager, "spectator")
+        await manager.subscribe_to_game(connection_id, "game-1")
+        await manager.wait_until_drained()
+
+        websocket.delay = 0.01
+        for i in range(10):
+            await manager.broadcast_to_game({"type": "user_joined", "n": i}, "game-1")
+        await manager.wait_until_drained()
+
+        received = [m["n"] for m in websocket.messages("user_joined")]
+        assert received[-3:] == [7, 8, 9]
+        assert manager.get_connection_stats()["outbound_queues"]["frames_dropped"] > 0
+
+    asyncio.run(scenario())
+
+
+def test_coalesce_policy_replaces_queued_score():
+    async def scenario():
+        manager = ConnectionManager(overflow_policy=QueuePolicy.COALESCE)
+        websocket, connection_id = await _connect(manager, "spectator")
+        await manager.subscribe_to_game(connection_id, "game-1")
+        await manager.wait_until_drained()
+
+        websocket.delay = 0.01
+        for score in range(5):
+            await manager.broadcast_to_game({"type": "score_update", "team1_score": score}, "game-1")
+        await manager.wait_until_drained()
+
+        scores = [m["team1_score"] for m in websocket.messages("score_update")]
+        assert scores[-1] == 4
+        assert len(scores) < 5
+
+    asyncio.run(scenario())
+
+
+def test_disconnect_policy_evicts_slow_consumer():
+    async def scenario():
+        manager = ConnectionManager(max_queue_size=2, overflow_policy=QueuePolicy.DISCONNECT)
+        fast, fast_id = await _connect(manager, "fast")
+        await manager.wait_until_drained()
+        slow, slow_id = await _connect(manager, "slow")
+        await manager.subscribe_to_game(fast_id, "game-1")
+        await manager.subscribe_to_game(slow_id, "game-1")
+        await manager.wait_until_drained()
+
+        slow.delay = 0.5
+        for i in range(5):
+            await manager.broadcast_to_game({"type": "user_joined", "n": i}, "game-1")
+            await asyncio.sleep(0.01)
+
+        assert slow_id not in manager.active_connections
+        assert fast_id in manager.active_connections
+        assert manager.get_connection_stats()["outbound_queues"]["slow_consumer_evictions"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_disconnect_only_touches_joined_topics_and_collects_empty_sets():
+    async def scenario():
+        manager = ConnectionManager()
+        websocket, connection_id = await _connect(manager, "spectator")
+        other, other_id = await _connect(manager, "other")
+        await manager.subscribe_to_court(connection_id, "court-1")
+        await manager.subscribe_to_game(connection_id, "game-1")
+        await manager.subscribe_to_game(other_id, "game-1")
+        await manager.subscribe_to_tournament(connection_id, "tournament-1")
+
+        await manager.disconnect(connection_id)
+
+        assert manager.topics.exact == {"game:game-1": {other_id}}
+        assert connection_id not in manager.topics.by_connection
+        assert "spectator" not in manager.user_connections
+
+        await manager.disconnect(other_id)
+        assert manager.topics.exact == {}
+        assert manager.topics.by_connection == {}
+
+    asyncio.run(scenario())
+
+
+def test_send_to_user_reaches_every_device():
+    async def scenario():
+        manager = ConnectionManager()
+        phone, phone_id = await _connect(manager, "player")
+        laptop, laptop_id = await _connect(manager, "player")
+
+        await manager.send_to_user({"type": "challenge_received"}, "player")
+        await manager.wait_until_drained()
+
+        assert manager.user_connections["player"] == {phone_id, laptop_id}
+        assert len(phone.messages("challenge_received")) == 1
+        assert len(laptop.messages("challenge_received")) == 1
+
+        # Closing one device keeps the user online
+        await manager.disconnect(phone_id)
+        assert manager.user_connections["player"] == {laptop_id}
+        await manager.disconnect(laptop_id)
+        assert "player" not in manager.user_connections
+
+    asyncio.run(scenario())
+
+
+def test_per_user_cap_closes_oldest_connection():
+    async def scenario():
+        manager = ConnectionManager(max_connections_per_user=2)
+        first, first_id = await _connect(manager, "player")
+        second, second_id = await _connect(manager, "player")
+        third, third_id = await _connect(manager, "player")
+
+        assert first.closed
+        assert manager.user_connections["player"] == {second_id, third_id}
+        assert manager.get_connection_stats()["total_connections"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_sixth_tab_evicts_only_the_oldest_with_a_policy_close():
+    async def scenario():
+        manager = ConnectionManager()
+        tabs = [await _connect(manager, "player") for _ in range(6)]
+
+        # 1008 tells the client not to reconnect, which would evict the next tab in turn
+        assert [websocket.close_code for websocket, _ in tabs] == [1008, None, None, None, None, None]
+        assert manager.user_connections["player"] == {connection_id for _, connection_id in tabs[1:]}
+        assert not any(websocket.messages("user_disconnected") for websocket, _ in tabs[1:])
+
+    asyncio.run(scenario())
+
+
+def test_coalescing_window_delivers_latest_score_and_keeps_event_order():
+    async def scenario():
+        manager = ConnectionManager(coalesce_window=0.05)
+        websocket, connection_id = await _connect(manager, "spectator")
+        await manager.subscribe_to_game(connection_id, "game-1")
+
+        for score in range(1, 6):
+            await manager.broadcast_to_game({"type": "score_update", "team1_score": score}, "game-1")
+        await manager.broadcast_to_game({"type": "period_end", "period": 1}, "game-1")
+        for score in range(6, 9):
+            await manager.broadcast_to_game({"type": "score_update", "team1_score": score}, "game-1")
+
+        await asyncio.sleep(0.15)
+        await manager.wait_until_drained()
+
+        frames = [
+            (m["type"], m.get("team1_score"))
+            for m in websocket.sent
+            if m["type"] in ("score_update", "period_end")
+        ]
+        # Leading edge, latest state before the event, the event, then the trailing state
+        assert frames == [
+            ("score_update", 1),
+            ("score_update", 5),
+            ("period_end", None),
+            ("score_update", 8)
+        ]
+        assert manager.get_connection_stats()["coalescing"]["frames_superseded"] == 5
+
+    asyncio.run(scenario())
+
+
+def test_resume_replays_only_the_gap():
+    async def scenario():
+        manager = ConnectionManager()
+        websocket, connection_id = await _connect(manager, "spectator")
+        epoch = websocket.messages("connection_established")[0]["epoch"]
+        await manager.subscribe_to_game(connection_id, "game-1")
+        for score in range(1, 4):
+            await manager.broadcast_to_game({"type": "score_update", "team1_score": score}, "game-1")
+        await manager.wait_until_drained()
+        last_seq = websocket.messages("score_update")[-1]["seq"]
+        await manager.disconnect(connection_id)
+
+        # Frames sent while the client was away
+        for score in range(4, 7):
+            await manager.broadcast_to_game({"type": "score_update", "team1_score": score}, "game-1")
+
+        websocket, connection_id = await _connect(manager, "spectator")
+        await manager.resume(connection_id, "game:game-1", last_seq, epoch)
+        await manager.wait_until_drained()
+
+        assert [m["team1_score"] for m in websocket.messages("score_update")] == [4, 5, 6]
+        assert [m["seq"] for m in websocket.messages("score_update")] == [4, 5, 6]
+        assert websocket.messages("resume_complete")[0]["replayed"] == 3
+        assert manager.topics.subscribers("game:game-1") == {connection_id}
+
+    asyncio.run(scenario())
+
+
+def test_resume_falls_back_to_snapshot_when_gap_is_too_old():
+    async def scenario():
+        manager = ConnectionManager()
+        manager.replay_buffer_size = 2
+
+        async def game_snapshot(game_id):
+            return {"id": game_id, "score": {"team1": 9, "team2": 0}}
+
+        manager.register_snapshot_provider("game", game_snapshot)
+        for score in range(1, 10):
+            await manager.broadcast_to_game({"type": "score_update", "team1_score": score}, "game-1")
+
+        websocket, connection_id = await _connect(manager, "spectator")
+        epoch = websocket.messages("connection_established")[0]["epoch"]
+        await manager.resume(connection_id, "game:game-1", 3, epoch)
+        await manager.resume(connection_id, "court:court-1", 3, "another-worker")
+        await manager.wait_until_drained()
+
+        snapshot = websocket.messages("snapshot")[0]
+        assert snapshot["data"]["score"]["team1"] == 9
+        assert snapshot["seq"] == 9
+        assert not websocket.messages("score_update")
+        # No provider registered for courts in this test
+        assert websocket.messages("resync_required")[0]["topic"] == "court:court-1"
+
+    asyncio.run(scenario())
+
+
+def test_heartbeat_pings_quiet_connections_and_reaps_idle_ones():
+    async def scenario():
+        manager = ConnectionManager()
+        manager.heartbeat_interval = 10
+        manager.idle_timeout = 30
+        active, active_id = await _connect(manager, "active")
+        quiet, quiet_id = await _connect(manager, "quiet")
+        dead, dead_id = await _connect(manager, "dead")
+
+        manager.active_connections[quiet_id].last_seen -= 15
+        manager.active_connections[dead_id].last_seen -= 45
+        manager.touch(active_id)
+
+        assert await manager.heartbeat_once() == 1
+        await manager.wait_until_drained()
+
+        assert dead_id not in manager.active_connections and dead.closed
+        assert len(quiet.messages("heartbeat")) == 1
+        assert not active.messages("heartbeat")
+        stats = manager.get_connection_stats()["heartbeat"]
+        assert stats["reaped_total"] == 1
+        assert stats["connection_age_histogram"]["<1m"] == 2
+
+    asyncio.run(scenario())
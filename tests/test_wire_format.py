@@ -0,0 +1,88 @@
+import asyncio
+import json
+import time
+import zlib
+
+import pytest
+
+from websocket_manager import ConnectionManager
+from wire_format import WireCompression, WireEncoding, compact_message, negotiate_codec
+from tests.test_websocket_manager import FakeWebSocket
+
+
+class RawWebSocket(FakeWebSocket):
+    """Records frames exactly as they would hit the wire"""
+
+    async def send_text(self, data: str):
+        self.sent.append(data)
+
+    async def send_bytes(self, data: bytes):
+        self.sent.append(data)
+
+
+@pytest.fixture
+def new_york_host(monkeypatch):
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_compact_message_shortens_keys_and_timestamp(new_york_host):
+    compact = compact_message({
+        "type": "score_update",
+        "game_id": "game-1",
+        "team1_score": 10,
+        "timestamp": "2025-01-01T00:00:00",
+        "custom": True
+    })
+    assert compact["_v"] == 1
+    assert compact["t"] == "score_update"
+    assert compact["g"] == "game-1"
+    assert compact["s1"] == 10
+    # Naive server timestamps are UTC whatever the host's TZ; offsets are honoured
+    assert compact["ts"] == 1735689600000
+    assert compact_message({"timestamp": "2025-01-01T02:00:00+02:00"})["ts"] == 1735689600000
+    assert compact["custom"] is True
+
+
+def test_negotiation_falls_back_on_unknown_values():
+    codec = negotiate_codec("yaml", "brotli")
+    assert codec.encoding == WireEncoding.JSON
+    assert codec.compression == WireCompression.NONE
+
+
+def test_broadcast_encodes_once_per_wire_format():
+    async def scenario():
+        manager = ConnectionManager()
+        verbose = RawWebSocket()
+        compact = RawWebSocket()
+        deflated = RawWebSocket()
+        for websocket, codec in (
+            (verbose, negotiate_codec(None, None)),
+            (compact, negotiate_codec("compact", None)),
+            (deflated, negotiate_codec("compact", "deflate")),
+        ):
+            connection_id = await manager.connect(websocket, f"user-{id(websocket)}", codec)
+            await manager.subscribe_to_game(connection_id, "game-1")
+        await manager.wait_until_drained()
+
+        await manager.broadcast_to_game({"type": "score_update", "team1_score": 3}, "game-1")
+        await manager.wait_until_drained()
+
+        assert json.loads(verbose.sent[-1])["team1_score"] == 3
+        assert json.loads(compact.sent[-1])["s1"] == 3
+        assert len(compact.sent[-1]) < len(verbose.sent[-1])
+        inflated = zlib.decompress(deflated.sent[-1], wbits=-zlib.MAX_WBITS)
+        assert inflated.decode("utf-8") == compact.sent[-1]
+
+    asyncio.run(scenario())
+
+
+def test_msgpack_encoding_sends_binary_frames():
+    msgpack = pytest.importorskip("msgpack")
+    codec = negotiate_codec("msgpack", None)
+    frame = codec.encode({"type": "score_update", "team1_score": 7})
+    assert isinstance(frame, bytes)
+    assert msgpack.unpackb(frame)["s1"] == 7